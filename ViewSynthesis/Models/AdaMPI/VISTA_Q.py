@@ -1,21 +1,26 @@
 import os
 import torch
-import torch.nn.functional as F
-from torchvision.utils import save_image
-from transformers import DPTForDepthEstimation, DPTImageProcessor
+import numpy as np
 from PIL import Image
+import torch.nn.functional as F
 import time
 import sys
 
 # Add the current directory and subdirectories to sys.path
 current_dir = os.path.dirname(os.path.abspath(__file__))
+# The toolkit root holds the MPI artifact format and the depth service shared by the adapters
+toolkit_dir = os.path.dirname(os.path.dirname(current_dir))
+if toolkit_dir not in sys.path:
+    sys.path.append(toolkit_dir)
 
-# Import our model
-from model.AdaMPI import MPIPredictor
+# Import our model helpers; the network itself is imported by load_model(), which cached and baked
+# sessions never call
 from utils.mpi.homography_sampler import HomographySample
 from utils.utils import image_to_tensor, disparity_to_tensor
 from utils.rendererBackbone import processMPIs, cropFOV, renderSingleFrame
 from parameters import device
+from vista_q_artifact import save_artifact, load_artifact
+from vista_q_depth import get_depth_service, load_disparity
 
 class VISTA_Q:
     def __init__(self, ckpt_path="adampiweight/adampi_32p.pth", height=256, width=256, 
@@ -52,6 +57,8 @@ class VISTA_Q:
         self.model = None
         self.image = None
         self.disp = None
+        # Depth backend of the shared depth service, named so the model pool can free it with this adapter
+        self.depth_backend = get_depth_service().backend
         
         # MPI components
         self.mpi_all_rgb_src = None
@@ -64,10 +71,8 @@ class VISTA_Q:
         os.makedirs(self.temp_dir, exist_ok=True)
         
     def load_model(self):
-        """Load the MPI prediction model and depth estimation model"""
-        # Load depth estimation model
-        self.depth_model = DPTForDepthEstimation.from_pretrained("Intel/dpt-hybrid-midas").to(device)
-        self.image_processor = DPTImageProcessor.from_pretrained("Intel/dpt-hybrid-midas")
+        """Load the MPI prediction model (depth comes from the toolkit's shared depth service)"""
+        from model.AdaMPI import MPIPredictor
         
         # Load MPI model
         ckpt = torch.load(self.ckpt_path)
@@ -89,7 +94,8 @@ class VISTA_Q:
         
         Args:
             img_path (str): Path to the input image
-            disp_path (str, optional): Path to the disparity map. If None, will generate using MiDaS
+            disp_path (str, optional): Path to a precomputed disparity map (image, .npy or depth cache entry).
+                If None, the disparity comes from the shared depth service (DPT-Hybrid MiDaS, cached per image)
         """
         # Convert relative paths to absolute paths based on the current module's directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -105,14 +111,16 @@ class VISTA_Q:
                 
         self.image = image_to_tensor(img_path).to(device)  # [1,3,h,w]
         
-        if disp_path is not None:
+        if disp_path is not None and not disp_path.endswith(".npy") and not disp_path.endswith(".vqa"):
             self.disp = disparity_to_tensor(disp_path).to(device)  # [1,1,h,w]
         else:
-            # Use MiDaS to generate depth map
-            with torch.no_grad():
-                inputs = self.image_processor(images=Image.open(img_path), return_tensors="pt")
-                midas_depth = self.depth_model(pixel_values=inputs['pixel_values'].to(device)).predicted_depth.unsqueeze(1)
-                self.disp = midas_depth / torch.max(midas_depth)
+            # MiDaS disparity, computed once per image and shared with the other adapters
+            if disp_path is not None:
+                midas_depth = load_disparity(disp_path)
+            else:
+                midas_depth = get_depth_service().disparity(img_path, self.depth_backend)
+            midas_depth = torch.from_numpy(midas_depth)[None, None].to(device)
+            self.disp = midas_depth / torch.max(midas_depth)
         
         # Resize to target dimensions
         self.image = F.interpolate(self.image, size=(self.height, self.width), mode='bilinear', align_corners=True)
@@ -170,7 +178,7 @@ class VISTA_Q:
             scale (int): Scale factor for output image
             
         Returns:
-            PIL.Image: Rendered novel view
+            np.ndarray: Rendered novel view as a uint8 HxWx3 array
         """
         if self.mpi_all_rgb_src is None:
             raise ValueError("MPI layers not generated. Call load_image() first.")
@@ -201,34 +209,86 @@ class VISTA_Q:
         if self.crop_fov:
             img = cropFOV(img, self.input_fov, self.target_fov)
             
-        return img
+        return np.asarray(img.convert('RGB'))
+    
+    def cache_signature(self):
+        """Describe the settings that determine the MPI layers (used as part of the MPI cache key)"""
+        return {
+            "checkpoint_path": self.ckpt_path,
+            "resolution": (self.height, self.width),
+        }
+    
+    def get_mpi_state(self):
+        """
+        Get the generated MPI layers as plain CPU tensors.
+        
+        Returns:
+            dict: MPI tensors, restorable with set_mpi_state()
+        """
+        if self.mpi_all_rgb_src is None:
+            raise ValueError("MPI layers not generated. Call load_image() first.")
+        
+        return {
+            "mpi_all_rgb_src": self.mpi_all_rgb_src.cpu(),
+            "mpi_all_sigma_src": self.mpi_all_sigma_src.cpu(),
+            "disparity_all_src": self.disparity_all_src.cpu(),
+            "k_src_inv": self.k_src_inv.cpu(),
+            "k_tgt": self.k_tgt.cpu(),
+            "sampler_size": torch.tensor([self.homography_sampler.Height_tgt, self.homography_sampler.Width_tgt]),
+        }
     
-    def save_mpi_layers(self, save_dir="saved_layers/"):
-        """Save the generated MPI layers to disk"""
+    def set_mpi_state(self, state):
+        """
+        Restore MPI layers produced by get_mpi_state(), without running the networks.
+        
+        Args:
+            state (dict): MPI tensors
+        """
+        self.mpi_all_rgb_src = state["mpi_all_rgb_src"].to(device)
+        self.mpi_all_sigma_src = state["mpi_all_sigma_src"].to(device)
+        self.disparity_all_src = state["disparity_all_src"].to(device)
+        self.k_src_inv = state["k_src_inv"].to(device)
+        self.k_tgt = state["k_tgt"].to(device)
+        sampler_height, sampler_width = (int(v) for v in state["sampler_size"])
+        self.homography_sampler = HomographySample(sampler_height, sampler_width, device)
+    
+    def save_mpi_layers(self, save_dir="saved_layers/", fp16=False):
+        """
+        Save the generated MPI layers to disk as an MPI artifact.
+        
+        Args:
+            save_dir (str): Directory to save the layers in
+            fp16 (bool): Store the RGB, sigma and disparity planes as float16
+        """
         os.makedirs(save_dir, exist_ok=True)
         
-        torch.save(self.mpi_all_rgb_src, save_dir + 'mpi_all_rgb_src.pt')
-        torch.save(self.mpi_all_sigma_src, save_dir + 'mpi_all_sigma_src.pt')
-        torch.save(self.disparity_all_src, save_dir + 'disparity_all_src.pt')
-        torch.save(self.k_src_inv, save_dir + 'k_src_inv.pt')
-        torch.save(self.k_tgt, save_dir + 'k_tgt.pt')
-        torch.save(self.homography_sampler, save_dir + 'homography_sampler.pt')
+        save_artifact(os.path.join(save_dir, 'mpi_state.vqa'), self.get_mpi_state(), meta={"adapter": "AdaMPI"}, fp16=fp16)
         
         print(f"Status: MPI layers saved to {save_dir}")
         
     def load_mpi_layers(self, load_dir="saved_layers/"):
-        """Load pre-processed MPI layers from disk"""
-        self.mpi_all_rgb_src = torch.load(load_dir + 'mpi_all_rgb_src.pt').to(device)
-        self.mpi_all_sigma_src = torch.load(load_dir + 'mpi_all_sigma_src.pt').to(device)
-        self.disparity_all_src = torch.load(load_dir + 'disparity_all_src.pt').to(device)
-        self.k_src_inv = torch.load(load_dir + 'k_src_inv.pt').to(device)
-        self.k_tgt = torch.load(load_dir + 'k_tgt.pt').to(device)
-        old_homography_sampler = torch.load(load_dir + 'homography_sampler.pt')
-        self.homography_sampler = HomographySample(
-            old_homography_sampler.Height_tgt,
-            old_homography_sampler.Width_tgt,
-            device
-        )
+        """Load pre-processed MPI layers from disk, memory-mapped so planes are read on first use"""
+        artifact_path = os.path.join(load_dir, 'mpi_state.vqa')
+        if os.path.exists(artifact_path):
+            self.set_mpi_state(load_artifact(artifact_path).state())
+            print(f"Status: MPI layers loaded from {load_dir}")
+            return
+        
+        # Layers saved by older versions, as a state dict or one file per component
+        state_path = os.path.join(load_dir, 'mpi_state.pt')
+        if os.path.exists(state_path):
+            self.set_mpi_state(torch.load(state_path, map_location="cpu", weights_only=True))
+            print(f"Status: MPI layers loaded from {load_dir}")
+            return
+        
+        self.mpi_all_rgb_src = torch.load(os.path.join(load_dir, 'mpi_all_rgb_src.pt'), weights_only=True).to(device)
+        self.mpi_all_sigma_src = torch.load(os.path.join(load_dir, 'mpi_all_sigma_src.pt'), weights_only=True).to(device)
+        self.disparity_all_src = torch.load(os.path.join(load_dir, 'disparity_all_src.pt'), weights_only=True).to(device)
+        self.k_src_inv = torch.load(os.path.join(load_dir, 'k_src_inv.pt'), weights_only=True).to(device)
+        self.k_tgt = torch.load(os.path.join(load_dir, 'k_tgt.pt'), weights_only=True).to(device)
+        # The pickled homography sampler is not loaded; it samples at the size of the MPI planes
+        sampler_height, sampler_width = self.mpi_all_rgb_src.shape[-2:]
+        self.homography_sampler = HomographySample(sampler_height, sampler_width, device)
         print(f"Status: MPI layers loaded from {load_dir}")
         
         
@@ -245,4 +305,4 @@ if __name__ == "__main__":
     
     # Generate a novel view
     novel_view = vista.generate_view(x_offset=0.01, y_offset=0, z_offset=0)
-    novel_view.show()
\ No newline at end of file
+    Image.fromarray(novel_view).show()
\ No newline at end of file
@@ -4,47 +4,129 @@ import numpy as np
 import torch
 import torch.nn.functional as F
 from PIL import Image
-import torchvision.transforms as transforms
 import traceback
-import OpenGL
 
 # Add current directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
+# The toolkit root holds the MPI artifact format and the depth service shared by the adapters
+toolkit_dir = os.path.dirname(os.path.dirname(current_dir))
+if toolkit_dir not in sys.path:
+    sys.path.append(toolkit_dir)
 
-# Import model components
-from tmpi import TMPI
+# Import model components; the TMPI network is imported by load_model(), which cached and baked
+# sessions never call, and OpenGL only when the GL renderer is created
 import config
-from dpt_wrapper import DPTWrapper
 from utils import imutils, utils
+from tmpi_tiling import create_tiles
+from tmpi_renderer_cpu import TMPIRendererCPU
+from vista_q_artifact import save_artifact, load_artifact
+from vista_q_depth import get_depth_service, load_disparity, register_depth_backend
 
 # Define device constant
 DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# Poses per pass of generate_views() on the GPU; on CPUs batched warps are not faster, see tmpi_renderer_cpu.py
+GPU_BATCH_SIZE = 8
+
+# Depth network of the original TMPI pipeline: DPTWrapper, run on the downscaled input image
+DPT_CHECKPOINT = os.path.join(current_dir, 'DPT/weights/dpt_hybrid-midas-501f0c75.pt')
+
+
+def scaled_input(image_path, imgsz_max):
+    """
+    Load an image and scale it down so that its longest side is at most imgsz_max.
+
+    Returns:
+        torch.Tensor: Image [1, 3, h, w] as float in [0, 1], on the CPU
+    """
+    # Load image using imutils from predictImage.py
+    src_rgb = imutils.png2np(image_path).astype(np.float32)
+    h, w = src_rgb.shape[:2]
+    
+    # Scale the image if too large
+    if h >= w and h >= imgsz_max:
+        h_scaled, w_scaled = imgsz_max, int(imgsz_max / h * w)
+    elif w > h and w >= imgsz_max:
+        h_scaled, w_scaled = int(imgsz_max / w * h), imgsz_max
+    else:
+        h_scaled, w_scaled = h, w
+    
+    return F.interpolate(
+        torch.from_numpy(src_rgb).permute(2, 0, 1).unsqueeze(0), 
+        (h_scaled, w_scaled), 
+        mode="bilinear"
+    )
+
+
+def dpt_backend_name(imgsz_max):
+    """Depth service backend of DPTWrapper at an input size, named after its checkpoint"""
+    return f"dpt-wrapper:{os.path.splitext(os.path.basename(DPT_CHECKPOINT))[0]}@{imgsz_max}"
+
+
+def register_dpt_backend(imgsz_max):
+    """
+    Register DPTWrapper as a depth service backend, so its disparities are cached and shared only
+    with adapters running the same checkpoint on the same input size.
+
+    Returns:
+        str: Name of the backend
+    """
+    def factory(device):
+        from dpt_wrapper import DPTWrapper
+        
+        depth_estimator = DPTWrapper(model_path=DPT_CHECKPOINT)
+        
+        def predict(image_path):
+            img_input = scaled_input(image_path, imgsz_max)
+            with torch.no_grad():
+                disparity = depth_estimator(img_input.squeeze().permute(1, 2, 0).numpy())
+            return np.asarray(disparity, dtype=np.float32)
+        
+        return predict
+    
+    name = dpt_backend_name(imgsz_max)
+    register_depth_backend(name, factory)
+    return name
 
 class VISTA_Q:
-    def __init__(self, height=config.imgsz_max, width=config.imgsz_max):
+    def __init__(self, height=config.imgsz_max, width=config.imgsz_max, checkpoint_path="./weights/mpti_04.pth", imgsz_max=config.imgsz_max, debug=False,
+                 renderer="auto", render_threads=None):
         """
         Initialize the VISTA_Q class for TMPI_256.
         
         Args:
             height (int): Height of the rendered image
             width (int): Width of the rendered image
+            checkpoint_path (str): Path to the model checkpoint
+            imgsz_max (int): Longest side input images are scaled down to before tiling
+            debug (bool): Print the render dimensions and MPI shapes for every frame
+            renderer (str): "gl" for TMPIRendererGL, "cpu" for the multi-core TMPIRendererCPU,
+                "auto" to use OpenGL when a context can be created and the CPU renderer otherwise
+            render_threads (int, optional): Torch threads of the CPU renderer, defaults to all cores
         """
+        if renderer not in ("auto", "gl", "cpu"):
+            raise ValueError(f"Unknown renderer: {renderer}")
         self.height = height
         self.width = width
+        self.imgsz_max = imgsz_max
+        self.debug = debug
+        self.checkpoint_path = self._resolve_path(checkpoint_path)
         self.model = None
         self.renderer = None
-        self.depth_estimator = None
-        self.transform = transforms.Compose([
-            transforms.Resize((self.height, self.width)),
-            transforms.ToTensor()
-        ])
+        self.renderer_backend = renderer
+        self.render_threads = render_threads
+        self.active_backend = None
         self.img_input = None
         self.img_depth = None
+        self.image_size = None
         self.mpi_data = None
+        self.mpi_disp = None
+        self.tile_data = None
+        self.render_buffers = None
         self.initial_pose = torch.eye(4)
         self._renderer_initialized = False
+        self.depth_backend = register_dpt_backend(imgsz_max)
         
         # Setup model configuration
         self.setup_model_config()
@@ -57,33 +139,38 @@ class VISTA_Q:
         self.tilesz_max = config.tilesz_max
         self.padsz2tile_ratio = config.padsz2tile_ratio
         
-        # Camera intrinsics matrix
-        self.K = torch.tensor([
+        # Camera intrinsics matrix (normalized, scaled to the image size in load_image)
+        self.K_normalized = torch.tensor([
             [0.58, 0, 0.5],
             [0, 0.58, 0.5],
             [0, 0, 1]
         ]).unsqueeze(0)
+        self.K = self.K_normalized.clone()
+    
+    def _resolve_path(self, path):
+        """Resolve a path relative to the current file"""
+        if not os.path.isabs(path):
+            module_dir = os.path.dirname(os.path.abspath(__file__))
+            path = os.path.join(module_dir, path)
+        return path
         
-    def load_model(self, checkpoint_path="./weights/mpti_04.pth"):
+    def load_model(self, checkpoint_path=None):
         """
         Load the TMPI model from a checkpoint.
         
         Args:
-            checkpoint_path (str): Path to the model checkpoint
+            checkpoint_path (str, optional): Path to the model checkpoint, defaults to the one given at construction
             
         Returns:
             bool: True if model loaded successfully
         """
         try:
-            # Resolve checkpoint path relative to the current file
-            if not os.path.isabs(checkpoint_path):
-                module_dir = os.path.dirname(os.path.abspath(__file__))
-                checkpoint_path = os.path.join(module_dir, checkpoint_path)
+            if checkpoint_path is not None:
+                self.checkpoint_path = self._resolve_path(checkpoint_path)
+            checkpoint_path = self.checkpoint_path
             
             print(f"Loading model from: {checkpoint_path}")
-            
-            # Initialize depth estimation model
-            self.depth_estimator = DPTWrapper(model_path=os.path.join(current_dir, 'DPT/weights/dpt_hybrid-midas-501f0c75.pt'))
+            from tmpi import TMPI
             
             # Initialize TMPI model - following predictImage.py approach
             base_model = TMPI(num_planes=self.num_planes)
@@ -109,12 +196,14 @@ class VISTA_Q:
             traceback.print_exc()
             return False
     
-    def load_image(self, image_path):
+    def load_image(self, image_path, disp_path=None):
         """
         Load and preprocess an input image.
         
         Args:
             image_path (str): Path to the input image
+            disp_path (str, optional): Path to a precomputed disparity map (image, .npy or depth cache entry).
+                If None, the disparity comes from the shared depth service (DPTWrapper, cached per image)
             
         Returns:
             bool: True if image loaded successfully
@@ -123,40 +212,33 @@ class VISTA_Q:
             if not os.path.exists(image_path):
                 raise FileNotFoundError(f"Image not found at {image_path}")
             
-            # Load image using imutils from predictImage.py
-            src_rgb = imutils.png2np(image_path).astype(np.float32)
-            h, w = src_rgb.shape[:2]
-            
-            # Scale the image if too large
-            if h >= w and h >= config.imgsz_max:
-                h_scaled, w_scaled = config.imgsz_max, int(config.imgsz_max / h * w)
-            elif w > h and w >= config.imgsz_max:
-                h_scaled, w_scaled = int(config.imgsz_max / w * h), config.imgsz_max
-            else:
-                h_scaled, w_scaled = h, w
-            
-            self.img_input = F.interpolate(
-                torch.from_numpy(src_rgb).permute(2, 0, 1).unsqueeze(0), 
-                (h_scaled, w_scaled), 
-                mode="bilinear"
-            ).to(DEVICE)
+            self.img_input = scaled_input(image_path, self.imgsz_max).to(DEVICE)
+            h_scaled, w_scaled = self.img_input.shape[-2:]
             
             # Update camera intrinsics for the input image
-            self.K = self.K.clone()
+            self.K = self.K_normalized.clone()
             self.K[:, 0, :] *= w_scaled
             self.K[:, 1, :] *= h_scaled
             
-            # Estimate depth using DPT
-            with torch.no_grad():
-                self.img_depth = torch.from_numpy(
-                    self.depth_estimator(self.img_input.squeeze().permute(1, 2, 0).cpu().numpy())
-                ).unsqueeze(0).unsqueeze(0).to(DEVICE)
-                
-                # Normalize depth to [0, 1]
-                self.img_depth = (self.img_depth - torch.min(self.img_depth)) / (torch.max(self.img_depth) - torch.min(self.img_depth))
+            # DPT disparity of the downscaled input, computed once per image and shared with the
+            # adapters using the same backend
+            if disp_path is not None:
+                disparity = load_disparity(disp_path)
+            else:
+                disparity = get_depth_service().disparity(image_path, self.depth_backend)
+            self.img_depth = F.interpolate(
+                torch.from_numpy(disparity)[None, None],
+                (h_scaled, w_scaled),
+                mode="bilinear"
+            ).to(DEVICE)
+            
+            # Normalize depth to [0, 1]
+            self.img_depth = (self.img_depth - torch.min(self.img_depth)) / (torch.max(self.img_depth) - torch.min(self.img_depth))
             
             # Process the image and depth into tiles
             self._process_tiles()
+            self._set_image_size(h_scaled, w_scaled)
+            self._prepare_render_buffers()
             
             print(f"Image loaded successfully: {image_path}")
             return True
@@ -216,34 +298,102 @@ class VISTA_Q:
         Returns:
             Tuple of (src_disp_tiles, src_rgb_tiles, K_tiles, sx, sy)
         """
-        bs, _, h, w = src_disp.shape
-        K_, sx_, sy_, dmap_, rgb_ = [], [], [], [], []
-
-        sy = torch.arange(0, h, tile_sz - pad_sz)
-        sx = torch.arange(0, w, tile_sz - pad_sz)
-
-        src_disp = F.pad(src_disp, (0, tile_sz, 0, tile_sz), 'replicate') 
-        src_rgb = F.pad(src_rgb, (0, tile_sz, 0, tile_sz), 'replicate') 
-
-        K_, src_disp_, src_rgb_,  sx_, sy_ = [], [], [], [], []
-        for y in sy:
-            for x in sx:
-                l, r, t, b = x, x + tile_sz, y, y + tile_sz
-                Ki = K.clone()
-                Ki[:, 0, 2] = Ki[:, 0, 2] - x
-                Ki[:, 1, 2] = Ki[:, 1, 2] - y
-
-                K_.append(Ki)
-                src_disp_.append(src_disp[:, :, t:b, l:r])
-                src_rgb_.append(src_rgb[:, :, t:b, l:r])
-                sx_.append(x)
-                sy_.append(y)
-
-        src_rgb_ = torch.stack(src_rgb_, 1)
-        src_disp_ = torch.stack(src_disp_, 1)
-        K_ = torch.stack(K_, 1)
-        sx_, sy_ = torch.tensor(sx_).unsqueeze(0).expand(bs, -1), torch.tensor(sy_).unsqueeze(0).expand(bs, -1)
-        return src_disp_, src_rgb_, K_, sx_, sy_
+        # Tiles are strided views of the padded images and all intrinsics are shifted in one batched op
+        return create_tiles(src_disp, src_rgb, K, tile_sz, pad_sz)
+    
+    def _set_image_size(self, h, w):
+        """Record the size of the loaded image, recreating the renderer if it changed"""
+        if self.image_size != (h, w):
+            self.image_size = (h, w)
+            self._renderer_initialized = False
+    
+    def cache_signature(self):
+        """Describe the settings that determine the MPI (used as part of the MPI cache key)"""
+        return {
+            "checkpoint_path": self.checkpoint_path,
+            "resolution": self.imgsz_max,
+            "num_planes": self.num_planes,
+            "depth_backend": self.depth_backend,
+        }
+    
+    def get_mpi_state(self):
+        """
+        Get the generated tiled MPI as plain CPU tensors.
+        
+        Returns:
+            dict: MPI tensors, restorable with set_mpi_state()
+        """
+        if self.mpi_data is None:
+            raise RuntimeError("MPI not generated. Call load_image() first.")
+        
+        return {
+            "mpi_data": self.mpi_data.cpu(),
+            "mpi_disp": self.mpi_disp.cpu(),
+            "K": self.K.cpu(),
+            "sx": self.tile_data["sx"].cpu(),
+            "sy": self.tile_data["sy"].cpu(),
+            "tile_sz": torch.tensor(self.tile_data["tile_sz"]),
+            "pad_sz": torch.tensor(self.tile_data["pad_sz"]),
+            "image_size": torch.tensor(self.image_size),
+        }
+    
+    def set_mpi_state(self, state):
+        """
+        Restore a tiled MPI produced by get_mpi_state(), without running DPT or TMPI.
+        
+        Args:
+            state (dict): MPI tensors
+        """
+        self.mpi_data = state["mpi_data"].to(DEVICE)
+        self.mpi_disp = state["mpi_disp"].to(DEVICE)
+        self.K = state["K"].clone()
+        self.tile_data = {
+            "sx": state["sx"],
+            "sy": state["sy"],
+            "tile_sz": int(state["tile_sz"]),
+            "pad_sz": int(state["pad_sz"]),
+        }
+        h, w = (int(v) for v in state["image_size"])
+        self._set_image_size(h, w)
+        self._prepare_render_buffers()
+    
+    def save_mpi_layers(self, save_dir="saved_layers/", fp16=False):
+        """
+        Save the generated tiled MPI to disk as an MPI artifact.
+        
+        Args:
+            save_dir (str): Directory to save the MPI in
+            fp16 (bool): Store the tile planes as float16
+        """
+        os.makedirs(save_dir, exist_ok=True)
+        save_artifact(os.path.join(save_dir, "mpi_state.vqa"), self.get_mpi_state(), meta={"adapter": "TMPI"}, fp16=fp16)
+        print(f"Status: MPI saved to {save_dir}")
+    
+    def load_mpi_layers(self, load_dir="saved_layers/"):
+        """Load a tiled MPI saved by save_mpi_layers(), memory-mapped so tiles are read on first use"""
+        self.set_mpi_state(load_artifact(os.path.join(load_dir, "mpi_state.vqa")).state())
+        print(f"Status: MPI loaded from {load_dir}")
+    
+    def _prepare_render_buffers(self):
+        """
+        Prepare the renderer inputs once per image, so that generate_view() only builds the pose.
+        
+        The renderer reads the MPI from host memory; the buffers are copied there once, contiguous,
+        and pinned when CUDA is available so that uploads from them are fast.
+        """
+        def host_buffer(tensor):
+            tensor = tensor.detach().cpu().contiguous()
+            if torch.cuda.is_available():
+                tensor = tensor.pin_memory()
+            return tensor
+        
+        self.render_buffers = {
+            "mpi_data": host_buffer(self.mpi_data),
+            "mpi_disp": host_buffer(self.mpi_disp),
+            "K": host_buffer(self.K),
+            "sx": host_buffer(self.tile_data["sx"]),
+            "sy": host_buffer(self.tile_data["sy"]),
+        }
     
     def _get_position_vector(self, x, y, z=0):
         """
@@ -266,31 +416,96 @@ class VISTA_Q:
         return pose.unsqueeze(0)
     
     def _initialize_renderer(self):
-        """Initialize or reinitialize the OpenGL renderer"""
-        from tmpi_renderer_gl import TMPIRendererGL
-        import OpenGL.GL as gl
-        
+        """Initialize or reinitialize the renderer, falling back to the CPU renderer in "auto" mode"""
         # Clean up existing renderer if it exists
         if self.renderer is not None:
             try:
-                self.renderer.cleanup()  # Assuming cleanup method exists in TMPIRendererGL
+                self.renderer.cleanup()
             except:
                 pass
             self.renderer = None
         
-        # Initialize new renderer
+        h, w = self.image_size
+        if self.renderer_backend in ("gl", "auto"):
+            try:
+                self._initialize_gl_renderer(h, w)
+                return
+            except Exception as e:
+                print(f"Error initializing renderer: {str(e)}")
+                self._renderer_initialized = False
+                if self.renderer_backend == "gl":
+                    raise
+                print("Status: Falling back to the CPU renderer")
+        
+        self.renderer = TMPIRendererCPU(h, w, num_threads=self.render_threads, device=DEVICE)
+        self.active_backend = "cpu"
+        self._renderer_initialized = True
+    
+    def _initialize_gl_renderer(self, h, w):
+        """Initialize the OpenGL renderer"""
+        import OpenGL
+        import OpenGL.GL as gl
+        from tmpi_renderer_gl import TMPIRendererGL
+        
         OpenGL.ERROR_CHECKING = True
-        h, w = self.img_input.shape[-2:]
-        try:
-            self.renderer = TMPIRendererGL(h, w)
-            self._renderer_initialized = True
-            # Clear any existing GL errors
-            gl.glGetError()
-        except Exception as e:
-            print(f"Error initializing renderer: {str(e)}")
-            self._renderer_initialized = False
-            raise
+        self.renderer = TMPIRendererGL(h, w)
+        self.active_backend = "gl"
+        self._renderer_initialized = True
+        # Clear any existing GL errors
+        gl.glGetError()
+    
+    def _render(self, pose):
+        """Render the prepared buffers from a batch of poses with the current renderer"""
+        buffers = self.render_buffers
+        return self.renderer(
+            buffers["mpi_data"],
+            buffers["mpi_disp"],
+            pose,
+            buffers["K"],
+            buffers["sx"],
+            buffers["sy"]
+        )
 
+    def _render_with_recovery(self, pose):
+        """Render a batch of poses, reinitializing the OpenGL renderer once if it fails"""
+        # Initialize or reinitialize renderer if needed
+        if not self._renderer_initialized:
+            self._initialize_renderer()
+        
+        with torch.no_grad():
+            if self.debug:
+                h, w = self.image_size
+                print(f"Rendering {pose.shape[0]} view(s) with dimensions: {h}x{w}")
+                print(f"MPI data shape: {self.render_buffers['mpi_data'].shape}")
+                print(f"MPI disparity shape: {self.render_buffers['mpi_disp'].shape}")
+            
+            try:
+                return self._render(pose)
+            except Exception as e:
+                if self.active_backend != "gl":
+                    raise
+                print(f"OpenGL error occurred ({str(e)}), attempting to reinitialize renderer...")
+                self._renderer_initialized = False
+                self._initialize_renderer()
+                return self._render(pose)
+    
+    def _to_frame(self, rendered_view, scale):
+        """Convert a rendered float view [H, W, 3] to a uint8 frame, resized if needed"""
+        # Convert to a uint8 frame, the toolkit displays it without further copies
+        frame = np.clip(rendered_view, 0, 1)
+        frame *= 255
+        frame = frame.astype(np.uint8)
+        
+        # Resize if needed
+        if scale != 1:
+            rendered_img = Image.fromarray(frame)
+            return np.asarray(rendered_img.resize(
+                (int(rendered_img.width * scale), int(rendered_img.height * scale)), 
+                Image.LANCZOS
+            ))
+            
+        return frame
+    
     def generate_view(self, x, y, z=0, scale=1):
         """
         Generate a novel view based on the given camera position.
@@ -302,89 +517,65 @@ class VISTA_Q:
             scale (int): Scale factor for the output image size
             
         Returns:
-            PIL.Image: Generated view as a PIL image
+            np.ndarray: Generated view as a uint8 HxWx3 array
         """
-        if self.model is None or self.img_input is None or self.mpi_data is None:
-            raise RuntimeError("Model or input image not loaded. Call load_model() and load_image() first.")
-            
-        try:
-            # Clamp coordinates to valid range
-            x = max(-0.1, min(0.1, x))
-            y = max(-0.1, min(0.1, y))
-            z = max(-0.1, min(0.1, z))
-            
-            # Get camera pose for the desired viewpoint
-            pose = self._get_position_vector(x, y, z)
-            
-            # Initialize or reinitialize renderer if needed
-            if not self._renderer_initialized:
-                self._initialize_renderer()
-            
-            # Render the new view
-            with torch.no_grad():
-                h, w = self.img_input.shape[-2:]
-                print(f"Rendering view with dimensions: {h}x{w}")
-                print(f"MPI data shape: {self.mpi_data.shape}")
-                print(f"MPI disparity shape: {self.mpi_disp.shape}")
-                
-                # Ensure data is in the correct format
-                mpi_data = self.mpi_data.cpu().contiguous()
-                mpi_disp = self.mpi_disp.cpu().contiguous()
-                pose = pose.cpu().contiguous()
-                K = self.K.cpu().contiguous()
-                sx = self.tile_data["sx"].cpu().contiguous()
-                sy = self.tile_data["sy"].cpu().contiguous()
-                
-                try:
-                    rendered_view = self.renderer(
-                        mpi_data,
-                        mpi_disp,
-                        pose,
-                        K,
-                        sx,
-                        sy
-                    )
-                except OpenGL.error.GLError as gl_error:
-                    print("OpenGL error occurred, attempting to reinitialize renderer...")
-                    self._renderer_initialized = False
-                    self._initialize_renderer()
-                    rendered_view = self.renderer(
-                        mpi_data,
-                        mpi_disp,
-                        pose,
-                        K,
-                        sx,
-                        sy
-                    )
-                
-                # Convert numpy array to PIL image
-                rendered_view = rendered_view[0]
-                rendered_img = Image.fromarray(
-                    (np.clip(rendered_view, 0, 1) * 255).astype(np.uint8)
-                )
-            
-            # Resize if needed
-            if scale != 1:
-                rendered_img = rendered_img.resize(
-                    (int(rendered_img.width * scale), int(rendered_img.height * scale)), 
-                    Image.LANCZOS
-                )
-                
-            return rendered_img
+        if self.render_buffers is None:
+            raise RuntimeError("MPI not available. Call load_model() and load_image() first.")
             
-        except Exception as e:
-            print(f"Error generating view: {str(e)}")
-            traceback.print_exc()
+        # Clamp coordinates to valid range
+        x = max(-0.1, min(0.1, x))
+        y = max(-0.1, min(0.1, y))
+        z = max(-0.1, min(0.1, z))
+        
+        # Get camera pose for the desired viewpoint
+        pose = self._get_position_vector(x, y, z)
+        
+        # Render the new view
+        rendered_view = self._render_with_recovery(pose)
+        return self._to_frame(rendered_view[0], scale)
+    
+    def generate_views(self, poses, scale=1, batch_size=None):
+        """
+        Generate novel views of several camera positions.
+        
+        The views share the renderer setup and the depth sorted MPI. The torch renderer also warps
+        several poses in one pass: by default GPU_BATCH_SIZE on a CUDA device, where that is faster,
+        and one on CPUs, where the warp is memory bound and batches are not. The OpenGL renderer
+        always renders one pose at a time.
+        
+        Args:
+            poses (list): (x, y, z) camera positions
+            scale (int): Scale factor for the output image size
+            batch_size (int, optional): Largest number of poses the torch renderer warps in one pass
             
-            # Create a fallback error image
-            error_img = Image.new('RGB', (self.width, self.height), color='red')
-            return error_img
+        Returns:
+            list: Generated views, as returned by generate_view()
+        """
+        if self.render_buffers is None:
+            raise RuntimeError("MPI not available. Call load_model() and load_image() first.")
+        
+        if not self._renderer_initialized:
+            self._initialize_renderer()
+        if self.active_backend == "gl":
+            return [self.generate_view(x, y, z, scale=scale) for x, y, z in poses]
+        if batch_size is None:
+            batch_size = GPU_BATCH_SIZE if DEVICE.type == "cuda" else 1
+        
+        frames = []
+        for start in range(0, len(poses), batch_size):
+            pose = torch.cat([
+                self._get_position_vector(max(-0.1, min(0.1, x)), max(-0.1, min(0.1, y)), max(-0.1, min(0.1, z)))
+                for x, y, z in poses[start:start + batch_size]
+            ])
+            rendered_views = self._render_with_recovery(pose)
+            frames.extend(self._to_frame(rendered_view, scale) for rendered_view in rendered_views)
+        return frames
 
     def __del__(self):
         """Cleanup when the object is destroyed"""
         if self.renderer is not None:
             try:
-                self.renderer.cleanup()  # Assuming cleanup method exists in TMPIRendererGL
+                self.renderer.cleanup()
             except:
                 pass
 
@@ -404,4 +595,4 @@ if __name__ == "__main__":
     
     # Generate a view
     novel_view = vista.generate_view(0, 0, 0)
-    novel_view.show()
+    Image.fromarray(novel_view).show()
@@ -0,0 +1,63 @@
+"""
+TMPI Renderer Comparison
+
+Renders the same views of an image with TMPIRendererGL and TMPIRendererCPU and reports how far
+apart they are, together with the render time of each backend. Needs an OpenGL context.
+
+Usage:
+    python compare_renderers.py --image ./test_data/0001.jpg
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import torch
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from VISTA_Q import VISTA_Q
+from tmpi_renderer_cpu import TMPIRendererCPU, compare_outputs
+
+
+def render_views(vista, poses):
+    """Render a list of poses with the current renderer of an adapter, returning the views and the median time in ms"""
+    views, times = [], []
+    for pose in poses:
+        start_time = time.perf_counter()
+        views.append(vista._render(pose)[0])
+        times.append((time.perf_counter() - start_time) * 1000)
+    return views, float(np.median(times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the OpenGL and CPU TMPI renderers')
+    parser.add_argument('--image', type=str, required=True, help='Input image')
+    parser.add_argument('--steps', type=int, default=5, help='Poses per axis, spread over -0.1 to 0.1')
+    parser.add_argument('--render_threads', type=int, default=None, help='Torch threads of the CPU renderer')
+
+    args = parser.parse_args()
+
+    vista = VISTA_Q(renderer="gl")
+    if not vista.load_model() or not vista.load_image(args.image):
+        sys.exit(1)
+
+    offsets = np.linspace(-0.1, 0.1, args.steps)
+    poses = [vista._get_position_vector(x, y, 0) for x in offsets for y in offsets]
+
+    with torch.no_grad():
+        vista._initialize_renderer()
+        gl_views, gl_ms = render_views(vista, poses)
+
+        h, w = vista.image_size
+        vista.renderer = TMPIRendererCPU(h, w, num_threads=args.render_threads)
+        cpu_views, cpu_ms = render_views(vista, poses)
+
+    results = [compare_outputs(gl_view, cpu_view) for gl_view, cpu_view in zip(gl_views, cpu_views)]
+    print(f"Views: {len(poses)}\tGL: {gl_ms:.1f} ms\tCPU: {cpu_ms:.1f} ms")
+    print(f"Max abs diff: {max(r['max_abs'] for r in results):.4f}\t"
+          f"Mean abs diff: {np.mean([r['mean_abs'] for r in results]):.4f}\t"
+          f"Min PSNR: {min(r['psnr'] for r in results):.2f} dB")
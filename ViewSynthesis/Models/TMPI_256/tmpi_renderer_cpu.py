@@ -0,0 +1,214 @@
+"""
+TMPI CPU Renderer
+
+Software backend for rendering a tiled MPI, a drop-in alternative to TMPIRendererGL for machines
+without an OpenGL context (headless servers, CI, GPU-less compute nodes).
+
+Every plane of every tile is a fronto-parallel quad at depth 1 / disparity in the source camera.
+For a target pose G_tgt_src = [R | t] (same convention as AdaMPI's homography sampler) the target
+pixels of a plane are mapped back into its tile with the inverse of
+
+    H = K (R + t n^T / d) K^-1,    n = (0, 0, 1)
+
+All quads are warped in one batched grid_sample, each into a window of the target image around
+its tile. The planes of a tile are over-composited back to front, and overlapping tiles are
+blended by their composited opacity. Torch runs these ops on all CPU cores, or on the GPU when a
+CUDA device is given; there several poses per pass (one batched warp) pay off, while on CPUs the
+warp is memory bound and one pose per pass is as fast.
+
+The planes are sorted by depth once per MPI and kept for the following views, only the pose
+dependent warp and compositing run per view. The sorted planes are reused only while the very same
+tensors are passed, unmodified: a new MPI allocated where a freed one lived is a different object,
+and in-place updates bump the tensor's version counter.
+"""
+
+import weakref
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+
+class TMPIRendererCPU:
+    def __init__(self, height, width, num_threads=None, max_window=None, device=None):
+        """
+        Initialize the CPU renderer.
+
+        Args:
+            height (int): Height of the rendered image
+            width (int): Width of the rendered image
+            num_threads (int, optional): Torch intra-op threads, defaults to torch's setting (all cores)
+            max_window (int, optional): Largest target window a tile may be warped into, defaults to the image size
+            device (str, optional): Torch device to render on, defaults to the device of the MPI passed in
+        """
+        self.height = height
+        self.width = width
+        self.max_window = max_window or max(height, width)
+        self.device = torch.device(device) if device is not None else None
+        self._prepared_refs = None
+        self._prepared_versions = None
+        self._prepared = None
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+    def cleanup(self):
+        """Release the prepared MPI, kept for parity with TMPIRendererGL"""
+        self._prepared_refs = None
+        self._prepared_versions = None
+        self._prepared = None
+
+    def _is_prepared(self, mpi_data, mpi_disp):
+        """Check whether the prepared planes belong to these tensors, in their current version"""
+        if self._prepared_refs is None:
+            return False
+        data_ref, disp_ref = self._prepared_refs
+        return (data_ref() is mpi_data and disp_ref() is mpi_disp
+                and self._prepared_versions == (mpi_data._version, mpi_disp._version))
+
+    def _prepare(self, mpi_data, mpi_disp):
+        """
+        Tiles and depths of an MPI with the planes of every tile sorted near to far, reused while the
+        same MPI is rendered.
+
+        Returns:
+            tuple: (tiles [B, N, D, 4, t, t] as float, depth [B, N, D])
+        """
+        if not self._is_prepared(mpi_data, mpi_disp):
+            # Uploaded once per MPI when rendering on another device
+            device = self.device or mpi_data.device
+            tiles = mpi_data.to(device, non_blocking=True).float()
+            depth = 1.0 / mpi_disp.to(device, torch.float32).clamp(min=1e-6)
+            depth, order = torch.sort(depth, dim=-1)  # near first
+            tiles = torch.gather(tiles, 2, order[..., None, None, None].expand(mpi_data.shape))
+            self._prepared = (tiles, depth)
+            # Weak references, so the renderer does not keep a replaced MPI alive
+            self._prepared_refs = (weakref.ref(mpi_data), weakref.ref(mpi_disp))
+            self._prepared_versions = (mpi_data._version, mpi_disp._version)
+        return self._prepared
+
+    def __call__(self, mpi_data, mpi_disp, pose, K, sx, sy):
+        """
+        Render target views of a tiled MPI.
+
+        Args:
+            mpi_data: Tile MPIs [B, N, D, 4, t, t], RGBA in [0, 1]
+            mpi_disp: Disparity of every tile plane [B, N, D]
+            pose: Target poses G_tgt_src [P, 4, 4]; P may be a multiple of B to render several views of one MPI
+            K: Intrinsics of the full image [1, 3, 3] or [B, 3, 3]
+            sx: Tile x origins [N]
+            sy: Tile y origins [N]
+
+        Returns:
+            np.ndarray: Rendered views [P, H, W, 3] in [0, 1]
+        """
+        with torch.no_grad():
+            return self.render(mpi_data, mpi_disp, pose, K, sx, sy).cpu().numpy()
+
+    def render(self, mpi_data, mpi_disp, pose, K, sx, sy):
+        """Same as __call__, but returns a float tensor [P, H, W, 3]"""
+        mpi_data, depth = self._prepare(mpi_data, mpi_disp)
+        b, n, d, c, t = mpi_data.shape[:5]
+        num_views = pose.shape[0]
+        if num_views % b != 0:
+            raise ValueError(f"{num_views} poses cannot be rendered from a batch of {b} MPIs")
+        repeat = num_views // b
+        dtype = mpi_data.dtype
+        device = mpi_data.device
+
+        pose = pose.to(device, dtype)
+        K = K.to(device, dtype).expand(b, 3, 3).repeat_interleave(repeat, 0)
+        K_inv = torch.inverse(K)
+        sx = sx.to(device, dtype).reshape(-1)
+        sy = sy.to(device, dtype).reshape(-1)
+        depth = depth.repeat_interleave(repeat, 0)  # [P, N, D]
+
+        # Forward homography of every plane, source image pixels -> target image pixels [P, N, D, 3, 3]
+        R = pose[:, :3, :3]
+        T = pose[:, :3, 3:]
+        normal = torch.tensor([[0.0, 0.0, 1.0]], device=device, dtype=dtype)
+        plane_motion = (T @ normal)[:, None, None] / depth[..., None, None]
+        H = K[:, None, None] @ (R[:, None, None] + plane_motion) @ K_inv[:, None, None]
+        H_inv = torch.inverse(H)
+
+        # Target window of every tile: bounding box of its warped corners over all its planes
+        corners = torch.tensor([[0, 0], [t, 0], [0, t], [t, t]], device=device, dtype=dtype)
+        corners = torch.stack([corners[:, 0] + sx[:, None], corners[:, 1] + sy[:, None]], -1)  # [N, 4, 2]
+        corners = torch.cat([corners, torch.ones_like(corners[..., :1])], -1)
+        warped = (H[..., None, :, :] @ corners[None, :, None, :, :, None]).squeeze(-1)  # [P, N, D, 4, 3]
+        warped = warped[..., :2] / warped[..., 2:].clamp(min=1e-6)
+        low = warped.flatten(2, 3).amin(2).floor()  # [P, N, 2]
+        high = warped.flatten(2, 3).amax(2).ceil()
+        window = int(min(self.max_window, max(1, (high - low).max().item())))
+        origin = low.long()
+
+        # Target pixel centers of every window [P, N, win * win, 3]
+        offsets = torch.arange(window, device=device, dtype=dtype) + 0.5
+        grid_y, grid_x = torch.meshgrid(offsets, offsets, indexing="ij")
+        pixels_x = origin[..., 0, None].to(dtype) + grid_x.reshape(1, 1, -1)
+        pixels_y = origin[..., 1, None].to(dtype) + grid_y.reshape(1, 1, -1)
+        pixels = torch.stack([pixels_x, pixels_y, torch.ones_like(pixels_x)], -1)
+
+        # Map them back into every plane of the tile, in normalized tile coordinates
+        source = pixels[:, :, None] @ H_inv.transpose(-1, -2)  # [P, N, D, win * win, 3]
+        source = source[..., :2] / source[..., 2:].clamp(min=1e-6)
+        origin_src = torch.stack([sx, sy], -1)[None, :, None, None]
+        grid = (source - origin_src) / t * 2 - 1
+
+        # One batched warp of all quads; outside its quad a plane is transparent. The windows of all
+        # views of a quad are stacked along the grid height, so the MPI is not copied per view.
+        grid = grid.reshape(b, repeat, n, d, window, window, 2).permute(0, 2, 3, 1, 4, 5, 6)
+        grid = grid.reshape(b * n * d, repeat * window, window, 2)
+        tiles = mpi_data.reshape(b * n * d, c, t, t)
+        sampled = F.grid_sample(tiles, grid, mode="bilinear", padding_mode="zeros", align_corners=False)
+        sampled = sampled.reshape(b, n, d, c, repeat, window, window).permute(0, 4, 1, 2, 3, 5, 6)
+        sampled = sampled.reshape(num_views, n, d, c, window, window)
+
+        # Over-composite the planes of each tile, far to near (they are sorted near first)
+        rgb, alpha = sampled[:, :, :, :3], sampled[:, :, :, 3:4]
+        transmittance = torch.cumprod(torch.cat([torch.ones_like(alpha[:, :, :1]), 1 - alpha[:, :, :-1]], 2), 2)
+        weight = alpha * transmittance
+        tile_rgb = (rgb * weight).sum(2)  # [P, N, 3, win, win], premultiplied
+        tile_alpha = weight.sum(2)  # [P, N, 1, win, win]
+
+        # Blend overlapping tiles by opacity into the target image
+        return self._merge_tiles(tile_rgb, tile_alpha, origin, window)
+
+    def _merge_tiles(self, tile_rgb, tile_alpha, origin, window):
+        """Accumulate the premultiplied tile windows into the target images and normalize by opacity"""
+        num_views, n = tile_rgb.shape[:2]
+        h, w = self.height, self.width
+        device = tile_rgb.device
+
+        steps = torch.arange(window, device=device)
+        rows = origin[..., 1, None, None] + steps[:, None]  # [P, N, win, 1]
+        cols = origin[..., 0, None, None] + steps[None, :]  # [P, N, 1, win]
+        inside = ((rows >= 0) & (rows < h) & (cols >= 0) & (cols < w)).reshape(-1)
+        view = torch.arange(num_views, device=device)[:, None, None, None]
+        index = (view * (h * w) + rows * w + cols).reshape(-1)[inside]
+
+        weighted = torch.cat([tile_rgb, tile_alpha], 2)  # [P, N, 4, win, win]
+        weighted = weighted.permute(0, 1, 3, 4, 2).reshape(-1, 4)[inside]
+        accumulated = torch.zeros(num_views * h * w, 4, device=device, dtype=tile_rgb.dtype)
+        accumulated.index_add_(0, index, weighted)
+
+        accumulated = accumulated.reshape(num_views, h, w, 4)
+        return accumulated[..., :3] / accumulated[..., 3:].clamp(min=1e-6)
+
+
+def compare_outputs(reference, result):
+    """
+    Compare two rendered views, e.g. of TMPIRendererGL and TMPIRendererCPU.
+
+    Args:
+        reference (np.ndarray): Reference view [H, W, 3] in [0, 1]
+        result (np.ndarray): View to compare [H, W, 3] in [0, 1]
+
+    Returns:
+        dict: Maximum and mean absolute difference and PSNR in dB
+    """
+    difference = np.abs(np.clip(reference, 0, 1) - np.clip(result, 0, 1))
+    mse = float(np.mean(difference ** 2))
+    return {
+        "max_abs": float(difference.max()),
+        "mean_abs": float(difference.mean()),
+        "psnr": float("inf") if mse == 0 else float(10 * np.log10(1.0 / mse)),
+    }
@@ -0,0 +1,124 @@
+"""
+TMPI Tiling
+
+Splits the source disparity and RGB images into the overlapping tiles the TMPI network predicts
+its MPIs for. The tiles are taken as strided views of the padded images (Tensor.unfold) and the
+per-tile intrinsics are computed in one batched op, so the cost no longer grows with a Python
+loop over the tiles as the input resolution increases.
+"""
+
+import torch
+import torch.nn.functional as F
+
+
+def tile_origins(h, w, tile_sz, pad_sz):
+    """
+    Compute the top-left corner of every tile, row by row.
+
+    Args:
+        h (int): Image height
+        w (int): Image width
+        tile_sz (int): Tile size
+        pad_sz (int): Overlap between neighbouring tiles
+
+    Returns:
+        Tuple of (sx, sy) 1D tensors with one entry per tile
+    """
+    stride = tile_sz - pad_sz
+    sy, sx = torch.meshgrid(
+        torch.arange(0, h, stride),
+        torch.arange(0, w, stride),
+        indexing="ij"
+    )
+    return sx.reshape(-1), sy.reshape(-1)
+
+
+def tile_views(image, tile_sz, pad_sz):
+    """
+    Take the tiles of an image as strided views, without copying.
+
+    Args:
+        image: Image tensor of shape [B, C, H, W]
+        tile_sz (int): Tile size
+        pad_sz (int): Overlap between neighbouring tiles
+
+    Returns:
+        View of shape [B, C, rows, cols, tile_sz, tile_sz]
+    """
+    h, w = image.shape[-2:]
+    stride = tile_sz - pad_sz
+    rows = (h + stride - 1) // stride
+    cols = (w + stride - 1) // stride
+
+    # Replicate the border so that the last row and column of tiles are complete
+    image = F.pad(image, (0, tile_sz, 0, tile_sz), 'replicate')
+    tiles = image.unfold(2, tile_sz, stride).unfold(3, tile_sz, stride)
+    return tiles[:, :, :rows, :cols]
+
+
+def create_tiles(src_disp, src_rgb, K, tile_sz, pad_sz):
+    """
+    Create tiles from source depth and RGB images.
+
+    Args:
+        src_disp: Source disparity map [B, 1, H, W]
+        src_rgb: Source RGB image [B, 3, H, W]
+        K: Camera intrinsics matrix [B, 3, 3]
+        tile_sz: Tile size
+        pad_sz: Padding size
+
+    Returns:
+        Tuple of (src_disp_tiles, src_rgb_tiles, K_tiles, sx, sy)
+    """
+    bs, _, h, w = src_disp.shape
+    sx, sy = tile_origins(h, w, tile_sz, pad_sz)
+    num_tiles = sx.shape[0]
+
+    def stack_tiles(image):
+        # [B, C, rows, cols, t, t] -> [B, rows * cols, C, t, t], the only copy of the tile data
+        tiles = tile_views(image, tile_sz, pad_sz).permute(0, 2, 3, 1, 4, 5)
+        return tiles.reshape(bs, num_tiles, image.shape[1], tile_sz, tile_sz)
+
+    # Shift the principal point of every tile at once
+    K_tiles = K.unsqueeze(1).repeat(1, num_tiles, 1, 1)
+    K_tiles[:, :, 0, 2] -= sx.to(K.device, K.dtype)
+    K_tiles[:, :, 1, 2] -= sy.to(K.device, K.dtype)
+
+    sx = sx.unsqueeze(0).expand(bs, -1)
+    sy = sy.unsqueeze(0).expand(bs, -1)
+    return stack_tiles(src_disp), stack_tiles(src_rgb), K_tiles, sx, sy
+
+
+def create_tiles_loop(src_disp, src_rgb, K, tile_sz, pad_sz):
+    """
+    Reference implementation of create_tiles() with one Python iteration per tile.
+
+    Kept for the tiling benchmark and to check create_tiles() against.
+    """
+    bs, _, h, w = src_disp.shape
+
+    sy = torch.arange(0, h, tile_sz - pad_sz)
+    sx = torch.arange(0, w, tile_sz - pad_sz)
+
+    src_disp = F.pad(src_disp, (0, tile_sz, 0, tile_sz), 'replicate')
+    src_rgb = F.pad(src_rgb, (0, tile_sz, 0, tile_sz), 'replicate')
+
+    K_, src_disp_, src_rgb_, sx_, sy_ = [], [], [], [], []
+    for y in sy:
+        for x in sx:
+            l, r, t, b = x, x + tile_sz, y, y + tile_sz
+            Ki = K.clone()
+            Ki[:, 0, 2] = Ki[:, 0, 2] - x
+            Ki[:, 1, 2] = Ki[:, 1, 2] - y
+
+            K_.append(Ki)
+            src_disp_.append(src_disp[:, :, t:b, l:r])
+            src_rgb_.append(src_rgb[:, :, t:b, l:r])
+            sx_.append(x)
+            sy_.append(y)
+
+    src_rgb_ = torch.stack(src_rgb_, 1)
+    src_disp_ = torch.stack(src_disp_, 1)
+    K_ = torch.stack(K_, 1)
+    sx_, sy_ = torch.tensor(sx_).unsqueeze(0).expand(bs, -1), torch.tensor(sy_).unsqueeze(0).expand(bs, -1)
+    return src_disp_, src_rgb_, K_, sx_, sy_
@@ -1,4 +1,5 @@
 import os
+import time
 import numpy as np
 import traceback
 from PIL import Image
@@ -16,20 +17,87 @@ Required methods:
 - generate_view(): Generate new views based on camera position
 
 Each method should include proper error handling as demonstrated below.
+
+Synthetic mode:
+Without a checkpoint, the template can stand in for a heavy model in GUI and pipeline performance
+tests. Pass synthetic=True or set the environment variable VISTA_Q_SYNTHETIC (which also applies
+when the toolkit constructs VISTA_Q() without arguments), e.g.
+
+    VISTA_Q_SYNTHETIC="latency_ms=40,latency_mode=busy,memory_mb=1024,height=512,width=512"
+
+latency_ms is added to every generate_view() call, memory_mb is allocated by load_model(), and
+height/width set the rendered resolution. With latency_mode=busy (the default) the latency is spent
+spinning in Python, holding the GIL like a CPU-bound model would; latency_mode=sleep releases it.
 """
 
+# Environment variable enabling the synthetic mode, see above
+SYNTHETIC_ENV = "VISTA_Q_SYNTHETIC"
+LATENCY_MODES = ("busy", "sleep")
+
+
+def parse_synthetic_spec(spec):
+    """
+    Parse a synthetic mode specification such as "latency_ms=40,memory_mb=1024".
+
+    Args:
+        spec (str): Comma-separated key=value pairs (latency_ms, latency_mode, memory_mb, height, width)
+
+    Returns:
+        dict: The parsed values
+    """
+    options = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key not in ("latency_ms", "latency_mode", "memory_mb", "height", "width"):
+            raise ValueError(f"Unknown synthetic option: {key}")
+        if key == "latency_mode":
+            value = value.strip()
+            if value not in LATENCY_MODES:
+                raise ValueError(f"Unknown synthetic latency mode: {value}, expected one of {LATENCY_MODES}")
+            options[key] = value
+        else:
+            options[key] = float(value) if key == "latency_ms" else int(value)
+    return options
+
+
 class VISTA_Q:
-    def __init__(self, height=256, width=256):
+    def __init__(self, height=256, width=256, synthetic=None, latency_ms=0, memory_mb=0, latency_mode="busy"):
         """
         Initialize your model.
         
         Args:
             height (int): Height of the rendered image
             width (int): Width of the rendered image
+            synthetic (bool, optional): Run as a synthetic load adapter without a checkpoint;
+                defaults to whether VISTA_Q_SYNTHETIC is set
+            latency_ms (float): Synthetic cost added to every generate_view() call
+            memory_mb (int): Synthetic memory footprint allocated by load_model()
+            latency_mode (str): "busy" to spend the latency holding the GIL, "sleep" to release it
         """
+        # Synthetic mode settings from the environment override the defaults
+        spec = os.environ.get(SYNTHETIC_ENV)
+        if synthetic is None:
+            synthetic = spec is not None
+        if synthetic and spec:
+            options = parse_synthetic_spec(spec)
+            height = options.get("height", height)
+            width = options.get("width", width)
+            latency_ms = options.get("latency_ms", latency_ms)
+            memory_mb = options.get("memory_mb", memory_mb)
+            latency_mode = options.get("latency_mode", latency_mode)
+        
         self.height = height
         self.width = width
+        self.synthetic = synthetic
+        self.latency = latency_ms / 1000
+        self.latency_mode = latency_mode
+        self.memory_mb = memory_mb
         self.model = None
+        self.img_input = None
         
         # Initialize device - CPU by default
         self.setup_device()
@@ -109,6 +177,12 @@ class VISTA_Q:
             bool: True if model loaded successfully
         """
         try:
+            if self.synthetic:
+                # Hold the configured amount of memory, touched so it is resident
+                self.model = np.ones(self.memory_mb * 1024 * 1024, dtype=np.uint8)
+                print(f"Synthetic model loaded: {self.memory_mb} MB, {self.latency * 1000:.0f} ms per view ({self.latency_mode})")
+                return True
+            
             # Resolve checkpoint path
             checkpoint_path = self.resolve_checkpoint_path(checkpoint_path)
             
@@ -120,6 +194,7 @@ class VISTA_Q:
             
             # Placeholder for template
             print(f"Model would load from: {checkpoint_path}")
+            self.model = checkpoint_path
             return True
             
         except Exception as e:
@@ -127,12 +202,23 @@ class VISTA_Q:
             traceback.print_exc()
             return False
     
-    def load_image(self, image_path):
+    def memory_footprint(self):
+        """
+        Optional: memory held by the loaded model, used by the toolkit's model pool budget.
+        
+        Returns:
+            int: Size in bytes
+        """
+        return self.model.nbytes if isinstance(self.model, np.ndarray) else 0
+    
+    def load_image(self, image_path, disp_path=None):
         """
         Load and preprocess an input image.
         
         Args:
             image_path (str): Path to the input image
+            disp_path (str, optional): Precomputed disparity map. Models that need depth read it with
+                vista_q_depth.load_disparity(), or get it from vista_q_depth.get_depth_service() when None
             
         Returns:
             bool: True if image loaded successfully
@@ -173,9 +259,10 @@ class VISTA_Q:
             scale (int): Scale factor for the output image size
             
         Returns:
-            PIL.Image: Generated view as a PIL image
+            np.ndarray: Generated view as a uint8 array (H, W, 3); a PIL image is accepted as well
         """
         try:
+            start_time = time.perf_counter()
             if self.model is None or self.img_input is None:
                 raise RuntimeError("Model or input image not loaded. Call load_model() and load_image() first.")
                 
@@ -195,19 +282,28 @@ class VISTA_Q:
             if scale != 1:
                 width, height = width * scale, height * scale
                 
-            # Create a simple gradient image just for the template
-            img = Image.new('RGB', (width, height))
-            pixels = img.load()
-            
+            # Create a simple gradient image just for the template, vectorized over columns (i) and rows (j)
             red_offset = int((x + 0.1) * 128)
             green_offset = int((y + 0.1) * 128)
             
-            for i in range(width):
-                for j in range(height):
-                    r = min(255, (i * 256) // width + red_offset)
-                    g = min(255, (j * 256) // height + green_offset)
-                    b = min(255, (i + j) * 128 // (width + height))
-                    pixels[i, j] = (r, g, b)
+            i = np.arange(width)[None, :]
+            j = np.arange(height)[:, None]
+            img = np.empty((height, width, 3), dtype=np.uint8)
+            img[..., 0] = np.minimum(255, (i * 256) // width + red_offset)
+            img[..., 1] = np.minimum(255, (j * 256) // height + green_offset)
+            img[..., 2] = np.minimum(255, (i + j) * 128 // (width + height))
+            
+            # Synthetic cost: spend the rest of the configured latency
+            if self.synthetic and self.latency > 0:
+                deadline = start_time + self.latency
+                if self.latency_mode == "sleep":
+                    remaining = deadline - time.perf_counter()
+                    if remaining > 0:
+                        time.sleep(remaining)
+                else:
+                    # Pure Python loop, so the GIL is held as by a CPU-bound model
+                    while time.perf_counter() < deadline:
+                        pass
             
             return img
             
@@ -249,4 +345,4 @@ if __name__ == "__main__":
     
     # Generate a view
     novel_view = vista.generate_view(0, 0, 0)
-    novel_view.show() 
\ No newline at end of file
+    Image.fromarray(novel_view).show()
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""
+VISTA-Q: Benchmark
+
+Measures VISTA_Q adapters outside the GUIs. Every adapter in ./Models/*/VISTA_Q.py (and the template
+adapter as a baseline) is imported the same way as the GUIs load it and timed phase by phase:
+
+    import        executing VISTA_Q.py, including the adapter's own imports
+    construct     VISTA_Q()
+    load_model    loading the weights
+    load_image    loading the image (depth estimation, MPI generation, ...)
+    generate_view rendering a sweep over the pose cube, after a few warm-up views
+    generate_views the same sweep in batches of --batch poses (generate_views() of the adapter, or
+                  its per-pose fallback)
+
+Each adapter runs in a fresh process, so that import costs and peak memory are its own. The template
+adapter runs in its synthetic mode (--template_synthetic), which needs no checkpoint. Results are
+written as JSON; pass an earlier result file with --compare to print the change of every phase.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import traceback
+import multiprocessing
+import numpy as np
+from vista_q_loader import model_search_path, import_adapter_file, adapter_module_name, construct_adapter
+from vista_q_manifest import discover_models, entry_point
+from vista_q_pose import POSE_LIMIT
+from vista_q_frames import frame_size, generate_views
+
+TEMPLATE_ADAPTER = "./Templates/VISTA_Q_template.py"
+# CPU-bound by default, so the baseline holds the GIL like a real model
+DEFAULT_TEMPLATE_SYNTHETIC = "latency_ms=40,latency_mode=busy"
+PHASES = ("import", "construct", "load_model", "load_image", "generate_view", "generate_views")
+# Phases reported per rendered view
+VIEW_PHASES = ("generate_view", "generate_views")
+
+
+def discover_adapters(models_dir="./Models", include_template=True):
+    """
+    Find the adapters of all model folders.
+
+    Args:
+        models_dir (str): Directory holding the model folders
+        include_template (bool): Add the template adapter as a baseline
+
+    Returns:
+        list: (name, model_folder, module_path) tuples
+    """
+    adapters = []
+    for manifest in discover_models(models_dir):
+        adapters.append((manifest["name"], manifest["model_folder"], entry_point(manifest)[0]))
+    if include_template and os.path.isfile(TEMPLATE_ADAPTER):
+        adapters.append(("Template", os.path.dirname(TEMPLATE_ADAPTER), TEMPLATE_ADAPTER))
+    return adapters
+
+
+def pose_sweep(shape=(5, 5, 3), limit=POSE_LIMIT):
+    """Poses of a regular lattice over the pose cube, in x-fastest order"""
+    axes = [np.linspace(-limit, limit, count) if count > 1 else np.zeros(1) for count in shape]
+    return [(float(x), float(y), float(z)) for z in axes[2] for y in axes[1] for x in axes[0]]
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, None where it cannot be queried"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def torch_memory_stats():
+    """Allocator statistics of torch, if the adapter imported it"""
+    torch = sys.modules.get('torch')
+    if torch is None:
+        return None
+    stats = {"version": torch.__version__, "num_threads": torch.get_num_threads()}
+    if torch.cuda.is_available():
+        stats.update({
+            "cuda_max_allocated": torch.cuda.max_memory_allocated(),
+            "cuda_max_reserved": torch.cuda.max_memory_reserved(),
+            "cuda_allocated": torch.cuda.memory_allocated(),
+        })
+    return stats
+
+
+def summarize_times(seconds):
+    """Mean, min and percentiles of a list of durations, in milliseconds"""
+    values = np.array(seconds) * 1000
+    return {
+        "count": len(values),
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+    }
+
+
+def benchmark_adapter(name, model_folder, module_path, image_path, sweep=(5, 5, 3), warmup=3, scale=1, environment=None,
+                      batch_size=8):
+    """
+    Time the phases of one adapter. Runs in its own process.
+
+    Args:
+        name (str): Name of the adapter in the results
+        model_folder (str): Directory of the adapter
+        module_path (str): Path to the adapter's .py file
+        image_path (str): Input image
+        sweep (tuple): Number of poses along x, y and z
+        warmup (int): Views rendered before the sweep is timed
+        scale (int): Scale factor passed to generate_view()
+        environment (dict, optional): Environment variables set before the adapter is imported
+        batch_size (int): Poses per generate_views() call
+
+    Returns:
+        dict: Phase times in milliseconds, memory statistics and the error that stopped the run, if any
+    """
+    os.environ.update(environment or {})
+    result = {"name": name, "model_folder": model_folder, "phases": {}, "error": None}
+    phases = result["phases"]
+    image_path = os.path.abspath(image_path)
+
+    def timed(phase, function):
+        start_time = time.perf_counter()
+        value = function()
+        phases[phase] = (time.perf_counter() - start_time) * 1000
+        return value
+
+    try:
+        with model_search_path(model_folder):
+            module = timed("import", lambda: import_adapter_file(module_path, adapter_module_name(model_folder)))
+            model = timed("construct", lambda: construct_adapter(module, model_folder))
+            if timed("load_model", lambda: model.load_model()) is False:
+                raise RuntimeError("load_model() failed")
+            if timed("load_image", lambda: model.load_image(image_path)) is False:
+                raise RuntimeError(f"load_image() failed for {image_path}")
+
+            for _ in range(warmup):
+                model.generate_view(0, 0, 0, scale=scale)
+            view_times = []
+            for x, y, z in pose_sweep(sweep):
+                start_time = time.perf_counter()
+                frame = model.generate_view(x, y, z, scale=scale)
+                view_times.append(time.perf_counter() - start_time)
+            phases["generate_view"] = summarize_times(view_times)
+            result["frame_size"] = list(frame_size(frame))
+            result["fps"] = len(view_times) / sum(view_times)
+
+            poses = pose_sweep(sweep)
+            batch_times = []
+            for start in range(0, len(poses), batch_size):
+                batch = poses[start:start + batch_size]
+                start_time = time.perf_counter()
+                generate_views(model, batch, scale=scale)
+                batch_times.extend([(time.perf_counter() - start_time) / len(batch)] * len(batch))
+            phases["generate_views"] = summarize_times(batch_times)
+            result["batched"] = hasattr(model, 'generate_views')
+    except Exception as e:
+        result["error"] = str(e)
+        traceback.print_exc()
+
+    result["peak_rss_bytes"] = peak_rss_bytes()
+    result["torch"] = torch_memory_stats()
+    return result
+
+
+def phase_ms(result, phase):
+    """Duration of a phase in milliseconds (mean per view for the view phases), None if not reached"""
+    value = result["phases"].get(phase)
+    if isinstance(value, dict):
+        return value["mean"]
+    return value
+
+
+def compare_results(current, baseline):
+    """
+    Print the change of every phase against an earlier run.
+
+    Args:
+        current (dict): Results of this run
+        baseline (dict): Results of an earlier run
+    """
+    baseline_by_name = {result["name"]: result for result in baseline["adapters"]}
+    for result in current["adapters"]:
+        previous = baseline_by_name.get(result["name"])
+        if previous is None:
+            print(f"{result['name']}: not in the baseline")
+            continue
+        print(f"{result['name']}:")
+        for phase in PHASES:
+            now, before = phase_ms(result, phase), phase_ms(previous, phase)
+            if now is None or before is None:
+                continue
+            change = (now - before) / before * 100 if before > 0 else 0.0
+            print(f"  {phase:<14} {before:10.2f} ms -> {now:10.2f} ms  ({change:+.1f}%)")
+
+
+def run_benchmark(adapters, image_path, sweep=(5, 5, 3), warmup=3, scale=1, template_synthetic=DEFAULT_TEMPLATE_SYNTHETIC, batch_size=8):
+    """
+    Benchmark adapters, each in a fresh process.
+
+    Args:
+        adapters (list): (name, model_folder, module_path) tuples, see discover_adapters()
+        image_path (str): Input image
+        sweep (tuple): Number of poses along x, y and z
+        warmup (int): Views rendered before the sweep is timed
+        scale (int): Scale factor passed to generate_view()
+        template_synthetic (str): Synthetic mode specification of the template adapter, see VISTA_Q_template.py
+        batch_size (int): Poses per generate_views() call
+
+    Returns:
+        dict: Run metadata and one result per adapter
+    """
+    results = []
+    # Spawn keeps CUDA and OpenGL state of one adapter out of the next
+    context = multiprocessing.get_context("spawn")
+    for name, model_folder, module_path in adapters:
+        print(f"Status: Benchmarking {name}")
+        environment = {"VISTA_Q_SYNTHETIC": template_synthetic} if module_path == TEMPLATE_ADAPTER else None
+        with context.Pool(1) as pool:
+            result = pool.apply(benchmark_adapter, (name, model_folder, module_path, image_path, sweep, warmup, scale, environment, batch_size))
+        results.append(result)
+
+        if result["error"]:
+            print(f"Error: {name}: {result['error']}")
+        for phase in PHASES:
+            value = phase_ms(result, phase)
+            if value is not None:
+                unit = "ms per view" if phase in VIEW_PHASES else "ms"
+                print(f"Status: {name} {phase}: {value:.2f} {unit}")
+        if result["peak_rss_bytes"]:
+            print(f"Status: {name} peak RSS: {result['peak_rss_bytes'] / 1024 ** 2:.0f} MB")
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "image_path": image_path,
+        "sweep": list(sweep),
+        "warmup": warmup,
+        "scale": scale,
+        "batch_size": batch_size,
+        "template_synthetic": template_synthetic,
+        "adapters": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='VISTA-Q: Benchmark the phases of VISTA_Q adapters')
+    parser.add_argument('--models_dir', type=str, default='./Models', help='Directory holding the model folders')
+    parser.add_argument('--model', type=str, action='append', default=None, help='Only benchmark this model folder name (repeatable)')
+    parser.add_argument('--no_template', action='store_true', help='Do not benchmark the template adapter as a baseline')
+    parser.add_argument('--image_path', type=str, default='./Images/hill.jpg', help='Input image')
+    parser.add_argument('--sweep', type=int, nargs=3, metavar=('NX', 'NY', 'NZ'), default=[5, 5, 3], help='Number of poses along x, y and z')
+    parser.add_argument('--warmup', type=int, default=3, help='Views rendered before the sweep is timed')
+    parser.add_argument('--scale', type=int, default=1, help='Scale factor passed to generate_view()')
+    parser.add_argument('--batch', type=int, default=8, help='Poses per generate_views() call')
+    parser.add_argument('--template_synthetic', type=str, default=DEFAULT_TEMPLATE_SYNTHETIC, help='Synthetic cost of the template adapter, e.g. "latency_ms=40,latency_mode=busy,memory_mb=1024"')
+    parser.add_argument('--output', type=str, default='./Test_Results/benchmark.json', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', type=str, default=None, help='Print the change against an earlier result file')
+
+    args = parser.parse_args()
+
+    adapters = discover_adapters(args.models_dir, include_template=not args.no_template)
+    if args.model:
+        adapters = [adapter for adapter in adapters if adapter[0] in args.model or adapter[0] == "Template"]
+    if not adapters:
+        print(f"Error: No adapters found in {args.models_dir}")
+        sys.exit(1)
+
+    results = run_benchmark(adapters, args.image_path, tuple(args.sweep), args.warmup, args.scale, args.template_synthetic, args.batch)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Status: Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare_results(results, json.load(f))
+
+    sys.exit(0 if all(result["error"] is None for result in results["adapters"]) else 1)
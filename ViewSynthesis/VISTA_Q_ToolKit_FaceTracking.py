@@ -1,20 +1,26 @@
-import os
 import sys
 import time
-import csv
 import random
-import importlib.util
-import cv2
-import mediapipe as mp
-import numpy as np
-from PIL import Image
-import pandas as pd
 import argparse
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QPushButton, QFrame, QTableWidget, 
                             QTableWidgetItem, QMessageBox, QProgressBar)
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QImage, QPixmap
+from vista_q_mpi_cache import MPICache
+from vista_q_depth import configure_depth_service
+from vista_q_model_pool import ModelPool
+from vista_q_prefetch import SequencePrefetcher
+from vista_q_view_grid import ViewGridStore
+from vista_q_render_worker import RenderWorker
+from vista_q_frame_view import FrameView
+from vista_q_face_pipeline import FaceTrackingPipeline
+from vista_q_pose_filter import HeadPoseFilter
+from vista_q_input_sources import open_input_source, LandmarkTraceSource, LandmarkTraceWriter
+from vista_q_trace import TraceRecorder
+from vista_q_results import ResultWriter
+from vista_q_render_client import RenderClient
+from vista_q_shm import RenderProcess
+from vista_q_instrumentation import Instrumentation
 
 class ModernButton(QPushButton):
     def __init__(self, text, parent=None):
@@ -37,12 +43,23 @@ class ModernButton(QPushButton):
         """)
 
 class ModelVisualizerQTCamera(QMainWindow):
-    def __init__(self, csv_file="./Test_Configs/ViewSynthesis_Test_Sequence.csv", train_mode=False, camera_fps=30, hide_tracking=False):
+    def __init__(self, csv_file="./Test_Configs/ViewSynthesis_Test_Sequence.csv", train_mode=False, camera_fps=30, hide_tracking=False,
+                 mpi_cache_dir="./Cache/MPI/", mpi_cache_mb=2048, depth_cache_dir="./Cache/Depth/", depth_cache_mb=512, baked=False,
+                 model_pool_size=None, model_pool_mb=None, frame_cache_step=None, frame_cache_mb=256,
+                 view_grid=None, view_grid_mode="bilinear", view_grid_dir="./Cache/ViewGrid/", view_grid_mb=8192,
+                 pose_filter="one_euro", filter_min_cutoff=1.0, filter_beta=20.0, dead_band=0.0005, max_prediction=0.1,
+                 input_source=None, realtime_playback=True, record_landmarks=None, record_trace=None,
+                 instrument=False, overlay=False, export_trace=None, results_dir="./Test_Results/",
+                 render_server=None, render_encoding="raw", render_process=False):
         super().__init__()
         self.csv_file = csv_file
         self.train_mode = train_mode
+        self.baked = baked
         self.camera_fps = camera_fps
         self.hide_tracking = hide_tracking
+        self.input_source = input_source
+        self.realtime_playback = realtime_playback
+        self.record_landmarks = record_landmarks
         self.test_id = None
         self.test_sequences = None
         self.current_sequence_idx = 0
@@ -54,6 +71,76 @@ class ModelVisualizerQTCamera(QMainWindow):
         self.start_time = 0
         self.presentation_time = 0
         
+        # On-disk cache of generated MPI layers (disabled when no cache directory is given)
+        self.mpi_cache = MPICache(mpi_cache_dir, mpi_cache_mb * 1024 * 1024) if mpi_cache_dir else None
+        
+        # Disparity maps shared by the adapters, computed once per image
+        configure_depth_service(depth_cache_dir, depth_cache_mb * 1024 * 1024)
+        
+        # Loaded models stay alive across sequences
+        self.model_pool = ModelPool(
+            max_models=model_pool_size,
+            memory_budget_bytes=model_pool_mb * 1024 * 1024 if model_pool_mb else None
+        )
+        
+        # Rendered pose lattices that replace the adapter during the presentation (disabled when no grid shape is given)
+        self.view_grids = ViewGridStore(view_grid_dir, view_grid, mode=view_grid_mode, max_bytes=view_grid_mb * 1024 * 1024) if view_grid else None
+        
+        # Sequences are loaded and rendered by a shared render server, or by a child process that passes
+        # frames through shared memory (both disabled by default)
+        self.render_client = None
+        if render_server:
+            try:
+                self.render_client = RenderClient(render_server, render_encoding)
+            except ConnectionError as e:
+                print(f"Error: {str(e)}")
+                sys.exit(1)
+        elif render_process:
+            self.render_client = RenderProcess(
+                mpi_cache_dir=mpi_cache_dir,
+                mpi_cache_mb=mpi_cache_mb,
+                depth_cache_dir=depth_cache_dir,
+                depth_cache_mb=depth_cache_mb,
+                baked=baked,
+                model_pool_size=model_pool_size,
+                model_pool_mb=model_pool_mb,
+                view_grid=view_grid,
+                view_grid_mode=view_grid_mode,
+                view_grid_dir=view_grid_dir,
+                view_grid_mb=view_grid_mb
+            )
+        
+        # Sequences are loaded on a background thread, the next one while the current one is presented
+        self.prefetcher = SequencePrefetcher(self.model_pool, self.mpi_cache, self.baked, self.view_grids, self.render_client)
+        self.prefetcher.progress.connect(self.on_prefetch_progress)
+        self.prefetcher.finished.connect(self.on_prefetch_finished)
+        self.waiting_sequence_idx = None
+        # Load of a sequence waiting for the render worker to release the previous model
+        self.deferred_load = None
+        
+        # Timing of the hot path (near zero overhead when disabled)
+        self.instrumentation = Instrumentation(enabled=instrument or overlay or bool(export_trace), keep_trace=bool(export_trace))
+        self.overlay = overlay
+        self.export_trace = export_trace
+        
+        # Views are rendered on a worker thread, which only renders the most recent pose
+        self.render_worker = RenderWorker(instrumentation=self.instrumentation)
+        self.render_worker.frame_ready.connect(self.on_frame_ready)
+        self.render_worker.render_failed.connect(self.on_render_failed)
+        self.render_worker.model_released.connect(self.on_model_released)
+        self.render_worker.start()
+        self.pending_initial_view = None
+        
+        # Rendered frames are cached per sequence on a pose grid (disabled when no grid step is given)
+        self.frame_cache_step = frame_cache_step
+        self.frame_cache_mb = frame_cache_mb
+        
+        # Requested poses are recorded for replay (disabled when no trace file is given)
+        self.trace_recorder = TraceRecorder(record_trace) if record_trace else None
+        
+        # Ratings are journaled on a background thread and merged into the results CSV
+        self.result_writer = ResultWriter(results_dir)
+        
         # Rating labels
         self.rating_labels = {
             1: "Bad",
@@ -66,37 +153,73 @@ class ModelVisualizerQTCamera(QMainWindow):
         # Camera and face tracking variables
         self.cap = None
         self.face_mesh = None
+        self.face_pipeline = None
         self.origin_x = None
         self.origin_y = None
         self.origin_z = None
         self.origin_known = False
         self.frame_duration = 1.0 / self.camera_fps
         
+        # Smoothing, latency prediction and dead-band of the tracked head pose
+        self.pose_filter = HeadPoseFilter(
+            pose_filter,
+            min_cutoff=filter_min_cutoff,
+            beta=filter_beta,
+            dead_band=dead_band,
+            max_prediction=max_prediction
+        )
+        self.render_worker.frame_ready.connect(self.pose_filter.on_frame_displayed)
+        
         # Initialize face tracking
         self.setup_face_tracking()
         
         # Set up the UI
         self.setup_ui()
         
+        # Refresh the timing overlay
+        if self.overlay:
+            self.overlay_timer = QTimer()
+            self.overlay_timer.timeout.connect(self.update_overlay)
+            self.overlay_timer.start(500)
+        
         # Show test ID input first
         self.show_test_id_screen()
     
     def setup_face_tracking(self):
         """Initialize face tracking components"""
-        # Initialize MediaPipe Face Detection
-        mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # Open the camera, or a recorded video, image directory or landmark trace
+        try:
+            self.cap = open_input_source(self.input_source, self.camera_fps, self.realtime_playback)
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Could not open input source: {str(e)}")
+            sys.exit(1)
+        if self.input_source is not None:
+            playback = "real time" if self.realtime_playback else "as fast as possible"
+            print(f"Status: Face tracking input {self.input_source} ({playback})")
+        
+        # Initialize MediaPipe Face Detection, landmark traces already hold the tracked positions
+        if not isinstance(self.cap, LandmarkTraceSource):
+            import mediapipe as mp
+            mp_face_mesh = mp.solutions.face_mesh
+            self.face_mesh = mp_face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
         
-        # Initialize video capture
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
-            QMessageBox.critical(self, "Error", "Could not open camera")
-            sys.exit()
+        # Capture, face mesh and rendering run on separate threads
+        self.face_pipeline = FaceTrackingPipeline(
+            self.cap,
+            self.face_mesh,
+            self.on_head_position,
+            draw_tracking=not self.hide_tracking,
+            landmark_recorder=LandmarkTraceWriter(self.record_landmarks) if self.record_landmarks else None,
+            instrumentation=self.instrumentation
+        )
+        self.face_pipeline.preview_ready.connect(self.show_camera_preview)
+        self.render_worker.frame_ready.connect(self.face_pipeline.on_frame_displayed)
     
     def setup_ui(self):
         """Set up the modern user interface"""
@@ -150,8 +273,8 @@ class ModelVisualizerQTCamera(QMainWindow):
         self.progress_label.setVisible(self.train_mode)
         self.main_layout.addWidget(self.progress_label)
         
-        # Image display
-        self.image_label = QLabel()
+        # Image display, paints the rendered frame buffers directly
+        self.image_label = FrameView(instrumentation=self.instrumentation)
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.image_label.setMinimumSize(512, 512)
         self.image_label.setStyleSheet("""
@@ -169,7 +292,7 @@ class ModelVisualizerQTCamera(QMainWindow):
         camera_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # Camera preview
-        self.camera_label = QLabel()
+        self.camera_label = FrameView()
         self.camera_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.camera_label.setMinimumSize(320, 240)
         self.camera_label.setMaximumSize(320, 240)
@@ -277,81 +400,43 @@ class ModelVisualizerQTCamera(QMainWindow):
         # Set window size
         self.resize(800, 900)
         
-        # Start camera update timer
-        self.camera_timer = QTimer()
-        self.camera_timer.timeout.connect(self.update_camera_frame)
-        self.camera_timer.start(int(1000/self.camera_fps))
+        # Start the capture and face tracking threads
+        self.face_pipeline.start()
     
-    def update_camera_frame(self):
-        """Update the camera preview and process face tracking"""
-        if not self.cap or not self.timer_running:
+    def on_head_position(self, x, y, z, capture_time, sample_time):
+        """
+        Turn a tracked nose tip position into a view request.
+        
+        Called on the landmark thread of the face tracking pipeline.
+        """
+        if not self.timer_running:
             return
-            
-        ret, frame = self.cap.read()
-        if not ret:
+        
+        # Set origin point if not set
+        if not self.origin_known:
+            self.origin_x, self.origin_y, self.origin_z = x, y, z
+            self.origin_known = True
             return
-            
-        # Convert the frame to RGB for face mesh
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
-        
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                # Get the nose tip coordinates
-                nose_tip = face_landmarks.landmark[1]
-                x, y, z = nose_tip.x, nose_tip.y, nose_tip.z
-                
-                # Draw face mesh landmarks only if tracking is not hidden
-                if not self.hide_tracking:
-                    h, w, _ = frame.shape
-                    for landmark in face_landmarks.landmark:
-                        pos = (int(landmark.x * w), int(landmark.y * h))
-                        cv2.circle(frame, pos, 1, (0, 255, 0), -1)
-                
-                # Set origin point if not set
-                if not self.origin_known:
-                    self.origin_x, self.origin_y, self.origin_z = x, y, z
-                    self.origin_known = True
-                else:
-                    # Calculate relative movement
-                    X, Y, Z = (self.origin_x - x), (self.origin_y - y), (self.origin_z - z)
-                    # Scale the movements for better sensitivity
-                    X *= 0.25
-                    Y *= 0.25
-                    Z *= 0.25
-                    # Generate new view
-                    if self.current_model and hasattr(self.current_model, 'generate_view'):
-                        try:
-                            new_img = self.current_model.generate_view(X, -Y, Z, scale=1)
-                            self.display_image(new_img)
-                        except Exception as e:
-                            print(f"Error generating view: {str(e)}")
-        
-        # Convert frame for display
-        h, w, ch = frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format.Format_BGR888)
-        self.camera_label.setPixmap(QPixmap.fromImage(qt_image).scaled(
-            320, 240, Qt.AspectRatioMode.KeepAspectRatio
-        ))
+        
+        # Calculate relative movement
+        X, Y, Z = (self.origin_x - x), (self.origin_y - y), (self.origin_z - z)
+        # Scale the movements for better sensitivity
+        X *= 0.25
+        Y *= 0.25
+        Z *= 0.25
+        # Filter the pose; small changes of a still head are not rendered
+        pose = self.pose_filter.update(X, -Y, Z, sample_time)
+        if pose is None:
+            return
+        # Request new view, it is displayed by on_frame_ready
+        if self.current_model and hasattr(self.current_model, 'generate_view'):
+            self.render_worker.request_view(*pose, scale=1, timestamp=capture_time)
+            if self.trace_recorder is not None:
+                self.trace_recorder.record(*pose, "face")
     
-    def display_image(self, img):
-        """Display an image in the GUI"""
-        if isinstance(img, Image.Image):
-            # Convert PIL image to numpy array
-            img_data = np.array(img)
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-                img_data = np.array(img)
-            
-            # Create QImage from numpy array
-            height, width, channel = img_data.shape
-            bytes_per_line = 3 * width
-            q_img = QImage(img_data.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
-            
-            # Convert to QPixmap and display
-            pixmap = QPixmap.fromImage(q_img)
-            self.image_label.setPixmap(pixmap)
+    def show_camera_preview(self, preview):
+        """Show a camera preview frame of the face tracking pipeline"""
+        self.camera_label.set_frame(preview)
     
     def start_timer(self, duration):
         """Start the timer for the current test sequence"""
@@ -359,11 +444,19 @@ class ModelVisualizerQTCamera(QMainWindow):
         self.start_time = time.time()
         self.presentation_time = duration
         self.origin_known = False  # Reset origin for new sequence
+        self.pose_filter.reset()
+        self.pose_filter.reset_stats()
+        self.face_pipeline.reset_stats()
+        self.face_pipeline.set_active(True)
+        self.begin_trace_sequence()
         
         # Create and start the timer
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_timer)
         self.timer.start(100)  # Update every 100ms
+        
+        # Load the next sequence while this one is presented
+        self.prefetch_next_sequence()
     
     def update_timer(self):
         """Update the timer display"""
@@ -381,16 +474,18 @@ class ModelVisualizerQTCamera(QMainWindow):
         if remaining <= 0:
             self.timer_running = False
             self.timer.stop()
+            self.face_pipeline.set_active(False)
+            if self.trace_recorder is not None:
+                self.trace_recorder.end_sequence()
+            self.face_pipeline.report(self.render_worker)
+            filter_stats = self.pose_filter.stats()
+            print(f"Status: Pose filter skipped {filter_stats['skipped']} of {filter_stats['updates']} poses, "
+                  f"predicting {filter_stats['latency_ms']:.1f} ms ahead")
             self.show_rating_screen()
     
     def closeEvent(self, event):
         """Handle window close event"""
-        if self.cap is not None:
-            self.cap.release()
-        if self.face_mesh is not None:
-            self.face_mesh.close()
-            
-        if self.current_sequence_idx < len(self.test_sequences):
+        if self.test_sequences and self.current_sequence_idx < len(self.test_sequences):
             reply = QMessageBox.question(
                 self, 'Quit',
                 'Are you sure you want to quit? All progress will be lost.',
@@ -399,13 +494,23 @@ class ModelVisualizerQTCamera(QMainWindow):
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                self.cleanup_current_model()
+                self.shutdown()
                 event.accept()
             else:
                 event.ignore()
         else:
-            self.cleanup_current_model()
+            self.shutdown()
             event.accept()
+    
+    def shutdown(self):
+        """Stop face tracking and rendering and release the models"""
+        if self.face_pipeline is not None:
+            self.face_pipeline.stop()
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+        self.cleanup_current_model(release_pool=True)
+        self.close_trace()
+        self.close_results()
 
     def show_loading_screen(self):
         """Show a dedicated loading screen"""
@@ -461,55 +566,6 @@ class ModelVisualizerQTCamera(QMainWindow):
         # Add to main layout instead of replacing central widget
         self.main_layout.addWidget(self.loading_widget)
 
-    def submit_rating(self, rating):
-        """Handle the rating submission"""
-        # Store the rating
-        current_sequence = self.test_sequences[self.current_sequence_idx]
-        self.results[current_sequence['sample_id']] = rating
-        
-        # Save to CSV
-        import datetime
-        import csv
-        import os
-        
-        csv_file = "./Test_Results/ViewSynthesis_Results.csv"
-        os.makedirs(os.path.dirname(csv_file), exist_ok=True)
-        
-        # Get current date and time
-        current_datetime = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Prepare the row data
-        row_data = {
-            'testID': self.test_id,
-            'sample_id': current_sequence['sample_id'],
-            'rating': rating,
-            'rating_label': self.rating_labels[rating],
-            'date_time': current_datetime
-        }
-        
-        # Check if file exists to determine if we need to write headers
-        file_exists = os.path.isfile(csv_file)
-        
-        # Write to CSV
-        with open(csv_file, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['testID', 'sample_id', 'rating', 'rating_label', 'date_time'])
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row_data)
-        
-        # Hide the rating frame and show loading progress
-        self.rating_frame.hide()
-        self.loading_progress.setValue(0)
-        self.loading_progress.show()
-        
-        # Clean up the current model before moving to next sequence
-        self.cleanup_current_model()
-        
-        # Create a timer to simulate loading progress
-        self.loading_timer = QTimer()
-        self.loading_timer.timeout.connect(self.update_loading_progress)
-        self.loading_timer.start(50)  # Update every 50ms
-    
     def show_final_results(self):
         """Show the final results after all sequences have been rated"""
         # Hide all other UI elements
@@ -535,19 +591,33 @@ class ModelVisualizerQTCamera(QMainWindow):
         print("----------------------------")
         for sample_id, rating in self.results.items():
             print(f"{sample_id}\t{rating} - {self.rating_labels[rating]}")
+        
+        self.close_results()
 
     # Inherit other methods from ModelVisualizerQT
     from VISTA_Q_ToolKit_MouseControl import ModelVisualizerQT
     show_test_id_screen = ModelVisualizerQT.show_test_id_screen
     start_test = ModelVisualizerQT.start_test
-    update_init_loading_progress = ModelVisualizerQT.update_init_loading_progress
     start_next_sequence = ModelVisualizerQT.start_next_sequence
     load_vista_model = ModelVisualizerQT.load_vista_model
+    prefetch_next_sequence = ModelVisualizerQT.prefetch_next_sequence
+    on_prefetch_progress = ModelVisualizerQT.on_prefetch_progress
+    on_prefetch_finished = ModelVisualizerQT.on_prefetch_finished
+    finish_loading = ModelVisualizerQT.finish_loading
+    display_image = ModelVisualizerQT.display_image
+    show_fallback = ModelVisualizerQT.show_fallback
+    on_frame_ready = ModelVisualizerQT.on_frame_ready
+    on_render_failed = ModelVisualizerQT.on_render_failed
+    on_model_released = ModelVisualizerQT.on_model_released
     show_rating_screen = ModelVisualizerQT.show_rating_screen
     cleanup_current_model = ModelVisualizerQT.cleanup_current_model
-    update_loading_progress = ModelVisualizerQT.update_loading_progress
     create_fallback_image = ModelVisualizerQT.create_fallback_image
     _load_test_sequences = ModelVisualizerQT._load_test_sequences
+    begin_trace_sequence = ModelVisualizerQT.begin_trace_sequence
+    close_trace = ModelVisualizerQT.close_trace
+    submit_rating = ModelVisualizerQT.submit_rating
+    close_results = ModelVisualizerQT.close_results
+    update_overlay = ModelVisualizerQT.update_overlay
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='VISTA-Q: View Synthesis (Camera Control)')
@@ -555,6 +625,35 @@ if __name__ == "__main__":
     parser.add_argument('--csv_file', type=str, default='./Test_Configs/ViewSynthesis_Test_Sequence.csv', help='Path to test sequence CSV file')
     parser.add_argument('--camera_fps', type=int, default=30, help='Camera capture frame rate')
     parser.add_argument('--hide_tracking', action='store_true', help='Hide face tracking visualization')
+    parser.add_argument('--mpi_cache_dir', type=str, default='./Cache/MPI/', help='Directory of the MPI layer cache (empty string disables it)')
+    parser.add_argument('--mpi_cache_mb', type=int, default=2048, help='Maximum size of the MPI layer cache in MB')
+    parser.add_argument('--depth_cache_dir', type=str, default='./Cache/Depth/', help='Directory of the disparity cache shared by the adapters (empty string disables it)')
+    parser.add_argument('--depth_cache_mb', type=int, default=512, help='Maximum size of the disparity cache in MB')
+    parser.add_argument('--baked', action='store_true', help='Only use MPI layers pre-baked by VISTA_Q_ToolKit_PreBake.py, never load network weights')
+    parser.add_argument('--model_pool_size', type=int, default=None, help='Maximum number of models kept loaded between sequences')
+    parser.add_argument('--model_pool_mb', type=int, default=None, help='Memory budget of the models kept loaded between sequences in MB')
+    parser.add_argument('--frame_cache_step', type=float, default=None, help='Pose grid step of the rendered frame cache, e.g. 0.001 (default: no frame cache)')
+    parser.add_argument('--frame_cache_mb', type=int, default=256, help='Maximum memory of the rendered frame cache in MB')
+    parser.add_argument('--view_grid', type=int, nargs=3, metavar=('NX', 'NY', 'NZ'), default=None, help='Serve views from a pre-rendered pose lattice of this size, e.g. 17 17 5')
+    parser.add_argument('--view_grid_mode', type=str, choices=['nearest', 'bilinear'], default='bilinear', help='How views between lattice points are served')
+    parser.add_argument('--view_grid_dir', type=str, default='./Cache/ViewGrid/', help='Directory of the rendered view grids')
+    parser.add_argument('--view_grid_mb', type=int, default=8192, help='Maximum size of the rendered view grids in MB')
+    parser.add_argument('--record_trace', type=str, default=None, help='Record every requested pose to a trace file (.jsonl) for VISTA_Q_ToolKit_Replay.py')
+    parser.add_argument('--instrument', action='store_true', help='Time rendering, conversion and display and print the statistics after each sequence')
+    parser.add_argument('--overlay', action='store_true', help='Show fps and timings over the rendered view (implies --instrument)')
+    parser.add_argument('--export_trace', type=str, default=None, help='Write the timed spans as Chrome trace JSON on exit (implies --instrument)')
+    parser.add_argument('--render_server', type=str, default=None, help='Load and render the sequences on a render server (VISTA_Q_ToolKit_RenderServer.py), "host:port" or "unix:/path/to/socket"')
+    parser.add_argument('--render_encoding', type=str, choices=['raw', 'png', 'jpeg'], default='raw', help='Encoding of the frames sent by the render server')
+    parser.add_argument('--render_process', action='store_true', help='Load and render the sequences in a child process that passes frames through shared memory')
+    parser.add_argument('--results_dir', type=str, default='./Test_Results/', help='Directory of the results CSV and the rating journals, may be shared by several stations')
+    parser.add_argument('--pose_filter', type=str, choices=['none', 'one_euro', 'kalman'], default='one_euro', help='Filter of the tracked head pose')
+    parser.add_argument('--filter_min_cutoff', type=float, default=1.0, help='One-Euro cutoff frequency at rest in Hz (lower removes more jitter)')
+    parser.add_argument('--filter_beta', type=float, default=20.0, help='One-Euro speed coefficient (higher reduces lag when moving)')
+    parser.add_argument('--dead_band', type=float, default=0.0005, help='Smallest head pose change that triggers a re-render (0 renders every pose)')
+    parser.add_argument('--max_prediction', type=float, default=0.1, help='Longest pose extrapolation by the measured latency in seconds (0 disables prediction)')
+    parser.add_argument('--input_source', type=str, default=None, help='Camera index, video file, image directory or landmark trace (.jsonl) to track (default: camera 0)')
+    parser.add_argument('--fast_playback', action='store_true', help='Play recorded input sources as fast as possible, processing every frame')
+    parser.add_argument('--record_landmarks', type=str, default=None, help='Record the tracked nose tip positions to a landmark trace (.jsonl)')
     
     args = parser.parse_args()
     
@@ -563,7 +662,36 @@ if __name__ == "__main__":
         csv_file=args.csv_file,
         train_mode=args.train_user,
         camera_fps=args.camera_fps,
-        hide_tracking=args.hide_tracking
+        hide_tracking=args.hide_tracking,
+        mpi_cache_dir=args.mpi_cache_dir,
+        mpi_cache_mb=args.mpi_cache_mb,
+        depth_cache_dir=args.depth_cache_dir,
+        depth_cache_mb=args.depth_cache_mb,
+        baked=args.baked,
+        model_pool_size=args.model_pool_size,
+        model_pool_mb=args.model_pool_mb,
+        frame_cache_step=args.frame_cache_step,
+        frame_cache_mb=args.frame_cache_mb,
+        view_grid=args.view_grid,
+        view_grid_mode=args.view_grid_mode,
+        view_grid_dir=args.view_grid_dir,
+        view_grid_mb=args.view_grid_mb,
+        pose_filter=args.pose_filter,
+        filter_min_cutoff=args.filter_min_cutoff,
+        filter_beta=args.filter_beta,
+        dead_band=args.dead_band,
+        max_prediction=args.max_prediction,
+        input_source=args.input_source,
+        realtime_playback=not args.fast_playback,
+        record_landmarks=args.record_landmarks,
+        record_trace=args.record_trace,
+        instrument=args.instrument,
+        overlay=args.overlay,
+        export_trace=args.export_trace,
+        results_dir=args.results_dir,
+        render_server=args.render_server,
+        render_encoding=args.render_encoding,
+        render_process=args.render_process
     )
     window.show()
     sys.exit(app.exec()) 
\ No newline at end of file
@@ -1,18 +1,29 @@
-import os
 import sys
 import time
-import csv
+import datetime
 import random
-import importlib.util
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QPushButton, QFrame, QTableWidget, 
                             QTableWidgetItem, QMessageBox, QProgressBar)
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QImage, QPixmap
 from PIL import Image
-import pandas as pd
-import numpy as np
 import argparse
+from vista_q_mpi_cache import MPICache
+from vista_q_manifest import check_models
+from vista_q_depth import configure_depth_service
+from vista_q_model_pool import ModelPool
+from vista_q_prefetch import SequencePrefetcher
+from vista_q_view_grid import ViewGridStore
+from vista_q_trace import TraceRecorder
+from vista_q_results import ResultWriter
+from vista_q_render_client import RenderClient
+from vista_q_shm import RenderProcess
+from vista_q_instrumentation import Instrumentation
+from vista_q_render_worker import RenderWorker
+from vista_q_frame_view import FrameView
+from vista_q_frames import frame_size
+from vista_q_frame_cache import FrameCache
+from vista_q_pose import clamp, clamp_pose
 
 class ModernButton(QPushButton):
     def __init__(self, text, parent=None):
@@ -35,10 +46,16 @@ class ModernButton(QPushButton):
         """)
 
 class ModelVisualizerQT(QMainWindow):
-    def __init__(self, csv_file="./Test_Configs/ViewSynthesis_Test_Sequence.csv", train_mode=False):
+    def __init__(self, csv_file="./Test_Configs/ViewSynthesis_Test_Sequence.csv", train_mode=False,
+                 mpi_cache_dir="./Cache/MPI/", mpi_cache_mb=2048, depth_cache_dir="./Cache/Depth/", depth_cache_mb=512, baked=False,
+                 model_pool_size=None, model_pool_mb=None, frame_cache_step=None, frame_cache_mb=256,
+                 view_grid=None, view_grid_mode="bilinear", view_grid_dir="./Cache/ViewGrid/", view_grid_mb=8192, record_trace=None,
+                 instrument=False, overlay=False, export_trace=None, results_dir="./Test_Results/",
+                 render_server=None, render_encoding="raw", render_process=False):
         super().__init__()
         self.csv_file = csv_file
         self.train_mode = train_mode
+        self.baked = baked
         self.test_id = None
         self.test_sequences = None
         self.current_sequence_idx = 0
@@ -52,6 +69,76 @@ class ModelVisualizerQT(QMainWindow):
         self.mouse_sensitivity = 5000
         self.current_z_offset = 0  # Initialize z-offset
         
+        # On-disk cache of generated MPI layers (disabled when no cache directory is given)
+        self.mpi_cache = MPICache(mpi_cache_dir, mpi_cache_mb * 1024 * 1024) if mpi_cache_dir else None
+        
+        # Disparity maps shared by the adapters, computed once per image
+        configure_depth_service(depth_cache_dir, depth_cache_mb * 1024 * 1024)
+        
+        # Loaded models stay alive across sequences
+        self.model_pool = ModelPool(
+            max_models=model_pool_size,
+            memory_budget_bytes=model_pool_mb * 1024 * 1024 if model_pool_mb else None
+        )
+        
+        # Rendered pose lattices that replace the adapter during the presentation (disabled when no grid shape is given)
+        self.view_grids = ViewGridStore(view_grid_dir, view_grid, mode=view_grid_mode, max_bytes=view_grid_mb * 1024 * 1024) if view_grid else None
+        
+        # Sequences are loaded and rendered by a shared render server, or by a child process that passes
+        # frames through shared memory (both disabled by default)
+        self.render_client = None
+        if render_server:
+            try:
+                self.render_client = RenderClient(render_server, render_encoding)
+            except ConnectionError as e:
+                print(f"Error: {str(e)}")
+                sys.exit(1)
+        elif render_process:
+            self.render_client = RenderProcess(
+                mpi_cache_dir=mpi_cache_dir,
+                mpi_cache_mb=mpi_cache_mb,
+                depth_cache_dir=depth_cache_dir,
+                depth_cache_mb=depth_cache_mb,
+                baked=baked,
+                model_pool_size=model_pool_size,
+                model_pool_mb=model_pool_mb,
+                view_grid=view_grid,
+                view_grid_mode=view_grid_mode,
+                view_grid_dir=view_grid_dir,
+                view_grid_mb=view_grid_mb
+            )
+        
+        # Sequences are loaded on a background thread, the next one while the current one is presented
+        self.prefetcher = SequencePrefetcher(self.model_pool, self.mpi_cache, self.baked, self.view_grids, self.render_client)
+        self.prefetcher.progress.connect(self.on_prefetch_progress)
+        self.prefetcher.finished.connect(self.on_prefetch_finished)
+        self.waiting_sequence_idx = None
+        # Load of a sequence waiting for the render worker to release the previous model
+        self.deferred_load = None
+        
+        # Timing of the hot path (near zero overhead when disabled)
+        self.instrumentation = Instrumentation(enabled=instrument or overlay or bool(export_trace), keep_trace=bool(export_trace))
+        self.overlay = overlay
+        self.export_trace = export_trace
+        
+        # Views are rendered on a worker thread, which only renders the most recent pose
+        self.render_worker = RenderWorker(instrumentation=self.instrumentation)
+        self.render_worker.frame_ready.connect(self.on_frame_ready)
+        self.render_worker.render_failed.connect(self.on_render_failed)
+        self.render_worker.model_released.connect(self.on_model_released)
+        self.render_worker.start()
+        self.pending_initial_view = None
+        
+        # Rendered frames are cached per sequence on a pose grid (disabled when no grid step is given)
+        self.frame_cache_step = frame_cache_step
+        self.frame_cache_mb = frame_cache_mb
+        
+        # Requested poses are recorded for replay (disabled when no trace file is given)
+        self.trace_recorder = TraceRecorder(record_trace) if record_trace else None
+        
+        # Ratings are journaled on a background thread and merged into the results CSV
+        self.result_writer = ResultWriter(results_dir)
+        
         # Rating labels
         self.rating_labels = {
             1: "Bad",
@@ -75,18 +162,31 @@ class ModelVisualizerQT(QMainWindow):
         # Set up the UI
         self.setup_ui()
         
+        # Refresh the timing overlay
+        if self.overlay:
+            self.overlay_timer = QTimer()
+            self.overlay_timer.timeout.connect(self.update_overlay)
+            self.overlay_timer.start(500)
+        
         # Show test ID input first
         self.show_test_id_screen()
         
     def _load_test_sequences(self):
         """Load and randomize test sequences from CSV file"""
         try:
+            # pandas is only needed here, importing it lazily keeps it off the startup path
+            import pandas as pd
+            
             # Read the CSV file into a DataFrame
             df = pd.read_csv(self.csv_file)
             
             # Convert DataFrame to list of dictionaries
             sequences = df.to_dict('records')
             
+            # Report broken model folders from their manifests, before any adapter is imported
+            for problem in check_models(sequence['model_folder'] for sequence in sequences):
+                print(f"Warning: {problem}")
+            
             # Randomize the order
             random.shuffle(sequences)
             
@@ -140,8 +240,8 @@ class ModelVisualizerQT(QMainWindow):
         self.progress_label.setVisible(self.train_mode)
         self.main_layout.addWidget(self.progress_label)
         
-        # Image display
-        self.image_label = QLabel()
+        # Image display, paints the rendered frame buffers directly
+        self.image_label = FrameView(instrumentation=self.instrumentation)
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.image_label.setMinimumSize(512, 512)
         self.image_label.setStyleSheet("""
@@ -360,40 +460,18 @@ class ModelVisualizerQT(QMainWindow):
         # Hide test ID screen
         self.test_id_widget.hide()
         
-        # Show loading screen
+        # Show loading screen, its progress bar follows the loading of the first sequence
         self.show_loading_screen()
         
-        # Create a timer to simulate loading progress
-        self.init_loading_timer = QTimer()
-        self.init_loading_timer.timeout.connect(self.update_init_loading_progress)
-        self.init_loading_timer.start(30)  # Update every 30ms
-    
-    def update_init_loading_progress(self):
-        """Update the initial loading progress bar"""
-        current_value = self.init_loading_progress.value()
-        if current_value >= 100:
-            self.init_loading_timer.stop()
-            # Load test sequences and start
-            self.test_sequences = self._load_test_sequences()
-            
-            # Hide loading screen
-            if hasattr(self, 'loading_widget'):
-                self.loading_widget.hide()
-            
-            # Show main UI elements
-            self.progress_label.show()
-            self.image_label.show()
-            self.timer_label.show()
-            self.instructions_label.show()
-            
-            # Start the first sequence
-            self.start_next_sequence()
-        else:
-            self.init_loading_progress.setValue(current_value + 10)  # Increment by 10%
+        # Load test sequences and start
+        self.test_sequences = self._load_test_sequences()
+        self.start_next_sequence()
     
     def start_next_sequence(self):
         """Start the next test sequence if available"""
         if self.current_sequence_idx >= len(self.test_sequences):
+            if hasattr(self, 'loading_widget'):
+                self.loading_widget.hide()
             self.show_final_results()
             return
         
@@ -405,12 +483,7 @@ class ModelVisualizerQT(QMainWindow):
             self.progress_label.setText(
                 f"Sequence {self.current_sequence_idx + 1}/{len(self.test_sequences)}: {sequence['sample_id']}"
             )
-            self.progress_label.show()
         
-        # Show main viewing UI
-        self.image_label.show()
-        self.timer_label.show()
-        self.instructions_label.show()
         self.rating_frame.hide()
         self.results_frame.hide()
         
@@ -418,123 +491,130 @@ class ModelVisualizerQT(QMainWindow):
         self.load_vista_model(sequence)
     
     def load_vista_model(self, sequence):
-        """Load the VISTA_Q model from the specified folder"""
-        try:
-            # Clean up any previous model
-            self.cleanup_current_model()
-            
-            # Reset z-offset to 0 for new model
-            self.current_z_offset = 0
-            
-            # Show loading progress
-            self.loading_progress.setValue(0)
+        """Load the VISTA_Q model of a sequence, taking it over from the background prefetch when it is ready"""
+        # Clean up any previous model
+        self.cleanup_current_model()
+        
+        # Reset z-offset to 0 for new model
+        self.current_z_offset = 0
+        
+        # Show loading progress, unless the initial loading screen is up
+        self.loading_progress.setValue(0)
+        if not self.loading_widget.isVisible():
             self.loading_progress.show()
-            
-            # Get the module path
-            model_folder = sequence['model_folder']
-            module_path = os.path.join(model_folder, "VISTA_Q.py")
-            module_name = f"VISTA_Q_{model_folder.replace('./', '').replace('/', '_')}"
-            
-            print(f"Loading model from: {module_path}")
-            self.loading_progress.setValue(10)  # Started loading model
-            
-            # Add the model folder to sys.path temporarily
-            original_sys_path = sys.path.copy()
-            model_dir = os.path.abspath(model_folder)
-            parent_dir = os.path.dirname(model_dir)
-            
-            # Add both the model directory and parent directory to sys.path
-            sys.path.insert(0, model_dir)
-            sys.path.insert(0, parent_dir)
-            
-            try:
-                # Force reload the VISTA_Q module
-                if module_name in sys.modules:
-                    del sys.modules[module_name]
-                
-                # Import the module using a unique name to avoid namespace conflicts
-                spec = importlib.util.spec_from_file_location(module_name, module_path)
-                module = importlib.util.module_from_spec(spec)
-                
-                # Execute the module in its own namespace
-                spec.loader.exec_module(module)
-                self.loading_progress.setValue(30)  # Module loaded
-                
-                # Create an instance of VISTA_Q
-                self.current_model = module.VISTA_Q()
-                self.loading_progress.setValue(40)  # Model instance created
-                
-                # Initialize the model
-                if hasattr(self.current_model, 'load_model'):
-                    self.current_model.load_model()
-                    print(f"Model loaded from {sequence['model_folder']}")
-                    self.loading_progress.setValue(60)  # Model weights loaded
-                    
-                    # Load the image
-                    if hasattr(self.current_model, 'load_image'):
-                        print(f"Loading image from: {sequence['image_path']}")
-                        self.current_model.load_image(sequence['image_path'])
-                        print(f"Image loaded from {sequence['image_path']}")
-                        self.loading_progress.setValue(80)  # Image loaded
-                        
-                        # Generate the initial view
-                        if hasattr(self.current_model, 'generate_view'):
-                            try:
-                                print("Generating initial view...")
-                                initial_img = self.current_model.generate_view(0, 0, 0, scale=1)
-                                print(f"Initial view generated, size: {initial_img.size}")
-                                self.display_image(initial_img)
-                                self.loading_progress.setValue(100)  # Initial view generated
-                                self.loading_progress.hide()
-                                
-                                # Start the timer
-                                self.start_timer(sequence['presentation_time'])
-                                return
-                            except Exception as e:
-                                print(f"Error generating initial view: {str(e)}")
-                                import traceback
-                                traceback.print_exc()
-            finally:
-                # Restore the original sys.path
-                sys.path = original_sys_path
-            
-            # If we get here, something failed
-            print(f"Failed to initialize model from {sequence['model_folder']}")
-            
-            # Display a fallback image
-            fallback_img = self.create_fallback_image(sequence)
-            self.display_image(fallback_img)
-            self.loading_progress.hide()
-            self.start_timer(sequence['presentation_time'])
-            
-        except Exception as e:
-            print(f"Error loading VISTA_Q model: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            
-            # Display a fallback image
-            fallback_img = self.create_fallback_image(sequence)
-            self.display_image(fallback_img)
-            self.loading_progress.hide()
-            self.start_timer(sequence['presentation_time'])
+        
+        # A sequence loaded during the previous presentation is ready right away
+        prepared = self.prefetcher.take(self.current_sequence_idx)
+        if prepared is not None and not prepared.image_deferred:
+            self.finish_loading(prepared)
+            return
+        
+        # Otherwise wait for the loader, which reports its progress through on_prefetch_progress
+        self.waiting_sequence_idx = self.current_sequence_idx
+        if self.render_worker.is_releasing():
+            # The loader may reuse the pooled instance the worker is still rendering, start it once released
+            self.deferred_load = (self.current_sequence_idx, sequence)
+            return
+        self.prefetcher.start(self.current_sequence_idx, sequence)
     
-    def display_image(self, img):
-        """Display an image in the GUI"""
-        # Convert PIL image to QImage
-        if img.mode != "RGB":
-            img = img.convert("RGB")
+    def prefetch_next_sequence(self):
+        """Start loading the next sequence in the background while the current one is presented"""
+        next_idx = self.current_sequence_idx + 1
+        if self.test_sequences and next_idx < len(self.test_sequences):
+            self.prefetcher.start(next_idx, self.test_sequences[next_idx], busy_folder=self.model_pool.active_folder)
+    
+    def on_prefetch_progress(self, index, value, message):
+        """Show the progress of the sequence the participant is waiting for"""
+        if index != self.waiting_sequence_idx:
+            return
+        if self.loading_widget.isVisible():
+            self.init_loading_progress.setValue(value)
+        else:
+            self.loading_progress.setValue(value)
+    
+    def on_prefetch_finished(self, prepared):
+        """Take over a loaded sequence if the participant is waiting for it"""
+        if prepared.index != self.waiting_sequence_idx:
+            return
+        self.waiting_sequence_idx = None
+        self.load_vista_model(prepared.sequence)
+    
+    def finish_loading(self, prepared):
+        """Show the initial view of a loaded sequence and start its presentation"""
+        sequence = prepared.sequence
+        model_folder = prepared.model_folder
+        print(f"Status: Sequence {sequence['sample_id']} ready\tLoad time: {prepared.load_time:.2f}s")
+        
+        # Hide the initial loading screen and show the main viewing UI
+        self.loading_widget.hide()
+        if self.train_mode:
+            self.progress_label.show()
+        self.image_label.show()
+        self.timer_label.show()
+        self.instructions_label.show()
         
-        # Convert PIL image to numpy array
-        img_data = np.array(img)
+        if prepared.ready and hasattr(prepared.model, 'generate_view'):
+            self.current_model = prepared.model
+            if self.frame_cache_step:
+                self.current_model = FrameCache(prepared.model, self.frame_cache_step, self.frame_cache_mb * 1024 * 1024)
+            self.pending_initial_view = prepared
+            
+            # The render worker generates the initial view, with the adapter's helper modules importable
+            print("Generating initial view...")
+            self.render_worker.set_model(
+                self.current_model,
+                first_render_context=None if self.render_client else lambda: self.model_pool.namespace(model_folder)
+            )
+            self.render_worker.request_view(0, 0, 0, scale=1)
+            return
         
-        # Create QImage from numpy array
-        height, width, channel = img_data.shape
-        bytes_per_line = 3 * width
-        q_img = QImage(img_data.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
+        if prepared.error:
+            print(f"Error: {prepared.error}")
+        self.show_fallback(sequence)
+    
+    def show_fallback(self, sequence):
+        """Present a fallback image for a sequence whose model failed"""
+        print(f"Failed to initialize model from {sequence['model_folder']}")
+        self.current_model = None
+        self.render_worker.set_model(None)
         
-        # Convert to QPixmap and display
-        pixmap = QPixmap.fromImage(q_img)
-        self.image_label.setPixmap(pixmap)
+        # Display a fallback image
+        fallback_img = self.create_fallback_image(sequence)
+        self.display_image(fallback_img)
+        self.loading_progress.hide()
+        self.start_timer(sequence['presentation_time'])
+    
+    def on_frame_ready(self, model, frame, pose, timestamp=None):
+        """Display a frame finished by the render worker"""
+        # Frames of a previous sequence may still arrive after a switch
+        if model is not self.current_model:
+            return
+        self.display_image(frame)
+        
+        if self.pending_initial_view is not None:
+            # The initial view is up, start the presentation
+            prepared = self.pending_initial_view
+            self.pending_initial_view = None
+            print(f"Initial view generated, size: {frame_size(frame)}")
+            self.model_pool.activate(prepared.model_folder)
+            self.loading_progress.setValue(100)  # Initial view generated
+            self.loading_progress.hide()
+            
+            # Start the timer
+            self.start_timer(prepared.sequence['presentation_time'])
+    
+    def on_render_failed(self, model, message):
+        """Handle a failed render, falling back if the initial view could not be generated"""
+        if model is not self.current_model or self.pending_initial_view is None:
+            return
+        print(f"Error generating initial view: {message}")
+        prepared = self.pending_initial_view
+        self.pending_initial_view = None
+        self.show_fallback(prepared.sequence)
+    
+    def display_image(self, img):
+        """Display an image in the GUI (a PIL image, or a uint8 HxWx3 array or tensor shown without copying)"""
+        self.image_label.set_frame(img)
     
     def on_mouse_press(self, event):
         """Handle mouse press event"""
@@ -555,15 +635,12 @@ class ModelVisualizerQT(QMainWindow):
             y_offset = (event.pos().y() - height / 2) / self.mouse_sensitivity
             
             # Clamp values to valid range
-            x_offset = max(-0.1, min(0.1, x_offset))
-            y_offset = max(-0.1, min(0.1, y_offset))
+            x_offset, y_offset, _ = clamp_pose(x_offset, y_offset)
             
-            # Generate and display the new view
-            try:
-                new_img = self.current_model.generate_view(x_offset, y_offset, self.current_z_offset, scale=1)
-                self.display_image(new_img)
-            except Exception as e:
-                print(f"Error generating view: {str(e)}")
+            # Request the new view, it is displayed by on_frame_ready
+            self.render_worker.request_view(x_offset, y_offset, self.current_z_offset, scale=1)
+            if self.trace_recorder is not None:
+                self.trace_recorder.record(x_offset, y_offset, self.current_z_offset, "mouse")
     
     def wheelEvent(self, event):
         """Handle mouse wheel event for z-axis movement"""
@@ -578,14 +655,12 @@ class ModelVisualizerQT(QMainWindow):
         z_change = delta * z_sensitivity
         
         # Update the current z-offset
-        self.current_z_offset = max(-0.1, min(0.1, self.current_z_offset + z_change))
+        self.current_z_offset = clamp(self.current_z_offset + z_change)
         
-        # Generate and display the new view
-        try:
-            new_img = self.current_model.generate_view(0, 0, self.current_z_offset, scale=1)
-            self.display_image(new_img)
-        except Exception as e:
-            print(f"Error generating view: {str(e)}")
+        # Request the new view, it is displayed by on_frame_ready
+        self.render_worker.request_view(0, 0, self.current_z_offset, scale=1)
+        if self.trace_recorder is not None:
+            self.trace_recorder.record(0, 0, self.current_z_offset, "wheel")
     
     def on_mouse_release(self, event):
         """Handle mouse release event"""
@@ -596,11 +671,15 @@ class ModelVisualizerQT(QMainWindow):
         self.timer_running = True
         self.start_time = time.time()
         self.presentation_time = duration
+        self.begin_trace_sequence()
         
         # Create and start the timer
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_timer)
         self.timer.start(100)  # Update every 100ms
+        
+        # Load the next sequence while this one is presented
+        self.prefetch_next_sequence()
     
     def update_timer(self):
         """Update the timer display"""
@@ -618,10 +697,19 @@ class ModelVisualizerQT(QMainWindow):
         if remaining <= 0:
             self.timer_running = False
             self.timer.stop()
+            if self.trace_recorder is not None:
+                self.trace_recorder.end_sequence()
             self.show_rating_screen()
     
+    def begin_trace_sequence(self):
+        """Start recording the requested poses of the presented sequence"""
+        if self.trace_recorder is not None and self.current_model is not None:
+            self.trace_recorder.begin_sequence(self.current_sequence_idx, self.test_sequences[self.current_sequence_idx])
+    
     def show_rating_screen(self):
         """Show the rating screen after the presentation time is over"""
+        self.instrumentation.report()
+        
         # Hide the main content
         self.image_label.hide()
         self.timer_label.hide()
@@ -630,30 +718,49 @@ class ModelVisualizerQT(QMainWindow):
         # Show the rating frame
         self.rating_frame.show()
     
-    def cleanup_current_model(self):
-        """Clean up the current model and its associated modules"""
-        if self.current_model is not None:
-            try:
-                # Call any cleanup methods the model might have
-                if hasattr(self.current_model, 'cleanup'):
-                    self.current_model.cleanup()
-                
-                # Delete the model instance
-                del self.current_model
-                self.current_model = None
-                
-                # Clean up modules that might conflict
-                module_prefixes = ['model', 'utils', 'parameters', 'helper']
-                for mod_name in list(sys.modules.keys()):
-                    if any(mod_name.startswith(prefix) for prefix in module_prefixes):
-                        del sys.modules[mod_name]
-                        
-                # Force garbage collection
-                import gc
-                gc.collect()
-                
-            except Exception as e:
-                print(f"Error during model cleanup: {str(e)}")
+    def on_model_released(self, model):
+        """Release a model the render worker has stopped rendering"""
+        # The active adapter stays protected from eviction until its last frame is done
+        if self.current_model is None:
+            self.model_pool.activate(None)
+        if self.render_client is not None:
+            # The server keeps the sequence loaded for other stations presenting it
+            self.render_client.release(model)
+        if self.deferred_load is not None and not self.render_worker.is_releasing():
+            index, sequence = self.deferred_load
+            self.deferred_load = None
+            if index == self.waiting_sequence_idx:
+                self.prefetcher.start(index, sequence)
+    
+    def cleanup_current_model(self, release_pool=False):
+        """
+        Release the current model.
+        
+        The model stays loaded in the model pool for later sequences, unless release_pool is set.
+        The render worker lets go of it in the background (see on_model_released), except with
+        release_pool, which stops the worker first.
+        """
+        if isinstance(self.current_model, FrameCache):
+            stats = self.current_model.stats()
+            print(f"Status: Frame cache hits: {stats['hits']}\tMisses: {stats['misses']}\tHit rate: {stats['hit_rate']:.1%}")
+        model = self.current_model
+        self.current_model = None
+        self.pending_initial_view = None
+        self.render_worker.set_model(None)
+        if not release_pool:
+            return
+        
+        # Closing: wait for a frame in flight before the models are freed
+        self.render_worker.stop()
+        self.model_pool.activate(None)
+        if self.render_client is not None:
+            if model is not None:
+                self.render_client.release(model)
+            self.render_client.close()
+        try:
+            self.model_pool.clear()
+        except Exception as e:
+            print(f"Error during model cleanup: {str(e)}")
     
     def submit_rating(self, rating):
         """Handle the rating submission"""
@@ -661,14 +768,6 @@ class ModelVisualizerQT(QMainWindow):
         current_sequence = self.test_sequences[self.current_sequence_idx]
         self.results[current_sequence['sample_id']] = rating
         
-        # Save to CSV
-        import datetime
-        import csv
-        import os
-        
-        csv_file = "./Test_Results/ViewSynthesis_Results.csv"
-        os.makedirs(os.path.dirname(csv_file), exist_ok=True)
-        
         # Get current date and time
         current_datetime = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
@@ -681,40 +780,18 @@ class ModelVisualizerQT(QMainWindow):
             'date_time': current_datetime
         }
         
-        # Check if file exists to determine if we need to write headers
-        file_exists = os.path.isfile(csv_file)
+        # Journal the row on the background writer, it is merged into the results CSV at the end of the session
+        self.result_writer.submit(row_data)
         
-        # Write to CSV
-        with open(csv_file, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['testID', 'sample_id', 'rating', 'rating_label', 'date_time'])
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row_data)
-        
-        # Hide the rating frame and show loading progress
+        # Hide the rating frame
         self.rating_frame.hide()
-        self.loading_progress.setValue(0)
-        self.loading_progress.show()
         
-        # Clean up the current model before moving to next sequence
+        # Release the current model before moving to next sequence, it stays in the model pool
         self.cleanup_current_model()
         
-        # Create a timer to simulate loading progress
-        self.loading_timer = QTimer()
-        self.loading_timer.timeout.connect(self.update_loading_progress)
-        self.loading_timer.start(50)  # Update every 50ms
-    
-    def update_loading_progress(self):
-        """Update the loading progress bar"""
-        current_value = self.loading_progress.value()
-        if current_value >= 100:
-            self.loading_timer.stop()
-            self.loading_progress.hide()
-            # Move to the next sequence
-            self.current_sequence_idx += 1
-            self.start_next_sequence()
-        else:
-            self.loading_progress.setValue(current_value + 10)  # Increment by 10%
+        # Move to the next sequence, which has usually been loaded during the presentation
+        self.current_sequence_idx += 1
+        self.start_next_sequence()
     
     def show_final_results(self):
         """Show the final results after all sequences have been rated"""
@@ -741,6 +818,8 @@ class ModelVisualizerQT(QMainWindow):
         print("----------------------------")
         for sample_id, rating in self.results.items():
             print(f"{sample_id}\t{rating} - {self.rating_labels[rating]}")
+        
+        self.close_results()
     
     def create_fallback_image(self, sequence):
         """Create a fallback image when a model can't be loaded"""
@@ -791,23 +870,94 @@ class ModelVisualizerQT(QMainWindow):
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                self.cleanup_current_model()
+                self.cleanup_current_model(release_pool=True)
+                self.close_trace()
+                self.close_results()
                 event.accept()
             else:
                 event.ignore()
         else:
-            self.cleanup_current_model()
+            self.cleanup_current_model(release_pool=True)
+            self.close_trace()
+            self.close_results()
             event.accept()
+    
+    def close_trace(self):
+        """Finish the trace files of the session"""
+        if self.trace_recorder is not None:
+            self.trace_recorder.close()
+            print(f"Status: Recorded {self.trace_recorder.recorded} poses to {self.trace_recorder.path}")
+        if self.export_trace:
+            try:
+                count = self.instrumentation.export_chrome_trace(self.export_trace)
+                print(f"Status: Exported {count} trace events to {self.export_trace}")
+            except Exception as e:
+                print(f"Warning: Failed to export the trace to {self.export_trace}: {str(e)}")
+    
+    def close_results(self):
+        """Write all submitted ratings and merge the journals into the results CSV"""
+        if self.result_writer is not None:
+            self.result_writer.close()
+            self.result_writer = None
+    
+    def update_overlay(self):
+        """Show the current timings over the rendered view"""
+        self.image_label.set_overlay(self.instrumentation.overlay_text())
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='VISTA-Q: View Synthesis')
     parser.add_argument('--train_user', action='store_true', help='Enable training mode with progress and timer')
     parser.add_argument('--csv_file', type=str, default='./Test_Configs/ViewSynthesis_Test_Sequence.csv', help='Path to test sequence CSV file')
+    parser.add_argument('--mpi_cache_dir', type=str, default='./Cache/MPI/', help='Directory of the MPI layer cache (empty string disables it)')
+    parser.add_argument('--mpi_cache_mb', type=int, default=2048, help='Maximum size of the MPI layer cache in MB')
+    parser.add_argument('--depth_cache_dir', type=str, default='./Cache/Depth/', help='Directory of the disparity cache shared by the adapters (empty string disables it)')
+    parser.add_argument('--depth_cache_mb', type=int, default=512, help='Maximum size of the disparity cache in MB')
+    parser.add_argument('--baked', action='store_true', help='Only use MPI layers pre-baked by VISTA_Q_ToolKit_PreBake.py, never load network weights')
+    parser.add_argument('--model_pool_size', type=int, default=None, help='Maximum number of models kept loaded between sequences')
+    parser.add_argument('--model_pool_mb', type=int, default=None, help='Memory budget of the models kept loaded between sequences in MB')
+    parser.add_argument('--frame_cache_step', type=float, default=None, help='Pose grid step of the rendered frame cache, e.g. 0.001 (default: no frame cache)')
+    parser.add_argument('--frame_cache_mb', type=int, default=256, help='Maximum memory of the rendered frame cache in MB')
+    parser.add_argument('--view_grid', type=int, nargs=3, metavar=('NX', 'NY', 'NZ'), default=None, help='Serve views from a pre-rendered pose lattice of this size, e.g. 17 17 5')
+    parser.add_argument('--view_grid_mode', type=str, choices=['nearest', 'bilinear'], default='bilinear', help='How views between lattice points are served')
+    parser.add_argument('--view_grid_dir', type=str, default='./Cache/ViewGrid/', help='Directory of the rendered view grids')
+    parser.add_argument('--view_grid_mb', type=int, default=8192, help='Maximum size of the rendered view grids in MB')
+    parser.add_argument('--record_trace', type=str, default=None, help='Record every requested pose to a trace file (.jsonl) for VISTA_Q_ToolKit_Replay.py')
+    parser.add_argument('--instrument', action='store_true', help='Time rendering, conversion and display and print the statistics after each sequence')
+    parser.add_argument('--overlay', action='store_true', help='Show fps and timings over the rendered view (implies --instrument)')
+    parser.add_argument('--export_trace', type=str, default=None, help='Write the timed spans as Chrome trace JSON on exit (implies --instrument)')
+    parser.add_argument('--render_server', type=str, default=None, help='Load and render the sequences on a render server (VISTA_Q_ToolKit_RenderServer.py), "host:port" or "unix:/path/to/socket"')
+    parser.add_argument('--render_encoding', type=str, choices=['raw', 'png', 'jpeg'], default='raw', help='Encoding of the frames sent by the render server')
+    parser.add_argument('--render_process', action='store_true', help='Load and render the sequences in a child process that passes frames through shared memory')
+    parser.add_argument('--results_dir', type=str, default='./Test_Results/', help='Directory of the results CSV and the rating journals, may be shared by several stations')
     
     args = parser.parse_args()
     
     app = QApplication(sys.argv)
-    window = ModelVisualizerQT(csv_file=args.csv_file, train_mode=args.train_user)
+    window = ModelVisualizerQT(
+        csv_file=args.csv_file,
+        train_mode=args.train_user,
+        mpi_cache_dir=args.mpi_cache_dir,
+        mpi_cache_mb=args.mpi_cache_mb,
+        depth_cache_dir=args.depth_cache_dir,
+        depth_cache_mb=args.depth_cache_mb,
+        baked=args.baked,
+        model_pool_size=args.model_pool_size,
+        model_pool_mb=args.model_pool_mb,
+        frame_cache_step=args.frame_cache_step,
+        frame_cache_mb=args.frame_cache_mb,
+        view_grid=args.view_grid,
+        view_grid_mode=args.view_grid_mode,
+        view_grid_dir=args.view_grid_dir,
+        view_grid_mb=args.view_grid_mb,
+        record_trace=args.record_trace,
+        instrument=args.instrument,
+        overlay=args.overlay,
+        export_trace=args.export_trace,
+        results_dir=args.results_dir,
+        render_server=args.render_server,
+        render_encoding=args.render_encoding,
+        render_process=args.render_process
+    )
     window.show()
     sys.exit(app.exec()) 
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""
+VISTA-Q: Pre-Bake
+
+Builds the MPI layers of every (model, image) pair of a test sequence CSV ahead of the session and
+stores them in the MPI cache. Each model folder is loaded once per worker process and the unique
+images of that folder are processed on a process pool (one worker per core on the CPU, one on
+CUDA unless --workers is given, as every worker holds its own copy of the weights). After baking,
+every pair is checked in the cache, so a bake that does not fit in --mpi_cache_mb fails instead of
+leaving the GUIs to load the evicted pairs mid-session. Start the GUIs with --baked afterwards to
+serve all sequences from the cache without loading any network weights.
+
+With --view_grid the pose lattice of every pair is rendered as well, for the GUIs' --view_grid mode.
+"""
+
+import os
+import sys
+import time
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from vista_q_mpi_cache import MPICache
+from vista_q_depth import configure_depth_service, DEPTH_CACHE_DIR
+from vista_q_loader import model_search_path, import_vista_q_module, construct_adapter
+from vista_q_manifest import read_manifest
+from vista_q_view_grid import ViewGridStore
+
+# Per-process state of the pool workers
+_worker_model = None
+_worker_model_folder = None
+_worker_cache = None
+_worker_grids = None
+
+
+def _init_worker(model_folder, cache_dir, cache_bytes, threads, view_grid=None, view_grid_dir=None, fp16=False,
+                 depth_cache_dir=None, depth_cache_bytes=None, view_grid_bytes=None):
+    """Load the model once in a pool worker process"""
+    global _worker_model, _worker_model_folder, _worker_cache, _worker_grids
+
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    _worker_model_folder = model_folder
+    _worker_cache = MPICache(cache_dir, cache_bytes, fp16=fp16)
+    configure_depth_service(depth_cache_dir, depth_cache_bytes)
+    _worker_grids = ViewGridStore(view_grid_dir, view_grid, max_bytes=view_grid_bytes) if view_grid else None
+    with model_search_path(model_folder):
+        module = import_vista_q_module(model_folder)
+        _worker_model = construct_adapter(module, model_folder)
+        if _worker_model.load_model() is False:
+            raise RuntimeError(f"Failed to load model from {model_folder}")
+
+
+def _bake_image(image_path):
+    """
+    Generate and store the MPI layers of one image in a pool worker.
+
+    Returns:
+        tuple: (image_path, success, seconds)
+    """
+    start_time = time.time()
+    try:
+        with model_search_path(_worker_model_folder):
+            if _worker_model.load_image(image_path) is False:
+                return image_path, False, time.time() - start_time
+            success = _worker_cache.store(_worker_model, _worker_model_folder, image_path)
+            if _worker_grids is not None:
+                _worker_grids.build(_worker_model, _worker_model_folder, image_path)
+                success = True
+        return image_path, success, time.time() - start_time
+    except Exception as e:
+        print(f"Error baking {image_path}: {str(e)}")
+        traceback.print_exc()
+        return image_path, False, time.time() - start_time
+
+
+def default_workers(model_folder, cpu_count):
+    """
+    Number of worker processes for a model folder when --workers is not given.
+
+    Every worker loads its own copy of the weights: on CUDA they would all share one GPU, so a single
+    worker is used. On the CPU there is one worker per core, as far as the manifest's memory_mb
+    estimate fits them into the physical memory.
+
+    Args:
+        model_folder (str): Directory containing VISTA_Q.py
+        cpu_count (int): Number of cores
+
+    Returns:
+        int: Number of workers
+    """
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return 1
+    except ImportError:
+        pass
+
+    memory_mb = read_manifest(model_folder)["memory_mb"]
+    try:
+        physical_mb = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        physical_mb = None
+    if memory_mb and physical_mb:
+        return max(1, min(cpu_count, int(physical_mb // memory_mb)))
+    return cpu_count
+
+
+def pending_images(model_folder, image_paths, cache, view_grids=None, verbose=True):
+    """
+    Find the images of a model folder that are not in the cache yet.
+
+    Args:
+        model_folder (str): Directory containing VISTA_Q.py
+        image_paths (list): Unique image paths used with this model
+        cache (MPICache): Target cache
+        view_grids (ViewGridStore, optional): Target store of the view grids
+        verbose (bool): Report the images that are already baked
+
+    Returns:
+        list: Image paths that still need to be baked
+    """
+    with model_search_path(model_folder):
+        module = import_vista_q_module(model_folder)
+        # Constructing the adapter does not load any weights, it is only needed for the cache key
+        adapter = construct_adapter(module, model_folder)
+
+    if not MPICache.supports(adapter) and view_grids is None:
+        print(f"Warning: {model_folder} does not implement the MPI state hooks, nothing to bake")
+        return []
+
+    pending = []
+    for image_path in image_paths:
+        if view_grids is not None:
+            baked = view_grids.load(adapter, model_folder, image_path) is not None
+        else:
+            baked = cache.contains(cache.make_key(adapter, model_folder, image_path))
+        if baked:
+            if verbose:
+                print(f"Status: Already baked {image_path} with {model_folder}")
+        else:
+            pending.append(image_path)
+    return pending
+
+
+def prebake(csv_file, cache_dir, cache_mb, workers=None, threads_per_worker=None, force=False,
+            view_grid=None, view_grid_dir="./Cache/ViewGrid/", fp16=False, depth_cache_dir=DEPTH_CACHE_DIR, depth_cache_mb=512,
+            view_grid_mb=8192):
+    """
+    Bake all (model, image) pairs of a test sequence CSV into the MPI cache.
+
+    Args:
+        csv_file (str): Path to the test sequence CSV file
+        cache_dir (str): Directory of the MPI cache
+        cache_mb (int): Maximum size of the MPI cache in MB
+        workers (int, optional): Number of worker processes per model, see default_workers()
+        threads_per_worker (int, optional): Torch threads per worker, defaults to cores / workers
+        force (bool): Rebuild entries that are already in the cache
+        view_grid (tuple, optional): Also render a pose lattice of this size (nx, ny, nz) per pair
+        view_grid_dir (str): Directory of the rendered view grids
+        fp16 (bool): Store the MPI planes as float16
+        depth_cache_dir (str): Directory of the disparity cache, so models sharing an image run depth estimation once
+        depth_cache_mb (int): Maximum size of the disparity cache in MB
+        view_grid_mb (int): Maximum size of the rendered view grids in MB
+
+    Returns:
+        bool: True if every pair was baked and all of them are in the cache
+    """
+    df = pd.read_csv(csv_file)
+    cache_bytes = cache_mb * 1024 * 1024
+    cache = MPICache(cache_dir, cache_bytes, fp16=fp16)
+    view_grid_bytes = view_grid_mb * 1024 * 1024
+    view_grids = ViewGridStore(view_grid_dir, view_grid, max_bytes=view_grid_bytes) if view_grid else None
+    cpu_count = os.cpu_count() or 1
+    all_ok = True
+    baked_pairs = {}
+
+    for model_folder, group in df.groupby('model_folder', sort=False):
+        image_paths = list(dict.fromkeys(group['image_path']))
+        baked_pairs[model_folder] = image_paths
+        if not force:
+            image_paths = pending_images(model_folder, image_paths, cache, view_grids)
+        if not image_paths:
+            continue
+
+        num_workers = max(1, min(workers or default_workers(model_folder, cpu_count), len(image_paths)))
+        threads = threads_per_worker or max(1, cpu_count // num_workers)
+        print(f"Status: Baking {len(image_paths)} image(s) with {model_folder} on {num_workers} worker(s)")
+
+        start_time = time.time()
+        # Spawn keeps CUDA and OpenGL state out of the forked workers
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_folder, cache_dir, cache_bytes, threads, view_grid, view_grid_dir, fp16,
+                      depth_cache_dir, depth_cache_mb * 1024 * 1024, view_grid_bytes)
+        ) as executor:
+            futures = [executor.submit(_bake_image, image_path) for image_path in image_paths]
+            for future in as_completed(futures):
+                try:
+                    image_path, success, seconds = future.result()
+                except Exception as e:
+                    print(f"Error in bake worker for {model_folder}: {str(e)}")
+                    all_ok = False
+                    continue
+                status = "Baked" if success else "Failed"
+                print(f"Status: {status} {image_path}\tTime: {seconds:.2f}s")
+                all_ok = all_ok and success
+        print(f"Status: {model_folder} done\tTime: {time.time() - start_time:.2f}s")
+
+    # Entries of a bake larger than the cache budget are evicted by the bake itself
+    for model_folder, image_paths in baked_pairs.items():
+        missing = pending_images(model_folder, image_paths, cache, view_grids, verbose=False)
+        for image_path in missing:
+            print(f"Error: {image_path} with {model_folder} is not in the cache after baking")
+        if missing:
+            print("Error: The baked layers do not fit in the cache, raise --mpi_cache_mb (and the GUIs' setting) and bake again")
+            all_ok = False
+
+    return all_ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='VISTA-Q: Pre-bake MPI layers for a test sequence')
+    parser.add_argument('--csv_file', type=str, default='./Test_Configs/ViewSynthesis_Test_Sequence.csv', help='Path to test sequence CSV file')
+    parser.add_argument('--mpi_cache_dir', type=str, default='./Cache/MPI/', help='Directory of the MPI layer cache')
+    parser.add_argument('--mpi_cache_mb', type=int, default=2048, help='Maximum size of the MPI layer cache in MB')
+    parser.add_argument('--mpi_cache_fp16', action='store_true', help='Store the MPI planes as float16 (half the size, slightly lossy)')
+    parser.add_argument('--depth_cache_dir', type=str, default='./Cache/Depth/', help='Directory of the disparity cache shared by the adapters (empty string disables it)')
+    parser.add_argument('--depth_cache_mb', type=int, default=512, help='Maximum size of the disparity cache in MB')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes per model (default: 1 on CUDA, otherwise one per core as memory allows)')
+    parser.add_argument('--threads_per_worker', type=int, default=None, help='Torch threads per worker (default: cores / workers)')
+    parser.add_argument('--force', action='store_true', help='Rebuild entries that are already baked')
+    parser.add_argument('--view_grid', type=int, nargs=3, metavar=('NX', 'NY', 'NZ'), default=None, help='Also render a pose lattice of this size per pair, e.g. 17 17 5')
+    parser.add_argument('--view_grid_dir', type=str, default='./Cache/ViewGrid/', help='Directory of the rendered view grids')
+    parser.add_argument('--view_grid_mb', type=int, default=8192, help='Maximum size of the rendered view grids in MB')
+
+    args = parser.parse_args()
+
+    ok = prebake(
+        csv_file=args.csv_file,
+        cache_dir=args.mpi_cache_dir,
+        cache_mb=args.mpi_cache_mb,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        force=args.force,
+        view_grid=args.view_grid,
+        view_grid_dir=args.view_grid_dir,
+        view_grid_mb=args.view_grid_mb,
+        fp16=args.mpi_cache_fp16,
+        depth_cache_dir=args.depth_cache_dir,
+        depth_cache_mb=args.depth_cache_mb
+    )
+    sys.exit(0 if ok else 1)
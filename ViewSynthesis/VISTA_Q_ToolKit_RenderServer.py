@@ -0,0 +1,77 @@
+"""
+VISTA-Q: Render Server
+
+Hosts the VISTA_Q adapters once for all rating stations of a lab. Start the server, then the GUIs
+with --render_server pointing at it; they load their sequences and request their views from the
+server instead of loading the weights themselves:
+
+    python VISTA_Q_ToolKit_RenderServer.py
+    python VISTA_Q_ToolKit_MouseControl.py --render_server 127.0.0.1:7321
+
+Clients only name a model of --models_dir and an image under --image_root. The server listens on
+loopback by default; to serve other machines, set the same shared token in VISTA_Q_RENDER_TOKEN
+on the server and on every station, and listen on the lab network's address:
+
+    VISTA_Q_RENDER_TOKEN=... python VISTA_Q_ToolKit_RenderServer.py --listen 192.168.1.10:7321
+    VISTA_Q_RENDER_TOKEN=... python VISTA_Q_ToolKit_MouseControl.py --render_server 192.168.1.10:7321
+"""
+
+import os
+import sys
+import signal
+import argparse
+from vista_q_mpi_cache import MPICache
+from vista_q_depth import configure_depth_service
+from vista_q_model_pool import ModelPool
+from vista_q_view_grid import ViewGridStore
+from vista_q_render_server import RenderServer, DEFAULT_ADDRESS, TOKEN_ENV
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='VISTA-Q: Render server for several rating stations')
+    parser.add_argument('--listen', type=str, default=DEFAULT_ADDRESS, help='Address to listen on, "host:port" or "unix:/path/to/socket"')
+    parser.add_argument('--models_dir', type=str, default='./Models', help='Directory of the adapters clients may load, by model folder name')
+    parser.add_argument('--image_root', type=str, default='./Images', help='Directory the images of the loaded sequences must lie in')
+    parser.add_argument('--mpi_cache_dir', type=str, default='./Cache/MPI/', help='Directory of the MPI layer cache (empty string disables it)')
+    parser.add_argument('--mpi_cache_mb', type=int, default=2048, help='Maximum size of the MPI layer cache in MB')
+    parser.add_argument('--mpi_cache_fp16', action='store_true', help='Store the MPI planes of new cache entries as float16')
+    parser.add_argument('--depth_cache_dir', type=str, default='./Cache/Depth/', help='Directory of the disparity cache shared by the adapters (empty string disables it)')
+    parser.add_argument('--depth_cache_mb', type=int, default=512, help='Maximum size of the disparity cache in MB')
+    parser.add_argument('--baked', action='store_true', help='Only use MPI layers pre-baked by VISTA_Q_ToolKit_PreBake.py, never load network weights')
+    parser.add_argument('--model_pool_size', type=int, default=None, help='Maximum number of models kept loaded')
+    parser.add_argument('--model_pool_mb', type=int, default=None, help='Memory budget of the models kept loaded in MB')
+    parser.add_argument('--view_grid', type=int, nargs=3, metavar=('NX', 'NY', 'NZ'), default=None, help='Serve views from a pre-rendered pose lattice of this size, e.g. 17 17 5')
+    parser.add_argument('--view_grid_mode', type=str, choices=['nearest', 'bilinear'], default='bilinear', help='How views between lattice points are served')
+    parser.add_argument('--view_grid_dir', type=str, default='./Cache/ViewGrid/', help='Directory of the rendered view grids')
+    parser.add_argument('--view_grid_mb', type=int, default=8192, help='Maximum size of the rendered view grids in MB')
+
+    args = parser.parse_args()
+
+    configure_depth_service(args.depth_cache_dir, args.depth_cache_mb * 1024 * 1024)
+    server = RenderServer(
+        address=args.listen,
+        model_pool=ModelPool(
+            max_models=args.model_pool_size,
+            memory_budget_bytes=args.model_pool_mb * 1024 * 1024 if args.model_pool_mb else None
+        ),
+        mpi_cache=MPICache(args.mpi_cache_dir, args.mpi_cache_mb * 1024 * 1024, fp16=args.mpi_cache_fp16) if args.mpi_cache_dir else None,
+        baked=args.baked,
+        view_grids=ViewGridStore(args.view_grid_dir, args.view_grid, mode=args.view_grid_mode, max_bytes=args.view_grid_mb * 1024 * 1024) if args.view_grid else None,
+        models_dir=args.models_dir,
+        image_root=args.image_root,
+        token=os.environ.get(TOKEN_ENV)
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.shutdown())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: Could not listen on {args.listen}: {str(e)}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    finally:
+        server.shutdown()
+        server.model_pool.clear()
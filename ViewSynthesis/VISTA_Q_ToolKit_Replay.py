@@ -0,0 +1,198 @@
+"""
+VISTA-Q: Replay
+
+Drives VISTA_Q adapters headlessly with an interaction trace recorded by the GUIs (--record_trace),
+so that adapters can be compared under real participant motion instead of synthetic sweeps.
+
+In real-time replay, poses are issued at their recorded times and rendered like in the GUIs: while a
+view is rendered only the newest pose is kept, older ones are dropped. Frame latency is the time from
+a pose being issued to its frame being ready. With --fast every pose is rendered back to back, in
+batches of --batch poses through the adapter's generate_views() if it has one.
+
+--synthetic runs adapters copied from the template in their synthetic mode (VISTA_Q_SYNTHETIC),
+by default with a CPU-bound 40 ms per view that holds the GIL like a real model.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from vista_q_mpi_cache import MPICache
+from vista_q_model_pool import ModelPool
+from vista_q_prefetch import PreparedSequence, prepare_sequence
+from vista_q_frames import as_frame_array, generate_views
+from vista_q_trace import read_trace
+
+# Synthetic cost of --synthetic without a value, see Templates/VISTA_Q_template.py
+DEFAULT_SYNTHETIC = "latency_ms=40,latency_mode=busy"
+
+
+def percentiles(values):
+    """p50, p95 and p99 of a list of seconds, in milliseconds"""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    values = np.array(values) * 1000
+    return {f"p{q}": float(np.percentile(values, q)) for q in (50, 95, 99)}
+
+
+def replay_poses(model, poses, realtime=True, batch_size=1):
+    """
+    Render a sequence of recorded poses.
+
+    Args:
+        model: VISTA_Q adapter instance with a loaded image
+        poses (list): (t, x, y, z) tuples, t in seconds since the start of the sequence
+        realtime (bool): Issue poses at their recorded times, dropping the ones that arrive while
+            a view is rendered; otherwise render every pose back to back
+        batch_size (int): Poses rendered per generate_views() call when not in real time; the
+            render time of a batch is split evenly over its poses
+
+    Returns:
+        dict: Rendered and dropped poses, achieved fps, frame latency and render time percentiles
+    """
+    latencies = []
+    render_times = []
+    dropped = 0
+    index = 0
+    start_time = time.perf_counter()
+
+    while not realtime and batch_size > 1 and index < len(poses):
+        batch = poses[index:index + batch_size]
+        render_start = time.perf_counter()
+        for frame in generate_views(model, [(x, y, z) for _, x, y, z in batch], scale=1):
+            as_frame_array(frame)
+        per_pose = (time.perf_counter() - render_start) / len(batch)
+        render_times.extend([per_pose] * len(batch))
+        latencies.extend([per_pose] * len(batch))
+        index += len(batch)
+
+    while index < len(poses):
+        if realtime:
+            now = time.perf_counter() - start_time
+            if poses[index][0] > now:
+                time.sleep(poses[index][0] - now)
+                continue
+            # Only the newest pose issued by now is rendered
+            newest = index
+            while newest + 1 < len(poses) and poses[newest + 1][0] <= now:
+                newest += 1
+            dropped += newest - index
+            index = newest
+
+        t, x, y, z = poses[index]
+        render_start = time.perf_counter()
+        as_frame_array(model.generate_view(x, y, z, scale=1))
+        render_end = time.perf_counter()
+
+        render_times.append(render_end - render_start)
+        latencies.append(render_end - start_time - t if realtime else render_end - render_start)
+        index += 1
+
+    duration = time.perf_counter() - start_time
+    return {
+        "poses": len(poses),
+        "rendered": len(render_times),
+        "dropped": dropped,
+        "duration": duration,
+        "fps": len(render_times) / duration if duration > 0 else 0.0,
+        "latency_ms": percentiles(latencies),
+        "render_ms": percentiles(render_times),
+    }
+
+
+def replay(trace_file, model_folder=None, realtime=True, mpi_cache_dir=None, mpi_cache_mb=2048, baked=False, batch_size=1):
+    """
+    Replay every sequence of a trace.
+
+    Args:
+        trace_file (str): Trace recorded with --record_trace
+        model_folder (str, optional): Replay all sequences with this adapter instead of the recorded ones
+        realtime (bool): Issue poses at their recorded times
+        mpi_cache_dir (str, optional): Directory of the MPI layer cache
+        mpi_cache_mb (int): Maximum size of the MPI layer cache in MB
+        baked (bool): Only use pre-baked MPI layers, never load network weights
+        batch_size (int): Poses rendered per generate_views() call when not in real time
+
+    Returns:
+        list: One result dict per replayed sequence
+    """
+    sequences = read_trace(trace_file)
+    mpi_cache = MPICache(mpi_cache_dir, mpi_cache_mb * 1024 * 1024) if mpi_cache_dir else None
+    model_pool = ModelPool()
+    results = []
+
+    for entry in sequences:
+        sequence = dict(entry['sequence'])
+        if model_folder:
+            sequence['model_folder'] = model_folder
+        if not entry['poses']:
+            continue
+
+        prepared = prepare_sequence(PreparedSequence(sequence['sequence'], sequence), model_pool, mpi_cache, baked)
+        if not prepared.ready:
+            print(f"Error: Skipping sequence {sequence['sequence']}: {prepared.error}")
+            continue
+
+        with model_pool.namespace(prepared.model_folder):
+            # The GUIs show the initial view before the presentation starts
+            as_frame_array(prepared.model.generate_view(0, 0, 0, scale=1))
+            result = replay_poses(prepared.model, entry['poses'], realtime, batch_size)
+
+        result.update({
+            "sequence": sequence['sequence'],
+            "model_folder": sequence['model_folder'],
+            "image_path": sequence['image_path'],
+            "load_time": prepared.load_time,
+        })
+        results.append(result)
+        latency = result['latency_ms']
+        print(f"Status: {sequence['model_folder']} {sequence['image_path']}: "
+              f"{result['rendered']}/{result['poses']} poses rendered, {result['dropped']} dropped, "
+              f"{result['fps']:.1f} fps, latency p50 {latency['p50']:.1f} ms, "
+              f"p95 {latency['p95']:.1f} ms, p99 {latency['p99']:.1f} ms")
+
+    model_pool.clear()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='VISTA-Q: Replay an interaction trace against VISTA_Q adapters')
+    parser.add_argument('trace_file', type=str, help='Trace recorded with --record_trace')
+    parser.add_argument('--model_folder', type=str, default=None, help='Replay all sequences with this adapter instead of the recorded ones')
+    parser.add_argument('--fast', action='store_true', help='Render every pose back to back instead of at the recorded times')
+    parser.add_argument('--batch', type=int, default=1, help='With --fast, render this many poses per generate_views() call')
+    parser.add_argument('--mpi_cache_dir', type=str, default='./Cache/MPI/', help='Directory of the MPI layer cache (empty string disables it)')
+    parser.add_argument('--mpi_cache_mb', type=int, default=2048, help='Maximum size of the MPI layer cache in MB')
+    parser.add_argument('--baked', action='store_true', help='Only use MPI layers pre-baked by VISTA_Q_ToolKit_PreBake.py, never load network weights')
+    parser.add_argument('--synthetic', type=str, nargs='?', const=DEFAULT_SYNTHETIC, default=None, help=f'Run template-based adapters in their synthetic mode with this cost (default "{DEFAULT_SYNTHETIC}")')
+    parser.add_argument('--output', type=str, default=None, help='Write the results as JSON to this file')
+
+    args = parser.parse_args()
+
+    if args.synthetic is not None:
+        os.environ["VISTA_Q_SYNTHETIC"] = args.synthetic
+
+    if not os.path.exists(args.trace_file):
+        print(f"Error: Trace file not found: {args.trace_file}")
+        sys.exit(1)
+
+    try:
+        results = replay(
+            trace_file=args.trace_file,
+            model_folder=args.model_folder,
+            realtime=not args.fast,
+            mpi_cache_dir=args.mpi_cache_dir,
+            mpi_cache_mb=args.mpi_cache_mb,
+            baked=args.baked,
+            batch_size=args.batch
+        )
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"trace_file": args.trace_file, "realtime": not args.fast, "sequences": results}, f, indent=2)
+        print(f"Status: Results written to {args.output}")
+    sys.exit(0 if results else 1)
@@ -0,0 +1,227 @@
+"""
+VISTA_Q MPI Artifact
+
+Single-file, versioned format for the MPI layers of an adapter (RGB, sigma, disparity, intrinsics,
+TMPI tile metadata, ...), used by the MPI cache and by the adapters' save_mpi_layers() and
+load_mpi_layers(). The file is laid out as
+
+    <magic: 8 bytes> <format version: uint32> <header length: uint32> <JSON header>
+    <array 0, aligned to ALIGNMENT> <array 1, aligned to ALIGNMENT> ...
+
+The JSON header lists every array with its dtype, shape, offset and size, plus free-form metadata.
+Arrays are stored raw and little-endian, each starting on a page boundary, so loading only parses
+the header and memory-maps the file: it takes milliseconds and the planes are paged in by the OS
+when they are first touched. Only plain numeric dtypes are accepted and nothing is unpickled, so
+loading an artifact cannot execute code.
+
+With fp16, large floating point arrays (the MPI planes) are stored as float16, which halves the
+file and the I/O; they are converted back to their original dtype when loaded as a state.
+"""
+
+import os
+import json
+import struct
+import threading
+import numpy as np
+
+MAGIC = b"VISTAQMP"
+FORMAT_VERSION = 1
+ARTIFACT_EXTENSION = ".vqa"
+ALIGNMENT = 4096
+FP16_MIN_ELEMENTS = 65536
+_PREAMBLE = struct.Struct("<II")
+_DTYPES = ("|b1", "|u1", "|i1", "<u2", "<i2", "<i4", "<i8", "<f2", "<f4", "<f8")
+
+
+def _to_numpy(value):
+    """Convert a tensor, array or number to a numpy array"""
+    if hasattr(value, "detach"):
+        value = value.detach().cpu()
+        if str(value.dtype) == "torch.bfloat16":
+            value = value.float()
+        value = value.numpy()
+    return np.asarray(value)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_artifact(path, arrays, meta=None, fp16=False):
+    """
+    Write arrays to an artifact, atomically replacing any existing file.
+
+    Args:
+        path (str): Artifact file
+        arrays (dict): Name -> torch tensor, numpy array or number
+        meta (dict, optional): JSON-serializable metadata
+        fp16 (bool): Store floating point arrays of at least FP16_MIN_ELEMENTS elements as float16
+
+    Returns:
+        int: Size of the written file in bytes
+    """
+    entries = {}
+    blobs = []
+    for name, value in arrays.items():
+        array = _to_numpy(value)
+        source_dtype = array.dtype.newbyteorder("<") if array.dtype.byteorder == ">" else array.dtype
+        if source_dtype.str not in _DTYPES:
+            raise ValueError(f"Array {name} has unsupported dtype {array.dtype}")
+        stored_dtype = source_dtype
+        if fp16 and source_dtype.kind == "f" and source_dtype.itemsize > 2 and array.size >= FP16_MIN_ELEMENTS:
+            stored_dtype = np.dtype("<f2")
+        array = np.require(array, dtype=stored_dtype, requirements="C")
+        entries[name] = {
+            "dtype": stored_dtype.str,
+            "source_dtype": source_dtype.str,
+            "shape": list(array.shape),
+            "nbytes": int(array.nbytes),
+        }
+        blobs.append((name, array))
+
+    # The offsets depend on the header length, which depends on the offsets; reserve room for them
+    header = {"version": FORMAT_VERSION, "arrays": entries, "meta": meta or {}}
+    for entry in entries.values():
+        entry["offset"] = 0
+    reserve = len(json.dumps(header).encode("utf-8")) + 24 * len(entries)
+    offset = _align(len(MAGIC) + _PREAMBLE.size + reserve)
+    for name, array in blobs:
+        entries[name]["offset"] = offset
+        offset = _align(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8").ljust(reserve)
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_PREAMBLE.pack(FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in blobs:
+                f.seek(entries[name]["offset"])
+                f.write(memoryview(array.reshape(-1)).cast("B"))
+            # Pad the last array to the alignment, so every offset lies within the file
+            f.truncate(offset)
+            size = offset
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return size
+
+
+def is_artifact(path):
+    """Check whether a file starts with the artifact magic"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class MPIArtifact:
+    def __init__(self, path):
+        """
+        Open an artifact. Only the header is read; the arrays are memory-mapped views of the file.
+
+        Args:
+            path (str): Artifact file
+
+        Raises:
+            ValueError: If the file is not a valid artifact of a supported version
+        """
+        self.path = path
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            preamble = f.read(len(MAGIC) + _PREAMBLE.size)
+            if len(preamble) < len(MAGIC) + _PREAMBLE.size or preamble[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a VISTA_Q MPI artifact")
+            self.version, header_length = _PREAMBLE.unpack_from(preamble, len(MAGIC))
+            if self.version > FORMAT_VERSION:
+                raise ValueError(f"{path} has format version {self.version}, this toolkit reads up to {FORMAT_VERSION}")
+            try:
+                header = json.loads(f.read(header_length).decode("utf-8"))
+            except ValueError as e:
+                raise ValueError(f"{path} has a corrupt header: {str(e)}")
+
+        self.meta = header.get("meta", {})
+        self._entries = header.get("arrays", {})
+        for name, entry in self._entries.items():
+            if entry["dtype"] not in _DTYPES or entry["source_dtype"] not in _DTYPES:
+                raise ValueError(f"Array {name} of {path} has unsupported dtype {entry['dtype']}")
+            expected = int(np.prod(entry["shape"], dtype=np.int64)) * np.dtype(entry["dtype"]).itemsize
+            if entry["nbytes"] != expected or entry["offset"] < 0 or entry["offset"] + entry["nbytes"] > size:
+                raise ValueError(f"Array {name} of {path} is truncated or corrupt")
+
+        # Copy-on-write mapping: views are writable (as torch expects) but never modify the file
+        self._map = np.memmap(path, dtype=np.uint8, mode='c') if size > 0 else None
+        self._arrays = {}
+
+    def names(self):
+        """Names of the stored arrays"""
+        return list(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __getitem__(self, name):
+        """
+        Get a stored array as a memory-mapped view, without reading it.
+
+        Args:
+            name (str): Array name
+
+        Returns:
+            np.ndarray: View of the array in its stored dtype
+        """
+        if name not in self._arrays:
+            entry = self._entries[name]
+            self._arrays[name] = np.ndarray(tuple(entry["shape"]), dtype=np.dtype(entry["dtype"]),
+                                            buffer=self._map, offset=entry["offset"])
+        return self._arrays[name]
+
+    def tensor(self, name, upcast=True):
+        """
+        Get a stored array as a torch tensor sharing the mapped memory.
+
+        Args:
+            name (str): Array name
+            upcast (bool): Convert arrays stored as float16 back to their original dtype (reads them)
+
+        Returns:
+            torch.Tensor: The array
+        """
+        import torch
+
+        entry = self._entries[name]
+        array = self[name]
+        if upcast and entry["dtype"] != entry["source_dtype"]:
+            array = array.astype(np.dtype(entry["source_dtype"]))
+        return torch.from_numpy(array)
+
+    def state(self, upcast=True):
+        """
+        Get all arrays as a dict of torch tensors, as expected by set_mpi_state().
+
+        Args:
+            upcast (bool): Convert arrays stored as float16 back to their original dtype
+
+        Returns:
+            dict: Name -> tensor
+        """
+        return {name: self.tensor(name, upcast) for name in self._entries}
+
+
+def load_artifact(path):
+    """
+    Open an artifact.
+
+    Args:
+        path (str): Artifact file
+
+    Returns:
+        MPIArtifact: The opened artifact
+    """
+    return MPIArtifact(path)
@@ -0,0 +1,286 @@
+"""
+VISTA_Q Depth Service
+
+Monocular depth shared by all adapters of a process. Adapters that need a disparity map for an
+image call get_depth_service().disparity(image_path, backend) instead of running their own depth
+network: each backend is loaded once, on its first miss, and the disparity of every image is kept
+in a persistent on-disk cache keyed by the image contents and the backend. A map computed for one
+adapter is therefore reused by every other adapter with the same backend, in this and in later
+sessions; adapters with different backends never share maps.
+
+The disparity is the raw output of the backend (relative inverse depth, larger is nearer) at the
+backend's resolution; adapters resize and normalize it as their network expects.
+
+Backends are registered by name with register_depth_backend(name, factory). The factory is
+called with a torch device and returns a function mapping an image path to a float32 (H, W)
+disparity array. The name must identify everything that changes the output (network, checkpoint,
+input resolution), as it is part of the cache key. The default is "dpt-hybrid-midas" (DPT-Hybrid
+trained on MiDaS data, loaded through transformers), used by the AdaMPI adapter; adapters register
+their own backends to keep the depth of their original pipeline, e.g. TMPI's DPTWrapper.
+
+Backends stay loaded until released. Adapters name the backend they use in a depth_backend
+attribute, and the model pool releases the backends no pooled adapter names when it evicts one
+(release_depth_backends).
+
+Adapters also accept a precomputed map through load_image(image_path, disp_path=None); see
+load_disparity() for the file formats.
+"""
+
+import os
+import hashlib
+import threading
+import traceback
+import numpy as np
+from PIL import Image
+from vista_q_artifact import ARTIFACT_EXTENSION, save_artifact, load_artifact, is_artifact
+from vista_q_mpi_cache import file_digest
+
+DEFAULT_BACKEND = "dpt-hybrid-midas"
+DEPTH_CACHE_DIR = "./Cache/Depth/"
+
+_BACKENDS = {}
+
+
+def register_depth_backend(name, factory):
+    """
+    Register a depth backend.
+
+    Args:
+        name (str): Backend name, part of the cache key
+        factory (callable): Called with a torch device, returns a function image_path -> float32 (H, W) disparity
+    """
+    _BACKENDS[name] = factory
+
+
+def _dpt_hybrid_midas(device):
+    """DPT-Hybrid MiDaS through transformers"""
+    import torch
+    from transformers import DPTForDepthEstimation, DPTImageProcessor
+
+    model = DPTForDepthEstimation.from_pretrained("Intel/dpt-hybrid-midas").to(device).eval()
+    processor = DPTImageProcessor.from_pretrained("Intel/dpt-hybrid-midas")
+
+    def predict(image_path):
+        with torch.no_grad():
+            inputs = processor(images=Image.open(image_path).convert('RGB'), return_tensors="pt")
+            disparity = model(pixel_values=inputs['pixel_values'].to(device)).predicted_depth
+        return disparity.squeeze(0).float().cpu().numpy()
+
+    return predict
+
+
+register_depth_backend(DEFAULT_BACKEND, _dpt_hybrid_midas)
+
+
+def load_disparity(path):
+    """
+    Read a disparity map: a depth cache entry or other MPI artifact with a "disparity" array, a .npy
+    file, or a grayscale image (8 or 16 bit, scaled to [0, 1]).
+
+    Args:
+        path (str): Disparity file
+
+    Returns:
+        np.ndarray: float32 (H, W) disparity
+    """
+    if is_artifact(path):
+        return np.asarray(load_artifact(path)["disparity"], dtype=np.float32)
+    if path.endswith(".npy"):
+        return np.load(path, allow_pickle=False).astype(np.float32).squeeze()
+    with Image.open(path) as img:
+        disparity = np.asarray(img, dtype=np.float32)
+        if disparity.ndim == 3:
+            disparity = disparity[..., 0]
+        return disparity / (65535.0 if img.mode.startswith("I") else 255.0)
+
+
+class DepthService:
+    def __init__(self, cache_dir=DEPTH_CACHE_DIR, max_bytes=512 * 1024 ** 2, backend=DEFAULT_BACKEND, device=None):
+        """
+        Initialize the depth service. The backend is loaded on the first cache miss.
+
+        Args:
+            cache_dir (str, optional): Directory of the disparity cache, None or empty to keep no cache
+            max_bytes (int): Maximum total size of the cache entries before LRU eviction
+            backend (str): Name of the registered depth backend used when an adapter does not name one
+            device (str, optional): Torch device of the backends, defaults to CUDA when available
+        """
+        if backend not in _BACKENDS:
+            raise ValueError(f"Unknown depth backend {backend}, expected one of {sorted(_BACKENDS)}")
+        self.cache_dir = os.path.abspath(cache_dir) if cache_dir else None
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.device = device
+        self.hits = 0
+        self.misses = 0
+        self._predictors = {}
+        # Serializes backend loading and inference, adapters may load images on several threads
+        self._lock = threading.RLock()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, image_path, backend):
+        key = hashlib.sha256(f"{backend}:{file_digest(image_path)}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + ARTIFACT_EXTENSION)
+
+    def _backend(self, backend):
+        if backend not in self._predictors:
+            if backend not in _BACKENDS:
+                raise ValueError(f"Unknown depth backend {backend}, expected one of {sorted(_BACKENDS)}")
+            device = self.device
+            if device is None:
+                import torch
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+            print(f"Status: Loading depth backend {backend}")
+            self._predictors[backend] = _BACKENDS[backend](device)
+        return self._predictors[backend]
+
+    def contains(self, image_path, backend=None):
+        """Check whether the disparity of an image is cached"""
+        return bool(self.cache_dir) and os.path.exists(self._entry_path(image_path, backend or self.backend))
+
+    def disparity(self, image_path, backend=None):
+        """
+        Get the disparity of an image, from the cache or by running the backend.
+
+        Args:
+            image_path (str): Path to the input image
+            backend (str, optional): Name of a registered depth backend, defaults to the service's
+
+        Returns:
+            np.ndarray: float32 (H, W) disparity at the backend's resolution
+        """
+        backend = backend or self.backend
+        path = self.disparity_path(image_path, backend)
+        if path is not None:
+            return load_disparity(path)
+        with self._lock:
+            self.misses += 1
+            return self._backend(backend)(image_path)
+
+    def disparity_path(self, image_path, backend=None):
+        """
+        Get the cache entry holding the disparity of an image, computing it on a miss. The entry can be
+        passed to an adapter's load_image() as disp_path.
+
+        Args:
+            image_path (str): Path to the input image
+            backend (str, optional): Name of a registered depth backend, defaults to the service's
+
+        Returns:
+            str: Path of the cache entry, or None when the service keeps no cache
+        """
+        if not self.cache_dir:
+            return None
+        backend = backend or self.backend
+        path = self._entry_path(image_path, backend)
+        if os.path.exists(path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return path
+
+        with self._lock:
+            # Another thread may have computed it while this one waited
+            if os.path.exists(path):
+                self.hits += 1
+                return path
+            self.misses += 1
+            disparity = self._backend(backend)(image_path)
+        try:
+            size = save_artifact(path, {"disparity": disparity}, meta={"backend": backend, "image": os.path.basename(image_path)})
+            if self.max_bytes is not None and size > self.max_bytes:
+                os.remove(path)
+                print(f"Warning: Not caching the disparity of {image_path}, it is larger than the depth cache")
+                return None
+            self.evict()
+        except OSError as e:
+            print(f"Warning: Could not cache the disparity of {image_path}: {str(e)}")
+            traceback.print_exc()
+            return None
+        return path
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        if not self.cache_dir or self.max_bytes is None:
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ARTIFACT_EXTENSION):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cache_dir, name)))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def release(self, keep=()):
+        """
+        Free the backend models, they are loaded again on their next miss.
+
+        Args:
+            keep (iterable): Names of backends to keep loaded
+        """
+        keep = set(keep)
+        with self._lock:
+            for backend in list(self._predictors):
+                if backend not in keep:
+                    print(f"Status: Releasing depth backend {backend}")
+                    del self._predictors[backend]
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def configure_depth_service(cache_dir=DEPTH_CACHE_DIR, max_bytes=512 * 1024 ** 2, backend=DEFAULT_BACKEND, device=None):
+    """
+    Replace the depth service of this process, e.g. with the settings given on the command line.
+
+    Returns:
+        DepthService: The new service
+    """
+    global _service
+    with _service_lock:
+        _service = DepthService(cache_dir, max_bytes, backend, device)
+        return _service
+
+
+def release_depth_backends(keep=()):
+    """
+    Free the loaded depth backends of this process, unless no depth service was created yet.
+
+    Args:
+        keep (iterable): Names of backends still in use
+    """
+    with _service_lock:
+        service = _service
+    if service is not None:
+        service.release(keep)
+
+
+def get_depth_service():
+    """
+    Get the depth service of this process, created with the default settings on first use.
+
+    Returns:
+        DepthService: The shared service
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DepthService()
+        return _service
@@ -0,0 +1,297 @@
+"""
+VISTA_Q Face-Tracking Pipeline
+
+Splits face tracking into stages that run on their own threads, so that a slow stage never stalls
+the others and no stage works on stale input:
+
+    capture thread   reads the camera as fast as it delivers, keeping only the newest frame
+    landmark thread  runs the face mesh on the newest frame and publishes the head position
+    render thread    the RenderWorker, which renders only the newest requested pose
+
+Stages are connected by single-slot queues that replace their content, so the queues are bounded
+and latency cannot build up. Recordings played back as fast as possible (see vista_q_input_sources)
+are processed in lockstep instead, without dropping frames. Every stage records its processing time, and the capture timestamp
+travels with the pose to the displayed frame, which makes motion-to-photon latency measurable.
+"""
+
+import time
+import threading
+from collections import deque
+import numpy as np
+from vista_q_input_sources import TrackedPosition
+from vista_q_instrumentation import DISABLED
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# Nose tip landmark of the MediaPipe face mesh
+NOSE_TIP = 1
+
+# Size of the camera preview in the GUI
+PREVIEW_SIZE = (320, 240)
+
+
+class LatestSlot:
+    def __init__(self):
+        """Queue of capacity one: put() replaces an item that was not taken yet"""
+        self._condition = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item, block=False):
+        """
+        Store an item.
+
+        Args:
+            item: The item
+            block (bool): Wait until the previous item was taken instead of replacing it
+        """
+        with self._condition:
+            if block:
+                while self._item is not None and not self._closed:
+                    self._condition.wait()
+            elif self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Take the newest item, waiting for one if the slot is empty.
+
+        Returns:
+            The item, or None if the slot was closed or the timeout expired
+        """
+        with self._condition:
+            if self._item is None and not self._closed:
+                self._condition.wait(timeout)
+            item, self._item = self._item, None
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class StageTimer:
+    def __init__(self, name, window=300):
+        """
+        Rolling timing statistics of a pipeline stage.
+
+        Args:
+            name (str): Stage name used in reports
+            window (int): Number of recent samples the percentiles are computed over
+        """
+        self.name = name
+        self.count = 0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self._samples.append(seconds * 1000)
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self._samples.clear()
+
+    def summary(self):
+        """
+        Statistics of the recent samples.
+
+        Returns:
+            dict: count, mean, p50 and p95 in milliseconds (None without samples)
+        """
+        with self._lock:
+            samples = np.array(self._samples)
+            count = self.count
+        if len(samples) == 0:
+            return {"count": count, "mean": None, "p50": None, "p95": None}
+        return {
+            "count": count,
+            "mean": float(samples.mean()),
+            "p50": float(np.percentile(samples, 50)),
+            "p95": float(np.percentile(samples, 95)),
+        }
+
+    def format(self):
+        stats = self.summary()
+        if stats["mean"] is None:
+            return f"{self.name}: no samples"
+        return (f"{self.name}: {stats['count']} samples, mean {stats['mean']:.1f} ms, "
+                f"p50 {stats['p50']:.1f} ms, p95 {stats['p95']:.1f} ms")
+
+
+def draw_landmarks(image, points, color=(0, 255, 0)):
+    """
+    Draw landmarks as 3x3 dots, vectorized instead of one cv2.circle per point.
+
+    Args:
+        image (np.ndarray): Image (H, W, 3), drawn on in place
+        points (np.ndarray): Normalized landmark coordinates (N, 2)
+        color (tuple): Dot color in the channel order of the image
+    """
+    h, w = image.shape[:2]
+    xs = (points[:, 0] * w).astype(np.int32)
+    ys = (points[:, 1] * h).astype(np.int32)
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            px, py = xs + dx, ys + dy
+            inside = (px >= 0) & (px < w) & (py >= 0) & (py < h)
+            image[py[inside], px[inside]] = color
+
+
+class FaceTrackingPipeline(QObject):
+    # Camera preview (RGB array), emitted from the landmark thread
+    preview_ready = pyqtSignal(object)
+
+    def __init__(self, capture, face_mesh, on_head_position, draw_tracking=True, landmark_recorder=None,
+                 instrumentation=None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            capture: Input source with read() -> (ok, BGR frame or TrackedPosition) and release(),
+                see vista_q_input_sources
+            face_mesh: MediaPipe FaceMesh, used only by the landmark thread (None for landmark traces)
+            on_head_position (callable): Called on the landmark thread with (x, y, z, capture_time,
+                sample_time) of the nose tip in normalized image coordinates; capture_time is the
+                perf_counter() time of the capture, sample_time the time of the sample in its source
+            draw_tracking (bool): Draw the landmarks into the preview
+            landmark_recorder (LandmarkTraceWriter, optional): Records the tracked positions
+            instrumentation (Instrumentation, optional): Records the face-mesh span
+        """
+        super().__init__()
+        self.capture = capture
+        self.face_mesh = face_mesh
+        self.on_head_position = on_head_position
+        self.draw_tracking = draw_tracking
+        self.landmark_recorder = landmark_recorder
+        self.instrumentation = instrumentation or DISABLED
+        # Recordings played as fast as possible are processed frame by frame
+        self.lockstep = not getattr(capture, 'realtime', True)
+
+        self.frames = LatestSlot()
+        self.active = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+        # Per-stage timing
+        self.capture_timer = StageTimer("capture")
+        self.landmark_timer = StageTimer("face mesh")
+        self.preview_timer = StageTimer("preview")
+        self.motion_to_photon = StageTimer("motion-to-photon")
+
+    def start(self):
+        """Start the capture and landmark threads"""
+        for target, name in ((self._capture_loop, "VISTA_Q-capture"), (self._landmark_loop, "VISTA_Q-landmarks")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def set_active(self, active):
+        """Process frames only while a sequence is presented; the camera keeps being drained"""
+        if active:
+            self.active.set()
+        else:
+            self.active.clear()
+
+    def stop(self):
+        """Stop the threads and release the capture"""
+        self._stopping.set()
+        self.frames.close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        self.capture.release()
+        if self.landmark_recorder is not None:
+            self.landmark_recorder.close()
+
+    def _capture_loop(self):
+        while not self._stopping.is_set():
+            start_time = time.perf_counter()
+            ret, frame = self.capture.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            capture_time = time.perf_counter()
+            self.capture_timer.add(capture_time - start_time)
+            sample_time = getattr(self.capture, 'sample_time', None)
+            if sample_time is None:
+                sample_time = capture_time
+            # An older frame that the landmark thread has not taken yet is dropped, except in lockstep
+            self.frames.put((frame, capture_time, sample_time), block=self.lockstep)
+
+    def _landmark_loop(self):
+        while not self._stopping.is_set():
+            # In lockstep, recorded frames are kept until a sequence is presented
+            if self.lockstep and not self.active.wait(0.1):
+                continue
+            item = self.frames.get(timeout=0.1)
+            if item is None or not self.active.is_set():
+                continue
+            frame, capture_time, sample_time = item
+
+            if isinstance(frame, TrackedPosition):
+                # Landmark traces skip the face mesh
+                self.on_head_position(frame.x, frame.y, frame.z, capture_time, sample_time)
+                continue
+
+            import cv2
+
+            start_time = time.perf_counter()
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            results = self.face_mesh.process(rgb_frame)
+            end_time = time.perf_counter()
+            self.landmark_timer.add(end_time - start_time)
+            self.instrumentation.add_span("face-mesh", start_time, end_time)
+
+            points = None
+            if results.multi_face_landmarks:
+                face_landmarks = results.multi_face_landmarks[0]
+                nose_tip = face_landmarks.landmark[NOSE_TIP]
+                self.on_head_position(nose_tip.x, nose_tip.y, nose_tip.z, capture_time, sample_time)
+                if self.landmark_recorder is not None:
+                    self.landmark_recorder.write(nose_tip.x, nose_tip.y, nose_tip.z, sample_time)
+                if self.draw_tracking:
+                    points = np.array([(landmark.x, landmark.y) for landmark in face_landmarks.landmark], dtype=np.float32)
+
+            if self.draw_tracking:
+                start_time = time.perf_counter()
+                self.preview_ready.emit(self._make_preview(rgb_frame, points))
+                self.preview_timer.add(time.perf_counter() - start_time)
+
+    def _make_preview(self, rgb_frame, points):
+        """Downscale a frame to the preview size and draw the landmarks on the small image"""
+        import cv2
+
+        h, w = rgb_frame.shape[:2]
+        scale = min(PREVIEW_SIZE[0] / w, PREVIEW_SIZE[1] / h)
+        preview = cv2.resize(rgb_frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        if points is not None:
+            draw_landmarks(preview, points)
+        return preview
+
+    def on_frame_displayed(self, model, frame, pose, timestamp):
+        """Record motion-to-photon latency of a displayed frame (connect to RenderWorker.frame_ready)"""
+        if timestamp is not None:
+            self.motion_to_photon.add(time.perf_counter() - timestamp)
+
+    def reset_stats(self):
+        for timer in (self.capture_timer, self.landmark_timer, self.preview_timer, self.motion_to_photon):
+            timer.reset()
+
+    def report(self, render_worker=None):
+        """Print the timing of every stage"""
+        lines = [self.capture_timer.format(), self.landmark_timer.format(), self.preview_timer.format()]
+        if render_worker is not None and render_worker.rendered:
+            mean_ms = render_worker.total_render_time / render_worker.rendered * 1000
+            lines.append(f"render: {render_worker.rendered} frames, mean {mean_ms:.1f} ms, "
+                         f"{render_worker.dropped} stale poses dropped")
+        lines.append(self.motion_to_photon.format())
+        lines.append(f"camera frames dropped: {self.frames.dropped}")
+        for line in lines:
+            print(f"Status: Pipeline {line}")
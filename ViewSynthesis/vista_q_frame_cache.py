@@ -0,0 +1,142 @@
+"""
+VISTA_Q Frame Cache
+
+Opt-in wrapper around an adapter's generate_view() that keeps rendered frames in a memory-bounded
+LRU, keyed on the pose snapped to a grid. Poses are rendered at the snapped position, so a cached
+frame is exactly the frame the adapter would render for its key. Wrap the adapter once per
+sequence: the cache does not know when the adapter loads another image.
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+from vista_q_pose import quantize_pose
+from vista_q_frames import generate_views
+
+
+def frame_nbytes(frame):
+    """Approximate memory held by a rendered frame"""
+    if isinstance(frame, Image.Image):
+        return frame.width * frame.height * len(frame.getbands())
+    if isinstance(frame, np.ndarray):
+        return frame.nbytes
+    nbytes = getattr(frame, 'nbytes', None)
+    if nbytes is not None:
+        return int(nbytes)
+    return 0
+
+
+class FrameCache:
+    def __init__(self, model, step=0.001, max_bytes=256 * 1024 ** 2):
+        """
+        Wrap an adapter with a frame cache.
+
+        Args:
+            model: VISTA_Q adapter instance with a loaded image
+            step (float): Pose grid spacing; poses closer than this share a frame
+            max_bytes (int): Maximum memory of the cached frames before LRU eviction
+        """
+        self.model = model
+        self.step = step
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.cached_bytes = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Everything except generate_view and generate_views goes to the wrapped adapter
+        return getattr(self.model, name)
+
+    def generate_view(self, x, y, z=0, scale=1):
+        """
+        Generate a view, reusing the cached frame of the snapped pose if there is one.
+
+        Args:
+            x (float): X coordinate (-0.1 to 0.1)
+            y (float): Y coordinate (-0.1 to 0.1)
+            z (float): Z coordinate (-0.1 to 0.1)
+            scale (int): Scale factor for the output image size
+
+        Returns:
+            The frame returned by the adapter
+        """
+        key = quantize_pose(x, y, z, self.step) + (scale,)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return frame
+            self.misses += 1
+
+        ix, iy, iz = key[:3]
+        frame = self.model.generate_view(ix * self.step, iy * self.step, iz * self.step, scale=scale)
+        self._store(key, frame)
+        return frame
+
+    def generate_views(self, poses, scale=1):
+        """
+        Generate several views; the poses without a cached frame are rendered in one batch.
+
+        Args:
+            poses (list): (x, y, z) poses
+            scale (int): Scale factor for the output image size
+
+        Returns:
+            list: One frame per pose
+        """
+        keys = [quantize_pose(x, y, z, self.step) + (scale,) for x, y, z in poses]
+        frames = {}
+        with self._lock:
+            for key in keys:
+                frame = self._frames.get(key)
+                if frame is not None:
+                    self._frames.move_to_end(key)
+                    self.hits += 1
+                    frames[key] = frame
+                else:
+                    self.misses += 1
+        # Poses that snap to the same key are rendered once
+        missing = list(OrderedDict.fromkeys(key for key in keys if key not in frames))
+
+        if missing:
+            snapped = [(ix * self.step, iy * self.step, iz * self.step) for ix, iy, iz, _ in missing]
+            for key, frame in zip(missing, generate_views(self.model, snapped, scale=scale)):
+                frames[key] = frame
+                self._store(key, frame)
+        return [frames[key] for key in keys]
+
+    def _store(self, key, frame):
+        """Cache a rendered frame, evicting the least recently used ones beyond max_bytes"""
+        size = frame_nbytes(frame)
+        with self._lock:
+            if key not in self._frames and size <= self.max_bytes:
+                self._frames[key] = frame
+                self.cached_bytes += size
+                while self.cached_bytes > self.max_bytes:
+                    _, evicted = self._frames.popitem(last=False)
+                    self.cached_bytes -= frame_nbytes(evicted)
+
+    def hit_rate(self):
+        """Fraction of generate_view() calls served from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """Counters of the cache, for logging"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "frames": len(self._frames),
+            "cached_bytes": self.cached_bytes,
+        }
+
+    def clear(self):
+        """Drop all cached frames"""
+        with self._lock:
+            self._frames.clear()
+            self.cached_bytes = 0
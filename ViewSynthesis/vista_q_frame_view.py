@@ -0,0 +1,79 @@
+"""
+VISTA_Q Frame View
+
+Paints the frames returned by generate_view() without intermediate copies: the QImage wraps the
+memory of the frame array and is drawn with QPainter on the raster backend, without a QPixmap
+conversion. PIL images are converted to an array once. An optional text overlay (e.g. the
+instrumentation summary) is drawn on top of the frame.
+"""
+
+from PyQt6.QtCore import Qt, QRect
+from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtWidgets import QLabel
+from vista_q_frames import as_frame_array
+from vista_q_instrumentation import DISABLED
+
+
+class FrameView(QLabel):
+    def __init__(self, parent=None, instrumentation=None):
+        """
+        Label that paints a frame buffer directly, centered like a QLabel pixmap.
+
+        Args:
+            parent (QWidget, optional): Parent widget
+            instrumentation (Instrumentation, optional): Records the convert and display spans
+        """
+        super().__init__(parent)
+        self.instrumentation = instrumentation or DISABLED
+        self._frame = None
+        self._image = None
+        self._new_frame = False
+        self._overlay = None
+
+    def set_frame(self, frame):
+        """
+        Show a frame.
+
+        Args:
+            frame: PIL image, numpy array or torch tensor (see as_frame_array)
+        """
+        with self.instrumentation.span("convert"):
+            frame = as_frame_array(frame)
+            height, width = frame.shape[:2]
+
+            # The QImage only wraps the array, which is kept alive as long as the image is shown
+            self._frame = frame
+            self._image = QImage(frame.data, width, height, frame.strides[0], QImage.Format.Format_RGB888)
+        self._new_frame = True
+        self.update()
+
+    def set_overlay(self, text):
+        """Draw a text overlay over the frame (None removes it)"""
+        self._overlay = text
+        self.update()
+
+    def clear_frame(self):
+        """Stop showing the current frame"""
+        self._frame = None
+        self._image = None
+        self.update()
+
+    def paintEvent(self, event):
+        # Draw the stylesheet background and border first
+        super().paintEvent(event)
+        if self._image is None and self._overlay is None:
+            return
+        with self.instrumentation.span("display"):
+            painter = QPainter(self)
+            if self._image is not None:
+                rect = QRect(0, 0, self._image.width(), self._image.height())
+                rect.moveCenter(self.contentsRect().center())
+                painter.drawImage(rect, self._image)
+            if self._overlay:
+                painter.setPen(Qt.GlobalColor.yellow)
+                painter.drawText(self.contentsRect().adjusted(8, 8, -8, -8),
+                                 Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, self._overlay)
+            painter.end()
+        if self._new_frame:
+            self._new_frame = False
+            self.instrumentation.tick("display")
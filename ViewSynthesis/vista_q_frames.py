@@ -0,0 +1,85 @@
+"""
+VISTA_Q Frames
+
+generate_view() may return a PIL image, or a frame buffer the GUI can display without converting
+it: a contiguous uint8 array of shape (H, W, 3), or a torch tensor of that shape (or (3, H, W)).
+Float buffers in [0, 1] are accepted as well and converted once.
+
+Adapters may also implement generate_views(poses, scale=1), rendering a list of (x, y, z) poses in
+one call so that per-call setup is shared; generate_views() below falls back to generate_view().
+"""
+
+import numpy as np
+from PIL import Image
+
+
+def as_frame_array(frame):
+    """
+    Get a frame as a contiguous uint8 (H, W, 3) array, copying only when the layout requires it.
+
+    Args:
+        frame: PIL image, numpy array or torch tensor
+
+    Returns:
+        np.ndarray: uint8 array (H, W, 3)
+    """
+    if isinstance(frame, Image.Image):
+        if frame.mode != "RGB":
+            frame = frame.convert("RGB")
+        return np.asarray(frame)
+
+    if type(frame).__module__.startswith("torch"):
+        frame = frame.detach()
+        if frame.dim() == 4:
+            frame = frame[0]
+        if frame.dim() == 3 and frame.shape[0] in (3, 4) and frame.shape[-1] not in (3, 4):
+            frame = frame.permute(1, 2, 0)
+        frame = frame.cpu().numpy()
+
+    frame = np.asarray(frame)
+    if frame.ndim == 4:
+        frame = frame[0]
+    if frame.ndim == 2:
+        frame = np.repeat(frame[..., None], 3, axis=2)
+    if frame.shape[-1] == 4:
+        frame = frame[..., :3]
+    if frame.dtype != np.uint8:
+        frame = np.clip(frame, 0, 1) * 255
+        frame = (frame + 0.5).astype(np.uint8)
+    return np.ascontiguousarray(frame)
+
+
+def frame_size(frame):
+    """Width and height of a frame, whatever its type"""
+    if isinstance(frame, Image.Image):
+        return frame.size
+    height, width = as_frame_array(frame).shape[:2]
+    return width, height
+
+
+def frame_to_image(frame):
+    """Get a frame as a PIL image"""
+    if isinstance(frame, Image.Image):
+        return frame
+    return Image.fromarray(as_frame_array(frame))
+
+
+def generate_views(model, poses, scale=1):
+    """
+    Render several poses, with the adapter's generate_views() if it has one.
+
+    Args:
+        model: VISTA_Q adapter instance with a loaded image
+        poses (list): (x, y, z) poses
+        scale (int): Scale factor for the output image size
+
+    Returns:
+        list: One frame per pose, as returned by the adapter
+    """
+    poses = [(float(x), float(y), float(z)) for x, y, z in poses]
+    if not poses:
+        return []
+    batched = getattr(model, 'generate_views', None)
+    if batched is not None:
+        return list(batched(poses, scale=scale))
+    return [model.generate_view(x, y, z, scale=scale) for x, y, z in poses]
@@ -0,0 +1,314 @@
+"""
+VISTA_Q Face-Tracking Input Sources
+
+Frame sources of the face-tracking pipeline, with the read() / release() / isOpened() interface of
+cv2.VideoCapture:
+
+    CameraSource           a live camera
+    VideoFileSource        a recorded video file
+    ImageDirectorySource   the images of a directory, in file name order
+    LandmarkTraceSource    a recorded trace of nose tip positions (JSONL), which skips the face mesh
+
+Recorded sources play back in real time, or as fast as the pipeline consumes them
+(realtime=False). In the latter case every sample is processed, so a recording drives the
+tracking -> generate_view path deterministically, without a camera.
+
+A landmark trace holds one JSON object per line: a header naming the format, then one sample per
+line with the sample time in seconds and the normalized nose tip coordinates:
+
+    {"type": "vista_q_landmark_trace", "version": 1}
+    {"t": 0.033, "x": 0.51, "y": 0.48, "z": -0.02}
+
+Traces recorded before the header was added are still read. OpenCV is only imported by the camera,
+video and image sources, so landmark traces play back without it.
+"""
+
+import os
+import json
+import time
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+TRACE_EXTENSIONS = ('.jsonl',)
+LANDMARK_TRACE_TYPE = "vista_q_landmark_trace"
+LANDMARK_TRACE_VERSION = 1
+
+
+class TrackedPosition:
+    def __init__(self, x, y, z):
+        """Nose tip position of a landmark trace, delivered in place of a camera frame"""
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class PlaybackSource:
+    def __init__(self, realtime=True, loop=True):
+        """
+        Base class of recorded sources.
+
+        Subclasses implement _read_sample() -> (ok, sample, sample_time) and _rewind().
+
+        Args:
+            realtime (bool): Deliver samples at their recorded times instead of as fast as possible
+            loop (bool): Restart at the end instead of reporting the end of the recording
+        """
+        self.realtime = realtime
+        self.loop = loop
+        self.sample_time = None
+        self.finished = False
+        self._start_time = None
+        self._time_offset = 0.0
+        self._last_sample_time = None
+        # Time between the last sample and the first sample of the next loop
+        self.frame_interval = 1 / 30
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        """
+        Read the next sample, waiting for its time in real-time playback.
+
+        Returns:
+            tuple: (ok, sample), the sample being a BGR frame or a TrackedPosition
+        """
+        ok, sample, sample_time = self._read_sample()
+        if not ok and self.loop and self._last_sample_time is not None:
+            # Continue the clock across the restart
+            self._time_offset += self._last_sample_time + self.frame_interval
+            self._rewind()
+            ok, sample, sample_time = self._read_sample()
+        if not ok:
+            self.finished = True
+            return False, None
+
+        self._last_sample_time = sample_time
+        self.sample_time = self._time_offset + sample_time
+        if self.realtime:
+            if self._start_time is None:
+                self._start_time = time.perf_counter() - self.sample_time
+            delay = self._start_time + self.sample_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return True, sample
+
+    def release(self):
+        pass
+
+
+class CameraSource:
+    def __init__(self, device=0, fps=30):
+        """
+        Live camera, keeping as few frames buffered as the driver allows.
+
+        Args:
+            device (int): Camera device index
+            fps (int): Requested capture frame rate
+        """
+        import cv2
+
+        self.realtime = True
+        self.finished = False
+        self.sample_time = None
+        self.capture = cv2.VideoCapture(device)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open camera {device}")
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.capture.set(cv2.CAP_PROP_FPS, fps)
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        ok, frame = self.capture.read()
+        self.sample_time = time.perf_counter()
+        return ok, frame
+
+    def release(self):
+        self.capture.release()
+
+
+class VideoFileSource(PlaybackSource):
+    def __init__(self, path, realtime=True, loop=True, fps=None):
+        """
+        Recorded video file.
+
+        Args:
+            path (str): Video file readable by OpenCV
+            realtime (bool): Play back at the frame rate of the video
+            loop (bool): Restart at the end of the video
+            fps (float, optional): Frame rate overriding the one stored in the file
+        """
+        import cv2
+
+        super().__init__(realtime, loop)
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video file {path}")
+        self.fps = fps or self.capture.get(cv2.CAP_PROP_FPS) or 30
+        self.frame_interval = 1 / self.fps
+        self._index = 0
+
+    def _read_sample(self):
+        ok, frame = self.capture.read()
+        if not ok:
+            return False, None, None
+        sample_time = self._index / self.fps
+        self._index += 1
+        return True, frame, sample_time
+
+    def _rewind(self):
+        import cv2
+
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._index = 0
+
+    def release(self):
+        self.capture.release()
+
+
+class ImageDirectorySource(PlaybackSource):
+    def __init__(self, path, realtime=True, loop=True, fps=30):
+        """
+        Images of a directory, in file name order.
+
+        Args:
+            path (str): Directory of the images
+            realtime (bool): Play back at fps
+            loop (bool): Restart after the last image
+            fps (float): Playback frame rate
+        """
+        super().__init__(realtime, loop)
+        self.path = path
+        self.fps = fps
+        self.frame_interval = 1 / fps
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            raise IOError(f"No images found in {path}")
+        self._index = 0
+
+    def _read_sample(self):
+        import cv2
+
+        while self._index < len(self.files):
+            file_path = self.files[self._index]
+            sample_time = self._index / self.fps
+            self._index += 1
+            frame = cv2.imread(file_path)
+            if frame is not None:
+                return True, frame, sample_time
+            print(f"Warning: Skipping unreadable image {file_path}")
+        return False, None, None
+
+    def _rewind(self):
+        self._index = 0
+
+
+class LandmarkTraceSource(PlaybackSource):
+    def __init__(self, path, realtime=True, loop=True):
+        """
+        Recorded nose tip positions (JSONL), see LandmarkTraceWriter.
+
+        Args:
+            path (str): Trace file
+            realtime (bool): Play back at the recorded sample times
+            loop (bool): Restart after the last sample
+        """
+        super().__init__(realtime, loop)
+        self.path = path
+        self.samples = []
+        with open(path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    if 'type' in record or 'sequence' in record:
+                        if record.get('type') != LANDMARK_TRACE_TYPE or line_number > 1:
+                            raise IOError(f"{path} is not a landmark trace (found a {record.get('type', 'pose trace')} record)")
+                        if record.get('version', 1) > LANDMARK_TRACE_VERSION:
+                            raise IOError(f"{path} has landmark trace version {record['version']}, this toolkit reads up to {LANDMARK_TRACE_VERSION}")
+                        continue
+                    self.samples.append((float(record['t']), TrackedPosition(
+                        float(record['x']), float(record['y']), float(record.get('z', 0.0))
+                    )))
+                except (ValueError, KeyError) as e:
+                    raise IOError(f"Invalid landmark trace record in {path}, line {line_number}: {str(e)}")
+        if not self.samples:
+            raise IOError(f"Landmark trace {path} is empty")
+        # Sample times relative to the first sample
+        first_time = self.samples[0][0]
+        self.samples = [(t - first_time, position) for t, position in self.samples]
+        if len(self.samples) > 1:
+            self.frame_interval = self.samples[-1][0] / (len(self.samples) - 1)
+        self._index = 0
+
+    def _read_sample(self):
+        if self._index >= len(self.samples):
+            return False, None, None
+        sample_time, position = self.samples[self._index]
+        self._index += 1
+        return True, position, sample_time
+
+    def _rewind(self):
+        self._index = 0
+
+
+class LandmarkTraceWriter:
+    def __init__(self, path):
+        """
+        Record tracked nose tip positions as a landmark trace.
+
+        Args:
+            path (str): Trace file to write
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, 'w')
+        self._file.write(json.dumps({"type": LANDMARK_TRACE_TYPE, "version": LANDMARK_TRACE_VERSION}) + "\n")
+        self._start_time = None
+
+    def write(self, x, y, z, sample_time):
+        if self._start_time is None:
+            self._start_time = sample_time
+        self._file.write(json.dumps({
+            "t": round(sample_time - self._start_time, 6), "x": x, "y": y, "z": z
+        }) + "\n")
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def open_input_source(spec=None, fps=30, realtime=True, loop=True):
+    """
+    Open a face-tracking input source.
+
+    Args:
+        spec (str, optional): Camera index, video file, image directory or landmark trace (.jsonl);
+            camera 0 if not given
+        fps (float): Camera frame rate, and playback frame rate of image directories
+        realtime (bool): Play recordings in real time instead of as fast as possible
+        loop (bool): Restart recordings at their end
+
+    Returns:
+        The opened source
+
+    Raises:
+        IOError: If the source cannot be opened
+    """
+    if spec is None or str(spec).isdigit():
+        return CameraSource(int(spec or 0), fps)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, realtime, loop, fps)
+    if not os.path.exists(spec):
+        raise IOError(f"Input source not found: {spec}")
+    if spec.lower().endswith(TRACE_EXTENSIONS):
+        return LandmarkTraceSource(spec, realtime, loop)
+    return VideoFileSource(spec, realtime, loop)
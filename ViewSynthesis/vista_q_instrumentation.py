@@ -0,0 +1,235 @@
+"""
+VISTA_Q Instrumentation
+
+Lightweight timing of the interactive hot path:
+
+    spans       durations of named steps (render, convert, display, face-mesh), with rolling
+                percentiles and latency histograms
+    rates       rolling events per second (rendered and displayed frames)
+    gauges      sampled values such as the render queue depth
+
+Spans can also be kept as events and exported as Chrome trace JSON, which opens in
+chrome://tracing and ui.perfetto.dev.
+
+A disabled instance returns a shared no-op span and ignores all calls, so the hooks can stay in the
+hot path at near zero cost. Components take an optional instance and fall back to DISABLED.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque, defaultdict
+import numpy as np
+
+# Upper bounds of the latency histogram buckets in milliseconds (the last bucket is open)
+HISTOGRAM_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('owner', 'name', 'start')
+
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.owner.add_span(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Instrumentation:
+    def __init__(self, enabled=False, keep_trace=False, window=1000, max_trace_events=500000):
+        """
+        Initialize the instrumentation.
+
+        Args:
+            enabled (bool): Record spans, rates and gauges; a disabled instance does nothing
+            keep_trace (bool): Keep every span as an event for export_chrome_trace()
+            window (int): Number of recent samples per span the statistics are computed over
+            max_trace_events (int): Most recent trace events kept
+        """
+        self.enabled = enabled
+        self.keep_trace = enabled and keep_trace
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._histograms = defaultdict(lambda: [0] * (len(HISTOGRAM_EDGES_MS) + 1))
+        self._ticks = defaultdict(lambda: deque(maxlen=window))
+        self._gauges = {}
+        self._events = deque(maxlen=max_trace_events)
+        self._thread_names = {}
+
+    def span(self, name):
+        """
+        Time a block: with instrumentation.span("render"): ...
+
+        Args:
+            name (str): Span name
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def add_span(self, name, start, end):
+        """
+        Record a span measured by the caller.
+
+        Args:
+            name (str): Span name
+            start (float): perf_counter() time the step started
+            end (float): perf_counter() time the step ended
+        """
+        if not self.enabled:
+            return
+        duration = end - start
+        bucket = int(np.searchsorted(HISTOGRAM_EDGES_MS, duration * 1000))
+        with self._lock:
+            self._samples[name].append(duration)
+            self._counts[name] += 1
+            self._histograms[name][bucket] += 1
+            if self.keep_trace:
+                thread = threading.current_thread()
+                self._thread_names.setdefault(thread.ident, thread.name)
+                self._events.append(("X", name, start, duration, thread.ident))
+
+    def tick(self, name):
+        """Count an event for the rolling rate of name, e.g. a displayed frame"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            self._ticks[name].append(now)
+
+    def gauge(self, name, value):
+        """Sample a value, e.g. a queue depth"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            self._gauges[name] = value
+            if self.keep_trace:
+                self._events.append(("C", name, now, value, None))
+
+    def rate(self, name, period=1.0):
+        """Events per second of name over the last period seconds"""
+        now = time.perf_counter()
+        with self._lock:
+            recent = [t for t in self._ticks.get(name, ()) if now - t <= period]
+        return len(recent) / period
+
+    def stats(self, name):
+        """
+        Statistics of the recent samples of a span.
+
+        Returns:
+            dict: count, mean, p50, p95, p99 and max in milliseconds, or None without samples
+        """
+        with self._lock:
+            samples = np.array(self._samples.get(name, ()))
+            count = self._counts.get(name, 0)
+        if len(samples) == 0:
+            return None
+        samples = samples * 1000
+        return {
+            "count": count,
+            "mean": float(samples.mean()),
+            "p50": float(np.percentile(samples, 50)),
+            "p95": float(np.percentile(samples, 95)),
+            "p99": float(np.percentile(samples, 99)),
+            "max": float(samples.max()),
+        }
+
+    def histogram(self, name):
+        """
+        Latency histogram of all samples of a span.
+
+        Returns:
+            list: (label, count) per bucket of HISTOGRAM_EDGES_MS
+        """
+        with self._lock:
+            counts = list(self._histograms.get(name, [0] * (len(HISTOGRAM_EDGES_MS) + 1)))
+        labels = [f"<{edge}ms" for edge in HISTOGRAM_EDGES_MS] + [f">={HISTOGRAM_EDGES_MS[-1]}ms"]
+        return list(zip(labels, counts))
+
+    def overlay_text(self):
+        """Short multi-line summary for the on-screen overlay"""
+        lines = [f"display {self.rate('display'):.0f} fps  render {self.rate('render'):.0f} fps"]
+        with self._lock:
+            names = list(self._samples)
+            gauges = dict(self._gauges)
+        for name in names:
+            stats = self.stats(name)
+            if stats is not None:
+                lines.append(f"{name} p50 {stats['p50']:.1f}  p95 {stats['p95']:.1f} ms")
+        for name, value in gauges.items():
+            lines.append(f"{name} {value}")
+        return "\n".join(lines)
+
+    def report(self):
+        """Print the statistics and histograms of all spans"""
+        if not self.enabled:
+            return
+        with self._lock:
+            names = list(self._samples)
+        for name in names:
+            stats = self.stats(name)
+            if stats is None:
+                continue
+            print(f"Status: Span {name}: {stats['count']} samples, mean {stats['mean']:.1f} ms, "
+                  f"p50 {stats['p50']:.1f} ms, p95 {stats['p95']:.1f} ms, p99 {stats['p99']:.1f} ms, "
+                  f"max {stats['max']:.1f} ms")
+            buckets = "  ".join(f"{label}: {count}" for label, count in self.histogram(name) if count)
+            print(f"Status: Span {name} histogram: {buckets}")
+
+    def export_chrome_trace(self, path):
+        """
+        Write the kept events as Chrome trace JSON.
+
+        Args:
+            path (str): Output file
+
+        Returns:
+            int: Number of exported events
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+
+        trace_events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        for phase, name, start, value, tid in events:
+            timestamp = (start - self._origin) * 1e6
+            if phase == "X":
+                trace_events.append({"name": name, "ph": "X", "ts": timestamp, "dur": value * 1e6, "pid": pid, "tid": tid})
+            else:
+                trace_events.append({"name": name, "ph": "C", "ts": timestamp, "pid": pid, "args": {name: value}})
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+# Shared instance of components that were not given one
+DISABLED = Instrumentation(enabled=False)
@@ -0,0 +1,100 @@
+"""
+VISTA_Q Adapter Loader
+
+Imports the VISTA_Q.py adapter of a model folder the same way for the GUIs and the command-line tools.
+The adapter file and class come from the folder's VISTA_Q.json manifest when it has one.
+"""
+
+import os
+import sys
+import contextlib
+import importlib.util
+from vista_q_manifest import read_manifest, entry_point, check_capabilities
+
+
+def adapter_module_name(model_folder):
+    """Unique module name for the adapter of a model folder"""
+    return f"VISTA_Q_{model_folder.replace('./', '').replace('/', '_')}"
+
+
+@contextlib.contextmanager
+def model_search_path(model_folder):
+    """
+    Temporarily put a model folder and its parent directory on sys.path,
+    so that the adapter can use plain imports of its helper modules.
+
+    Args:
+        model_folder (str): Directory containing VISTA_Q.py
+    """
+    original_sys_path = sys.path.copy()
+    model_dir = os.path.abspath(model_folder)
+    parent_dir = os.path.dirname(model_dir)
+
+    # Add both the model directory and parent directory to sys.path
+    sys.path.insert(0, model_dir)
+    sys.path.insert(0, parent_dir)
+    try:
+        yield model_dir
+    finally:
+        # Restore the original sys.path
+        sys.path = original_sys_path
+
+
+def import_vista_q_module(model_folder):
+    """
+    Import the adapter module of a model folder (VISTA_Q.py unless its manifest names another file).
+
+    Must be called inside model_search_path() for the adapter's helper imports to resolve.
+
+    Args:
+        model_folder (str): Directory containing VISTA_Q.py
+
+    Returns:
+        module: The freshly executed adapter module
+    """
+    module_path, _ = entry_point(read_manifest(model_folder))
+    return import_adapter_file(module_path, adapter_module_name(model_folder))
+
+
+def construct_adapter(module, model_folder):
+    """
+    Construct the adapter class of an imported adapter module and warn where it contradicts the
+    capabilities of its manifest.
+
+    Args:
+        module: Module returned by import_vista_q_module()
+        model_folder (str): Model folder of the module, whose manifest names the class
+
+    Returns:
+        The adapter instance
+    """
+    manifest = read_manifest(model_folder)
+    _, class_name = entry_point(manifest)
+    adapter = getattr(module, class_name)()
+    for problem in check_capabilities(manifest, adapter):
+        print(f"Warning: {problem}")
+    return adapter
+
+
+def import_adapter_file(module_path, module_name):
+    """
+    Import an adapter module from a file, e.g. the template adapter.
+
+    Args:
+        module_path (str): Path to the adapter's .py file
+        module_name (str): Unique name of the module
+
+    Returns:
+        module: The freshly executed adapter module
+    """
+    # Force reload the VISTA_Q module
+    if module_name in sys.modules:
+        del sys.modules[module_name]
+
+    # Import the module using a unique name to avoid namespace conflicts
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+
+    # Execute the module in its own namespace
+    spec.loader.exec_module(module)
+    return module
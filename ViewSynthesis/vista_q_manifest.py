@@ -0,0 +1,204 @@
+"""
+VISTA_Q Adapter Manifest
+
+Describes an adapter without importing it. A model folder may hold a VISTA_Q.json next to its
+VISTA_Q.py, e.g.
+
+    {
+        "name": "TMPI_256",
+        "entry_point": "VISTA_Q.py:VISTA_Q",
+        "capabilities": ["generate_views", "mpi_state", "disp_path"],
+        "resolution": [256, 256],
+        "memory_mb": 1024,
+        "dependencies": ["torch", "numpy", "PIL"],
+        "optional_dependencies": ["OpenGL"]
+    }
+
+- entry_point: adapter file in the folder and the class the toolkit constructs
+- capabilities: optional hooks the adapter implements (see CAPABILITIES), checked against the
+  adapter once it is constructed (see check_capabilities)
+- resolution: nominal (height, width) of the rendered views
+- memory_mb: estimated memory of the loaded adapter, used by the model pool before the weights are
+  loaded and measured
+- dependencies: top-level packages the adapter imports, checked with importlib.util.find_spec()
+  so a missing package is reported when the test sequences are read instead of mid-session
+- optional_dependencies: packages the adapter can do without, e.g. for a faster renderer; a missing
+  one is reported but does not stop the adapter from loading
+
+Every field is optional; folders without a manifest get the defaults of a plain VISTA_Q.py.
+Reading manifests is cheap, so the GUIs and tools can list and check adapters at startup and leave
+importing them (and torch, transformers, OpenGL, ...) to the background loader.
+"""
+
+import os
+import json
+import inspect
+import importlib.util
+
+MANIFEST_NAME = "VISTA_Q.json"
+DEFAULT_ENTRY_POINT = "VISTA_Q.py:VISTA_Q"
+CAPABILITIES = ("generate_views", "mpi_state", "disp_path", "memory_footprint", "cleanup")
+# Adapter methods that implement each capability
+CAPABILITY_METHODS = {
+    "generate_views": ("generate_views",),
+    "mpi_state": ("cache_signature", "get_mpi_state", "set_mpi_state"),
+    "memory_footprint": ("memory_footprint",),
+    "cleanup": ("cleanup",),
+}
+
+
+def read_manifest(model_folder):
+    """
+    Read the manifest of a model folder, filling in the defaults.
+
+    Args:
+        model_folder (str): Directory containing VISTA_Q.py
+
+    Returns:
+        dict: Manifest with all fields, plus 'model_folder' and 'has_manifest'
+    """
+    manifest = {
+        "name": os.path.basename(os.path.normpath(model_folder)),
+        "entry_point": DEFAULT_ENTRY_POINT,
+        "capabilities": [],
+        "resolution": None,
+        "memory_mb": None,
+        "dependencies": [],
+        "optional_dependencies": [],
+    }
+    path = os.path.join(model_folder, MANIFEST_NAME)
+    has_manifest = os.path.isfile(path)
+    if has_manifest:
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+            manifest.update({key: value for key, value in data.items() if key in manifest})
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable manifest {path}: {str(e)}")
+            has_manifest = False
+
+    manifest["model_folder"] = model_folder
+    manifest["has_manifest"] = has_manifest
+    return manifest
+
+
+def entry_point(manifest):
+    """
+    Split the entry point of a manifest.
+
+    Returns:
+        tuple: (path of the adapter file, name of the adapter class)
+    """
+    file_name, _, class_name = manifest["entry_point"].partition(":")
+    return os.path.join(manifest["model_folder"], file_name), class_name or "VISTA_Q"
+
+
+def discover_models(models_dir="./Models"):
+    """
+    List the model folders of a directory with their manifests, without importing any adapter.
+
+    Args:
+        models_dir (str): Directory holding the model folders
+
+    Returns:
+        list: Manifests of the folders whose entry point exists, sorted by folder name
+    """
+    manifests = []
+    if not os.path.isdir(models_dir):
+        return manifests
+    for name in sorted(os.listdir(models_dir)):
+        model_folder = os.path.join(models_dir, name)
+        if not os.path.isdir(model_folder):
+            continue
+        manifest = read_manifest(model_folder)
+        if os.path.isfile(entry_point(manifest)[0]):
+            manifests.append(manifest)
+    return manifests
+
+
+def missing_dependencies(manifest, key="dependencies"):
+    """Dependencies of a manifest (or its optional_dependencies) that are not installed, found without importing them"""
+    missing = []
+    for name in manifest[key]:
+        try:
+            if importlib.util.find_spec(name) is None:
+                missing.append(name)
+        except (ImportError, ValueError):
+            missing.append(name)
+    return missing
+
+
+def check_models(model_folders):
+    """
+    Check the model folders of a test sequence before any of them is loaded.
+
+    Args:
+        model_folders (iterable): Model folders used by the test sequences
+
+    Returns:
+        list: Problems found, as messages
+    """
+    problems = []
+    for model_folder in dict.fromkeys(model_folders):
+        manifest = read_manifest(model_folder)
+        module_path = entry_point(manifest)[0]
+        if not os.path.isfile(module_path):
+            problems.append(f"{model_folder} has no adapter {os.path.basename(module_path)}")
+            continue
+        unknown = set(manifest["capabilities"]) - set(CAPABILITIES)
+        if unknown:
+            problems.append(f"{model_folder} lists unknown capabilities {sorted(unknown)}")
+        missing = missing_dependencies(manifest)
+        if missing:
+            problems.append(f"{model_folder} needs {', '.join(missing)}, which is not installed")
+        missing = missing_dependencies(manifest, "optional_dependencies")
+        if missing:
+            problems.append(f"{model_folder} can use {', '.join(missing)}, which is not installed (optional)")
+    return problems
+
+
+def adapter_capabilities(adapter):
+    """
+    Capabilities an adapter instance actually implements.
+
+    Args:
+        adapter: Constructed adapter
+
+    Returns:
+        set: Names from CAPABILITIES
+    """
+    found = {name for name, methods in CAPABILITY_METHODS.items()
+             if all(callable(getattr(adapter, method, None)) for method in methods)}
+    try:
+        if "disp_path" in inspect.signature(adapter.load_image).parameters:
+            found.add("disp_path")
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return found
+
+
+def check_capabilities(manifest, adapter):
+    """
+    Compare the capabilities a manifest lists with those its adapter implements. The toolkit
+    detects the hooks on the adapter, so a manifest that contradicts the code would otherwise
+    go unnoticed.
+
+    Args:
+        manifest (dict): Manifest returned by read_manifest()
+        adapter: Adapter constructed from the manifest's entry point
+
+    Returns:
+        list: Problems found, as messages; empty for folders without a manifest
+    """
+    if not manifest["has_manifest"]:
+        return []
+    listed = set(manifest["capabilities"]) & set(CAPABILITIES)
+    found = adapter_capabilities(adapter)
+    problems = []
+    if listed - found:
+        problems.append(f"{manifest['model_folder']} lists capabilities {sorted(listed - found)} its adapter does not implement")
+    if found - listed:
+        problems.append(f"{manifest['model_folder']} implements capabilities {sorted(found - listed)} its manifest does not list")
+    return problems
@@ -0,0 +1,365 @@
+"""
+VISTA_Q Model Pool
+
+Keeps one loaded VISTA_Q adapter instance per model folder alive across test sequences.
+
+Adapters import their helpers with plain imports (model, utils, config, ...), and different model
+folders use the same names. Instead of purging those names from sys.modules between sequences,
+every pooled adapter owns a private namespace: the helper modules loaded from its folder are taken
+out of sys.modules after each load step and put back only while that adapter is loading or active.
+
+A load step holds the pool lock with its adapter's namespace installed. activate() never waits for
+it: it records the new active adapter and swaps the modules right away if the pool lock is free,
+otherwise the load step installs the active adapter's modules when it finishes. While another
+adapter loads, the active adapter's helpers are out of sys.modules, so adapters import their
+helpers at module level or in load_model()/load_image(), not in generate_view().
+
+Depth networks live in the shared depth service (vista_q_depth), outside the pool. Evicting an
+adapter also frees the depth backends that no remaining adapter names in its depth_backend.
+"""
+
+import os
+import sys
+import gc
+import time
+import threading
+import contextlib
+import traceback
+from collections import OrderedDict
+from vista_q_loader import model_search_path, import_vista_q_module, construct_adapter
+from vista_q_manifest import read_manifest
+from vista_q_depth import release_depth_backends
+
+
+def _module_in_dir(module, directory):
+    """Check whether a module was loaded from inside a directory"""
+    paths = []
+    module_file = getattr(module, '__file__', None)
+    if isinstance(module_file, str):
+        paths.append(module_file)
+    try:
+        paths.extend(p for p in getattr(module, '__path__', None) or [] if isinstance(p, str))
+    except TypeError:
+        # Some extension modules expose a non-iterable __path__
+        pass
+    for path in paths:
+        try:
+            path = os.path.realpath(path)
+        except (TypeError, ValueError):
+            continue
+        if path == directory or path.startswith(directory + os.sep):
+            return True
+    return False
+
+
+def estimate_model_bytes(model):
+    """
+    Estimate the memory held by an adapter instance.
+
+    Uses the adapter's memory_footprint() if it has one, otherwise sums the torch modules and tensors
+    reachable from its attributes (two levels deep, e.g. a wrapper's .model).
+
+    Args:
+        model: VISTA_Q adapter instance
+
+    Returns:
+        int: Estimated size in bytes
+    """
+    if hasattr(model, 'memory_footprint'):
+        try:
+            return int(model.memory_footprint())
+        except Exception as e:
+            print(f"Warning: memory_footprint() failed: {str(e)}")
+
+    try:
+        import torch
+    except ImportError:
+        return 0
+
+    seen = set()
+
+    def size_of(value, depth):
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        if isinstance(value, torch.nn.Module):
+            tensors = list(value.parameters()) + list(value.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors)
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, dict):
+            return sum(size_of(v, depth) for v in value.values())
+        if depth > 0 and hasattr(value, '__dict__'):
+            return sum(size_of(v, depth - 1) for v in vars(value).values())
+        return 0
+
+    return size_of(model, 2)
+
+
+class PooledModel:
+    def __init__(self, model_folder, module, instance, modules):
+        """
+        A pooled adapter instance.
+
+        Args:
+            model_folder (str): Model folder the adapter was loaded from
+            module: Adapter module
+            instance: VISTA_Q instance
+            modules (dict): Private helper modules of the adapter, by name
+        """
+        self.model_folder = model_folder
+        self.model_dir = os.path.realpath(os.path.abspath(model_folder))
+        self.module = module
+        self.instance = instance
+        self.modules = modules
+        self.weights_loaded = False
+        self.size_bytes = 0
+        self.last_used = time.time()
+
+
+class ModelPool:
+    def __init__(self, max_models=None, memory_budget_bytes=None):
+        """
+        Initialize the model pool.
+
+        Args:
+            max_models (int, optional): Maximum number of pooled adapters
+            memory_budget_bytes (int, optional): Maximum estimated memory of the pooled adapters
+        """
+        self.max_models = max_models
+        self.memory_budget_bytes = memory_budget_bytes
+        self.active_folder = None
+        self._entries = OrderedDict()
+        # Held while an adapter's namespace is installed, i.e. for the whole of an import or load step,
+        # and whenever sys.modules is changed
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        # Held only briefly while switching the active adapter, so the GUI never waits for a background load
+        self._active_lock = threading.Lock()
+        # Set by activate() until the active adapter's modules are installed
+        self._swap_pending = False
+        # Entry whose modules are installed as the active adapter's
+        self._installed = None
+
+    @staticmethod
+    def _key(model_folder):
+        return os.path.realpath(os.path.abspath(model_folder))
+
+    def __contains__(self, model_folder):
+        return self._key(model_folder) in self._entries
+
+    def get_entry(self, model_folder):
+        """Get the pool entry of a model folder, or None if it is not pooled"""
+        return self._entries.get(self._key(model_folder))
+
+    def _install(self, entry):
+        """Put an entry's private modules into sys.modules"""
+        for name, module in entry.modules.items():
+            sys.modules[name] = module
+
+    def _uninstall(self, entry):
+        """Take an entry's private modules out of sys.modules"""
+        for name, module in entry.modules.items():
+            if sys.modules.get(name) is module:
+                del sys.modules[name]
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the pool lock, installing the active adapter's modules on release if activate() had to defer it"""
+        with self._lock:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+        self._swap_active()
+
+    def _swap_active(self):
+        """Install the modules of the active adapter, unless another thread holds the pool lock"""
+        while self._swap_pending:
+            if not self._lock.acquire(blocking=False):
+                # The holder installs them when it releases the lock, see _locked()
+                return
+            try:
+                if self._lock_depth:
+                    # This thread is inside a load step, which installs them when it finishes
+                    return
+                self._install_active()
+            finally:
+                self._lock.release()
+
+    def _install_active(self):
+        """Replace the installed adapter modules with the active adapter's. Called with the pool lock held."""
+        with self._active_lock:
+            self._swap_pending = False
+            active = self.get_entry(self.active_folder) if self.active_folder else None
+        if self._installed is not None and self._installed is not active:
+            self._uninstall(self._installed)
+        if active is not None:
+            self._install(active)
+        self._installed = active
+
+    @contextlib.contextmanager
+    def _namespace(self, entry):
+        with self._locked():
+            if self._installed is not None and self._installed is not entry:
+                self._uninstall(self._installed)
+            self._installed = None
+            self._install(entry)
+            before = set(sys.modules)
+            try:
+                with model_search_path(entry.model_folder):
+                    yield entry
+            finally:
+                # Collect the helper modules the adapter imported from its own folder
+                for name in set(sys.modules) - before:
+                    module = sys.modules[name]
+                    if _module_in_dir(module, entry.model_dir):
+                        entry.modules[name] = module
+                self._uninstall(entry)
+                # The adapter may have been activated in the meantime
+                self._install_active()
+
+    def namespace(self, model_folder):
+        """
+        Context manager that makes a pooled adapter's helper modules importable.
+
+        Wrap every call that may import adapter helpers (load_model, load_image, ...) in it.
+
+        Args:
+            model_folder (str): Model folder of a pooled adapter
+        """
+        entry = self.get_entry(model_folder)
+        if entry is None:
+            raise KeyError(f"{model_folder} is not in the model pool")
+        return self._namespace(entry)
+
+    def acquire(self, model_folder):
+        """
+        Get the adapter instance of a model folder, importing and constructing it on first use.
+
+        Args:
+            model_folder (str): Directory containing VISTA_Q.py
+
+        Returns:
+            The pooled VISTA_Q instance
+        """
+        key = self._key(model_folder)
+        with self._locked():
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = PooledModel(model_folder, None, None, {})
+                # Until the weights are loaded and measured, count the estimate of the adapter's manifest
+                memory_mb = read_manifest(model_folder)["memory_mb"]
+                entry.size_bytes = int(memory_mb * 1024 * 1024) if memory_mb else 0
+                with self._namespace(entry):
+                    entry.module = import_vista_q_module(model_folder)
+                    entry.instance = construct_adapter(entry.module, model_folder)
+                self._entries[key] = entry
+                print(f"Status: Model pool loaded {model_folder}")
+            else:
+                print(f"Status: Model pool reused {model_folder}")
+
+            self._entries.move_to_end(key)
+            entry.last_used = time.time()
+            self.enforce_budget(keep=model_folder)
+            return entry.instance
+
+    def ensure_weights(self, model_folder):
+        """
+        Load the weights of a pooled adapter unless they are already loaded.
+
+        Args:
+            model_folder (str): Model folder of a pooled adapter
+
+        Returns:
+            bool: True if the weights are loaded
+        """
+        entry = self.get_entry(model_folder)
+        if entry is None:
+            raise KeyError(f"{model_folder} is not in the model pool")
+        if entry.weights_loaded:
+            return True
+        if not hasattr(entry.instance, 'load_model'):
+            return False
+
+        with self._namespace(entry):
+            result = entry.instance.load_model()
+        entry.weights_loaded = result is not False
+        if entry.weights_loaded:
+            entry.size_bytes = estimate_model_bytes(entry.instance)
+            print(f"Status: {model_folder} holds ~{entry.size_bytes / 1024 ** 2:.0f} MB")
+            self.enforce_budget(keep=model_folder)
+        return entry.weights_loaded
+
+    def activate(self, model_folder):
+        """
+        Mark a pooled adapter as the one being presented; its helper modules stay installed and it is never evicted.
+
+        Never waits for a load step on another thread: the modules are then swapped when it finishes.
+
+        Args:
+            model_folder (str): Model folder of a pooled adapter, or None to deactivate
+        """
+        with self._active_lock:
+            self.active_folder = model_folder
+            self._swap_pending = True
+        self._swap_active()
+
+    def total_bytes(self):
+        """Estimated memory of all pooled adapters"""
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def enforce_budget(self, keep=None):
+        """
+        Evict least recently used adapters until the pool fits its limits.
+
+        Args:
+            keep (str, optional): Model folder that must not be evicted
+        """
+        with self._locked():
+            protected = {self._key(folder) for folder in (keep, self.active_folder) if folder}
+            for key in list(self._entries.keys()):
+                over_count = self.max_models is not None and len(self._entries) > self.max_models
+                over_memory = self.memory_budget_bytes is not None and self.total_bytes() > self.memory_budget_bytes
+                if not over_count and not over_memory:
+                    break
+                if key not in protected:
+                    self.evict(self._entries[key].model_folder)
+
+    def evict(self, model_folder):
+        """
+        Remove an adapter from the pool and release its memory.
+
+        Args:
+            model_folder (str): Model folder of a pooled adapter
+        """
+        with self._locked():
+            entry = self._entries.pop(self._key(model_folder), None)
+            if entry is None:
+                return
+            if self.active_folder and self._key(self.active_folder) == self._key(model_folder):
+                self.active_folder = None
+            try:
+                # Call any cleanup methods the model might have
+                if hasattr(entry.instance, 'cleanup'):
+                    entry.instance.cleanup()
+            except Exception as e:
+                print(f"Error during model cleanup: {str(e)}")
+                traceback.print_exc()
+            self._uninstall(entry)
+            if self._installed is entry:
+                self._installed = None
+            entry.instance = None
+            entry.module = None
+            entry.modules.clear()
+            # Free the depth networks that only the evicted adapter used
+            release_depth_backends(keep={getattr(other.instance, 'depth_backend', None) for other in self._entries.values()})
+            gc.collect()
+            print(f"Status: Model pool evicted {model_folder}")
+
+    def clear(self):
+        """Evict every pooled adapter"""
+        with self._locked():
+            for entry in list(self._entries.values()):
+                self.evict(entry.model_folder)
@@ -0,0 +1,299 @@
+"""
+VISTA_Q MPI Cache
+
+Content-addressed on-disk cache for the MPI layers produced by a VISTA_Q adapter's load_image().
+
+An entry is keyed by the model folder, a hash of the adapter's checkpoint, a hash of the input
+image and the adapter's resolution. On a hit the cached tensors are handed back to the adapter
+through set_mpi_state(), so neither the depth network nor the MPI network has to run again.
+Entries are MPI artifacts (vista_q_artifact): a hit only memory-maps the file, the planes are read
+when the adapter first uses them, and no entry is ever unpickled.
+
+Adapters opt in by implementing:
+- cache_signature(): dict with 'checkpoint_path' and any parameters that change the MPI (e.g. 'resolution')
+- get_mpi_state(): dict of CPU tensors describing the generated MPI
+- set_mpi_state(state): restore the MPI from such a dict
+"""
+
+import os
+import json
+import hashlib
+import threading
+import traceback
+from vista_q_artifact import ARTIFACT_EXTENSION, save_artifact, load_artifact
+
+BUFFER_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """
+    Compute the SHA-256 digest of a file.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(BUFFER_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class CheckpointIndex:
+    def __init__(self, index_path):
+        """
+        Digests of checkpoint files, stored in a JSON index so that large checkpoints are only hashed
+        again when their size or mtime changes.
+
+        Args:
+            index_path (str): JSON file holding the index
+        """
+        self.index_path = index_path
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def digest(self, checkpoint_path):
+        """
+        Get the digest of a checkpoint, reusing the stored digest while size and mtime are unchanged.
+
+        Args:
+            checkpoint_path (str): Path to the checkpoint file
+
+        Returns:
+            str: Hex digest of the checkpoint, or "missing" if the file does not exist
+        """
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return "missing"
+
+        with self._lock:
+            index = self._load()
+            abs_path = os.path.abspath(checkpoint_path)
+            stat = os.stat(abs_path)
+            entry = index.get(abs_path)
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                return entry['digest']
+
+            digest = file_digest(abs_path)
+            index[abs_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+            return digest
+
+
+class MPICache:
+    def __init__(self, cache_dir="./Cache/MPI/", max_bytes=2 * 1024 ** 3, fp16=False):
+        """
+        Initialize the MPI cache.
+
+        Args:
+            cache_dir (str): Directory holding the cache entries
+            max_bytes (int): Maximum total size of the cache entries before LRU eviction
+            fp16 (bool): Store the MPI planes of new entries as float16
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.fp16 = fp16
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._checkpoints = CheckpointIndex(os.path.join(self.cache_dir, "checkpoints.json"))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def supports(adapter):
+        """Check whether an adapter implements the MPI state hooks"""
+        return all(hasattr(adapter, name) for name in ('cache_signature', 'get_mpi_state', 'set_mpi_state'))
+
+    def checkpoint_digest(self, checkpoint_path):
+        """
+        Get the digest of a checkpoint, reusing the stored digest while size and mtime are unchanged.
+
+        Args:
+            checkpoint_path (str): Path to the checkpoint file
+
+        Returns:
+            str: Hex digest of the checkpoint, or "missing" if the file does not exist
+        """
+        return self._checkpoints.digest(checkpoint_path)
+
+    def make_key(self, adapter, model_folder, image_path):
+        """
+        Build the content-addressed key for an adapter/image pair.
+
+        Args:
+            adapter: VISTA_Q adapter instance implementing cache_signature()
+            model_folder (str): Model folder the adapter was loaded from
+            image_path (str): Path to the input image
+
+        Returns:
+            str: Hex key of the cache entry
+        """
+        signature = dict(adapter.cache_signature())
+        checkpoint_path = signature.pop('checkpoint_path', None)
+        key_data = {
+            'model': os.path.basename(os.path.normpath(os.path.abspath(model_folder))),
+            'checkpoint': self.checkpoint_digest(checkpoint_path),
+            'image': file_digest(image_path),
+            'signature': signature,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ARTIFACT_EXTENSION)
+
+    def contains(self, key):
+        """Check whether an entry exists, without touching it"""
+        return os.path.exists(self._entry_path(key))
+
+    def get(self, key):
+        """
+        Read a cache entry.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            dict: MPI state, or None on a miss
+        """
+        path = self._entry_path(key)
+        with self._lock:
+            if not os.path.exists(path):
+                self.misses += 1
+                return None
+            try:
+                state = load_artifact(path).state()
+                # Touch the entry so that LRU eviction keeps it
+                os.utime(path)
+                self.hits += 1
+                return state
+            except Exception as e:
+                print(f"Warning: Dropping unreadable MPI cache entry {key}: {str(e)}")
+                self._remove(path)
+                self.misses += 1
+                return None
+
+    def put(self, key, state):
+        """
+        Write a cache entry and evict old entries if the cache grew too large. An entry larger than
+        the whole cache is not kept, as eviction would remove it right away.
+
+        Args:
+            key (str): Cache key
+            state (dict): MPI state returned by get_mpi_state()
+
+        Returns:
+            bool: True if the entry was kept
+        """
+        path = self._entry_path(key)
+        size = save_artifact(path, state, meta={'key': key}, fp16=self.fp16)
+        if self.max_bytes is not None and size > self.max_bytes:
+            self._remove(path)
+            print(f"Warning: Not caching MPI layers of {size / 1024 ** 2:.0f} MB, the MPI cache holds at most "
+                  f"{self.max_bytes / 1024 ** 2:.0f} MB")
+            return False
+        self.evict()
+        return True
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def entries(self):
+        """
+        List the cache entries.
+
+        Returns:
+            list: (path, size, mtime) tuples, least recently used first
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            # Entries written as .pt by older versions are only listed, so that eviction removes them
+            if not name.endswith((ARTIFACT_EXTENSION, ".pt")):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def restore(self, adapter, model_folder, image_path):
+        """
+        Restore the MPI layers of an adapter from the cache.
+
+        Args:
+            adapter: VISTA_Q adapter instance
+            model_folder (str): Model folder the adapter was loaded from
+            image_path (str): Path to the input image
+
+        Returns:
+            bool: True on a cache hit
+        """
+        if not self.supports(adapter) or not os.path.exists(image_path):
+            return False
+        try:
+            key = self.make_key(adapter, model_folder, image_path)
+            state = self.get(key)
+            if state is None:
+                return False
+            adapter.set_mpi_state(state)
+            print(f"Status: MPI layers restored from cache ({key[:12]})")
+            return True
+        except Exception as e:
+            print(f"Warning: MPI cache restore failed: {str(e)}")
+            traceback.print_exc()
+            return False
+
+    def store(self, adapter, model_folder, image_path):
+        """
+        Store the MPI layers currently held by an adapter.
+
+        Args:
+            adapter: VISTA_Q adapter instance with a loaded image
+            model_folder (str): Model folder the adapter was loaded from
+            image_path (str): Path to the input image
+
+        Returns:
+            bool: True if the entry was written
+        """
+        if not self.supports(adapter) or not os.path.exists(image_path):
+            return False
+        try:
+            key = self.make_key(adapter, model_folder, image_path)
+            return self.put(key, adapter.get_mpi_state())
+        except Exception as e:
+            print(f"Warning: MPI cache store failed: {str(e)}")
+            traceback.print_exc()
+            return False
@@ -0,0 +1,46 @@
+"""
+VISTA_Q Pose Helpers
+
+The viewing pose of every adapter is an (x, y, z) offset in the cube [-POSE_LIMIT, POSE_LIMIT]^3.
+"""
+
+# Largest offset along each axis accepted by the adapters
+POSE_LIMIT = 0.1
+
+
+def clamp(value, limit=POSE_LIMIT):
+    """Clamp a single offset to [-limit, limit]"""
+    return max(-limit, min(limit, value))
+
+
+def clamp_pose(x, y, z=0, limit=POSE_LIMIT):
+    """
+    Clamp a pose to the valid range.
+
+    Args:
+        x (float): X offset
+        y (float): Y offset
+        z (float): Z offset
+        limit (float): Largest offset along each axis
+
+    Returns:
+        tuple: Clamped (x, y, z)
+    """
+    return clamp(x, limit), clamp(y, limit), clamp(z, limit)
+
+
+def quantize_pose(x, y, z=0, step=0.001, limit=POSE_LIMIT):
+    """
+    Snap a clamped pose to a grid.
+
+    Args:
+        x (float): X offset
+        y (float): Y offset
+        z (float): Z offset
+        step (float): Grid spacing
+        limit (float): Largest offset along each axis
+
+    Returns:
+        tuple: Integer grid indices (ix, iy, iz); the snapped pose is the indices times step
+    """
+    return tuple(int(round(value / step)) for value in clamp_pose(x, y, z, limit))
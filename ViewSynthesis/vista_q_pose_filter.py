@@ -0,0 +1,216 @@
+"""
+VISTA_Q Head-Pose Filter
+
+Filters the head pose of the face tracker before it is turned into a view request:
+
+    smoothing    a One-Euro filter (strong smoothing at rest, little lag when moving) or a
+                 constant-velocity Kalman filter, applied per axis
+    prediction   the pose is extrapolated along the estimated velocity by the measured
+                 motion-to-photon latency, so the displayed view matches where the head is
+    dead-band    poses closer than a threshold to the last requested pose are not requested,
+                 so a still head does not trigger a re-render on every camera frame
+
+All values are in pose units (the offsets passed to generate_view()) and seconds.
+"""
+
+import math
+import time
+from vista_q_pose import clamp_pose
+
+FILTERS = ("none", "one_euro", "kalman")
+
+
+def _smoothing_factor(dt, cutoff):
+    """Exponential smoothing factor of a first-order low-pass with the given cutoff frequency"""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.0, beta=20.0, d_cutoff=1.0):
+        """
+        One-Euro filter of a single value (Casiez et al., CHI 2012).
+
+        Args:
+            min_cutoff (float): Cutoff frequency in Hz at rest; lower values remove more jitter
+            beta (float): Increase of the cutoff with speed; higher values reduce lag when moving
+            d_cutoff (float): Cutoff frequency in Hz of the velocity estimate
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.velocity = 0.0
+        self.last_time = None
+
+    def update(self, value, timestamp):
+        """
+        Filter a new sample.
+
+        Returns:
+            float: The filtered value
+        """
+        if self.value is None or timestamp <= self.last_time:
+            if self.value is None:
+                self.value = value
+            self.last_time = timestamp
+            return self.value
+
+        dt = timestamp - self.last_time
+        self.last_time = timestamp
+
+        raw_velocity = (value - self.value) / dt
+        self.velocity += _smoothing_factor(dt, self.d_cutoff) * (raw_velocity - self.velocity)
+
+        cutoff = self.min_cutoff + self.beta * abs(self.velocity)
+        self.value += _smoothing_factor(dt, cutoff) * (value - self.value)
+        return self.value
+
+
+class KalmanFilter:
+    def __init__(self, process_noise=0.01, measurement_noise=1e-6):
+        """
+        Constant-velocity Kalman filter of a single value.
+
+        Args:
+            process_noise (float): Variance of the acceleration (pose units^2 / s^4)
+            measurement_noise (float): Variance of a measured value (pose units^2)
+        """
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.velocity = 0.0
+        self.last_time = None
+        # Covariance of (value, velocity)
+        self._p = [[1.0, 0.0], [0.0, 1.0]]
+
+    def update(self, value, timestamp):
+        """
+        Predict to the sample time and correct with the sample.
+
+        Returns:
+            float: The filtered value
+        """
+        if self.value is None or timestamp <= self.last_time:
+            if self.value is None:
+                self.value = value
+                self._p = [[self.measurement_noise, 0.0], [0.0, 1.0]]
+            self.last_time = timestamp
+            return self.value
+
+        dt = timestamp - self.last_time
+        self.last_time = timestamp
+        (p00, p01), (p10, p11) = self._p
+        q = self.process_noise
+
+        # Predict
+        self.value += self.velocity * dt
+        p00 = p00 + dt * (p01 + p10) + dt * dt * p11 + q * dt ** 4 / 4
+        p01 = p01 + dt * p11 + q * dt ** 3 / 2
+        p10 = p10 + dt * p11 + q * dt ** 3 / 2
+        p11 = p11 + q * dt * dt
+
+        # Correct
+        innovation = value - self.value
+        s = p00 + self.measurement_noise
+        k0, k1 = p00 / s, p10 / s
+        self.value += k0 * innovation
+        self.velocity += k1 * innovation
+        self._p = [[(1 - k0) * p00, (1 - k0) * p01], [p10 - k1 * p00, p11 - k1 * p01]]
+        return self.value
+
+
+class HeadPoseFilter:
+    def __init__(self, method="one_euro", min_cutoff=1.0, beta=20.0, process_noise=0.01,
+                 measurement_noise=1e-6, dead_band=0.0005, max_prediction=0.1):
+        """
+        Initialize the head-pose filter.
+
+        Args:
+            method (str): "none", "one_euro" or "kalman"
+            min_cutoff (float): One-Euro cutoff frequency in Hz at rest
+            beta (float): One-Euro speed coefficient
+            process_noise (float): Kalman acceleration variance
+            measurement_noise (float): Kalman measurement variance
+            dead_band (float): Smallest pose change that is requested (0 requests every pose)
+            max_prediction (float): Longest extrapolation in seconds (0 disables prediction)
+        """
+        if method not in FILTERS:
+            raise ValueError(f"Unknown pose filter: {method}")
+        self.method = method
+        self.dead_band = dead_band
+        self.max_prediction = max_prediction
+
+        if method == "one_euro":
+            self.axes = [OneEuroFilter(min_cutoff, beta) for _ in range(3)]
+        elif method == "kalman":
+            self.axes = [KalmanFilter(process_noise, measurement_noise) for _ in range(3)]
+        else:
+            self.axes = None
+
+        # Exponential average of the measured motion-to-photon latency
+        self.latency = 0.0
+        self.updates = 0
+        self.skipped = 0
+        self.last_pose = None
+
+    def reset(self):
+        """Forget the filter state, e.g. when the head origin is reset"""
+        if self.axes is not None:
+            for axis in self.axes:
+                axis.reset()
+        self.last_pose = None
+
+    def reset_stats(self):
+        self.updates = 0
+        self.skipped = 0
+
+    def on_frame_displayed(self, model, frame, pose, timestamp):
+        """Update the latency estimate from a displayed frame (connect to RenderWorker.frame_ready)"""
+        if timestamp is None:
+            return
+        latency = time.perf_counter() - timestamp
+        self.latency = latency if self.latency == 0.0 else 0.9 * self.latency + 0.1 * latency
+
+    def update(self, x, y, z, timestamp):
+        """
+        Filter a measured pose.
+
+        Args:
+            x (float): X offset
+            y (float): Y offset
+            z (float): Z offset
+            timestamp (float): Capture time of the measurement in seconds
+
+        Returns:
+            tuple: The pose (x, y, z) to request, or None if it is within the dead-band of the last one
+        """
+        self.updates += 1
+        pose = (x, y, z)
+        if self.axes is not None:
+            pose = tuple(axis.update(value, timestamp) for axis, value in zip(self.axes, pose))
+
+            lead = min(self.latency, self.max_prediction)
+            if lead > 0:
+                pose = tuple(value + axis.velocity * lead for axis, value in zip(self.axes, pose))
+
+        pose = clamp_pose(*pose)
+        if self.last_pose is not None and max(abs(a - b) for a, b in zip(pose, self.last_pose)) < self.dead_band:
+            self.skipped += 1
+            return None
+        self.last_pose = pose
+        return pose
+
+    def stats(self):
+        """Counters of the filter, for logging"""
+        return {
+            "updates": self.updates,
+            "skipped": self.skipped,
+            "latency_ms": self.latency * 1000,
+        }
@@ -0,0 +1,227 @@
+"""
+VISTA_Q Sequence Prefetch
+
+Loads test sequences (adapter import, weights, depth and MPI) on a background thread, so that the next
+sequence is ready by the time the participant has rated the current one. Progress is reported from
+the actual load steps instead of a timer.
+"""
+
+import os
+import time
+import threading
+import traceback
+from PyQt6.QtCore import QObject, pyqtSignal
+from vista_q_view_grid import ViewGridModel
+
+# Progress values reported for the load steps
+PROGRESS_STARTED = 10
+PROGRESS_INSTANCE = 40
+PROGRESS_WEIGHTS = 60
+PROGRESS_IMAGE = 80
+
+
+class PreparedSequence:
+    def __init__(self, index, sequence):
+        """
+        Result of loading a test sequence.
+
+        Args:
+            index (int): Index of the sequence in the test sequence list
+            sequence (dict): Test sequence row
+        """
+        self.index = index
+        self.sequence = sequence
+        self.model_folder = sequence['model_folder']
+        self.model = None
+        self.ready = False
+        self.image_deferred = False
+        self.error = None
+        self.load_time = 0
+
+
+def prepare_sequence(prepared, model_pool, mpi_cache=None, baked=False, load_image=True, progress=None, view_grids=None):
+    """
+    Load the model of a test sequence and its image, restoring cached MPI layers when available.
+    
+    Args:
+        prepared (PreparedSequence): Sequence to prepare, filled in place
+        model_pool (ModelPool): Pool holding the adapter instances
+        mpi_cache (MPICache, optional): Cache of generated MPI layers
+        baked (bool): Only restore MPI layers from the cache, never load network weights
+        load_image (bool): Whether to load the image; False when the instance is still being presented
+        progress (callable, optional): Called with (percent, message) after each step
+        view_grids (ViewGridStore, optional): Serve the sequence from a view grid, rendering it if needed
+    
+    Returns:
+        PreparedSequence: The prepared sequence
+    """
+    def report(value, message):
+        print(f"Status: {message}")
+        if progress is not None:
+            progress(value, message)
+
+    start_time = time.time()
+    model_folder = prepared.model_folder
+    image_path = prepared.sequence['image_path']
+    try:
+        report(PROGRESS_STARTED, f"Loading model from {model_folder}")
+
+        # Get the pooled instance of VISTA_Q, importing and creating it on first use
+        prepared.model = model_pool.acquire(model_folder)
+        report(PROGRESS_INSTANCE, "Model instance created")
+
+        # A rendered view grid needs neither the weights nor the image
+        if view_grids is not None:
+            grid = view_grids.load(prepared.model, model_folder, image_path)
+            if grid is not None:
+                prepared.model = ViewGridModel(prepared.model, grid)
+                report(PROGRESS_IMAGE, f"View grid restored for {image_path}")
+                prepared.ready = True
+                return prepared
+
+        if not load_image:
+            prepared.image_deferred = True
+            return prepared
+
+        # Keep the adapter's helper modules importable while it loads
+        with model_pool.namespace(model_folder):
+            # Cached MPI layers make loading the weights and running the networks unnecessary
+            if mpi_cache is not None and mpi_cache.restore(prepared.model, model_folder, image_path):
+                report(PROGRESS_IMAGE, f"Image restored from cache: {image_path}")
+            elif baked:
+                # Baked sessions never load network weights
+                prepared.error = f"No pre-baked MPI for {image_path} with {model_folder}, run VISTA_Q_ToolKit_PreBake.py first"
+                return prepared
+            else:
+                if not hasattr(prepared.model, 'load_model') or not hasattr(prepared.model, 'load_image'):
+                    prepared.error = f"{model_folder} does not implement load_model() and load_image()"
+                    return prepared
+
+                # Initialize the model, unless the pool already holds its weights
+                if not model_pool.ensure_weights(model_folder):
+                    prepared.error = f"Failed to load model weights from {model_folder}"
+                    return prepared
+                report(PROGRESS_WEIGHTS, f"Model loaded from {model_folder}")
+
+                # Load the image
+                if prepared.model.load_image(image_path) is False:
+                    prepared.error = f"Failed to load image {image_path}"
+                    return prepared
+                if mpi_cache is not None:
+                    mpi_cache.store(prepared.model, model_folder, image_path)
+                report(PROGRESS_IMAGE, f"Image loaded from {image_path}")
+
+            if view_grids is not None:
+                # Render the grid once, every later presentation of this pair is served from disk
+                nx, ny, nz = view_grids.shape
+                print(f"Warning: No view grid for {image_path} with {model_folder}, rendering {nx * ny * nz} views "
+                      f"while the sequence loads; pre-bake them with VISTA_Q_ToolKit_PreBake.py --view_grid {nx} {ny} {nz}")
+                last_reported = [-1]
+
+                def report_grid(rendered, total):
+                    value = PROGRESS_IMAGE + (99 - PROGRESS_IMAGE) * rendered // total
+                    if value != last_reported[0]:
+                        last_reported[0] = value
+                        report(value, f"Rendering view grid: {rendered}/{total}")
+
+                grid = view_grids.build(prepared.model, model_folder, image_path, progress=report_grid)
+                prepared.model = ViewGridModel(prepared.model, grid)
+
+        prepared.ready = True
+        return prepared
+    except Exception as e:
+        prepared.error = str(e)
+        traceback.print_exc()
+        return prepared
+    finally:
+        prepared.load_time = time.time() - start_time
+
+
+class SequencePrefetcher(QObject):
+    # (sequence index, percent, message)
+    progress = pyqtSignal(int, int, str)
+    # PreparedSequence
+    finished = pyqtSignal(object)
+
+    def __init__(self, model_pool, mpi_cache=None, baked=False, view_grids=None, render_client=None):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            model_pool (ModelPool): Pool holding the adapter instances
+            mpi_cache (MPICache, optional): Cache of generated MPI layers
+            baked (bool): Only restore MPI layers from the cache, never load network weights
+            view_grids (ViewGridStore, optional): Serve sequences from view grids, rendering them if needed
+            render_client (RenderClient or RenderProcess, optional): Load sequences on a render server or in a
+                render process instead of in this process
+        """
+        super().__init__()
+        self.model_pool = model_pool
+        self.mpi_cache = mpi_cache
+        self.baked = baked
+        self.view_grids = view_grids
+        self.render_client = render_client
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._results = {}
+
+    def start(self, index, sequence, busy_folder=None):
+        """
+        Start loading a test sequence in the background, unless it is already loading or loaded.
+
+        Args:
+            index (int): Index of the sequence in the test sequence list
+            sequence (dict): Test sequence row
+            busy_folder (str, optional): Model folder whose instance is being presented and must not load another image yet
+        """
+        with self._lock:
+            if index in self._jobs or index in self._results:
+                return
+            # The pooled instance of a folder is shared, so it cannot load the next image while it is presented
+            load_image = busy_folder is None or os.path.realpath(sequence['model_folder']) != os.path.realpath(busy_folder)
+            prepared = PreparedSequence(index, sequence)
+            thread = threading.Thread(
+                target=self._run,
+                args=(prepared, load_image),
+                name=f"VISTA_Q-prefetch-{index}",
+                daemon=True
+            )
+            self._jobs[index] = thread
+        thread.start()
+
+    def _run(self, prepared, load_image):
+        progress = lambda value, message: self.progress.emit(prepared.index, value, message)
+        if self.render_client is not None:
+            self.render_client.prepare(prepared, load_image=load_image, progress=progress)
+        else:
+            prepare_sequence(
+                prepared,
+                self.model_pool,
+                mpi_cache=self.mpi_cache,
+                baked=self.baked,
+                load_image=load_image,
+                view_grids=self.view_grids,
+                progress=progress
+            )
+        with self._lock:
+            self._jobs.pop(prepared.index, None)
+            self._results[prepared.index] = prepared
+        self.finished.emit(prepared)
+
+    def is_loading(self, index):
+        """Check whether a sequence is being loaded"""
+        with self._lock:
+            return index in self._jobs
+
+    def take(self, index):
+        """
+        Hand over a loaded sequence.
+
+        Args:
+            index (int): Index of the sequence in the test sequence list
+
+        Returns:
+            PreparedSequence: The loaded sequence, or None if it is not ready
+        """
+        with self._lock:
+            return self._results.pop(index, None)
@@ -0,0 +1,210 @@
+"""
+VISTA_Q Render Client
+
+Connects a GUI to a render server (VISTA_Q_ToolKit_RenderServer.py) instead of loading the adapters
+in its own process. RenderClient.prepare() takes the place of prepare_sequence(): the server loads
+the sequence and the prepared sequence holds a RemoteModel, whose generate_view() requests the view
+from the server and returns the received frame as a uint8 array.
+"""
+
+import os
+import time
+import socket
+import threading
+from vista_q_render_server import DEFAULT_ADDRESS, TOKEN_ENV, ENCODINGS, parse_address, send_message, recv_message, decode_frame
+
+
+class _Reply:
+    def __init__(self, progress=None):
+        self.event = threading.Event()
+        self.progress = progress
+        self.header = None
+        self.payload = None
+
+
+class RemoteModel:
+    def __init__(self, client, session, model_folder, image_path):
+        """
+        Adapter stand-in for a sequence loaded on the render server.
+
+        Args:
+            client (RenderClient): Connection to the server
+            session (int): Session of the sequence on the server
+            model_folder (str): Model folder of the sequence
+            image_path (str): Image of the sequence
+        """
+        self.client = client
+        self.session = session
+        self.model_folder = model_folder
+        self.image_path = image_path
+
+    def generate_view(self, x, y, z=0, scale=1):
+        """Render a view on the server, with the signature of an adapter's generate_view()"""
+        return self.client.render(self.session, x, y, z, scale)
+
+
+class RenderClient:
+    def __init__(self, address=DEFAULT_ADDRESS, encoding="raw", quality=90, name=None, connect_timeout=10.0, token=None):
+        """
+        Connect to a render server.
+
+        Args:
+            address (str): Server address, "host:port" or "unix:/path/to/socket"
+            encoding (str): Frame encoding requested from the server: "raw", "png" or "jpeg"
+            quality (int): JPEG quality
+            name (str, optional): Name of this station in the server's log
+            connect_timeout (float): Seconds to wait for the connection
+            token (str, optional): Token of the server, defaults to the VISTA_Q_RENDER_TOKEN environment variable
+
+        Raises:
+            ConnectionError: If the server cannot be reached or refuses the token
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown frame encoding {encoding}, expected one of {ENCODINGS}")
+        self.address = address
+        family, sockaddr = parse_address(address)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.settimeout(connect_timeout)
+        try:
+            self._sock.connect(sockaddr)
+        except OSError as e:
+            self._sock.close()
+            raise ConnectionError(f"Could not connect to the render server at {address}: {str(e)}")
+        self._sock.settimeout(None)
+        if family == socket.AF_INET:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._replies = {}
+        self._next_request = 1
+        self._error = None
+        self._reader = threading.Thread(target=self._receive_loop, name="VISTA_Q-render-client", daemon=True)
+        self._reader.start()
+
+        name = name or f"{socket.gethostname()}-{os.getpid()}"
+        token = token if token is not None else os.environ.get(TOKEN_ENV)
+        welcome, _ = self._request({"op": "hello", "name": name, "encoding": encoding, "quality": quality, "token": token})
+        if welcome.get("op") == "error":
+            self.close()
+            raise ConnectionError(f"The render server at {address} refused the connection: {welcome.get('error')}")
+        self.encoding = welcome.get("encoding", encoding)
+        print(f"Status: Connected to the render server at {address} ({self.encoding} frames)")
+
+    def _request(self, header, progress=None):
+        """Send a request and wait for its reply"""
+        reply = _Reply(progress)
+        with self._lock:
+            if self._error is not None:
+                raise ConnectionError(self._error)
+            request = self._next_request
+            self._next_request += 1
+            self._replies[request] = reply
+        header = dict(header, request=request)
+        try:
+            with self._send_lock:
+                send_message(self._sock, header)
+        except OSError as e:
+            with self._lock:
+                self._replies.pop(request, None)
+            raise ConnectionError(f"Lost the render server: {str(e)}")
+        reply.event.wait()
+        if reply.header is None:
+            raise ConnectionError(self._error or "Lost the render server")
+        return reply.header, reply.payload
+
+    def _receive_loop(self):
+        try:
+            while True:
+                header, payload = recv_message(self._sock)
+                request = header.get("request")
+                with self._lock:
+                    reply = self._replies.get(request)
+                if reply is None:
+                    continue
+                if header.get("op") == "progress":
+                    if reply.progress is not None:
+                        reply.progress(header.get("value", 0), header.get("message", ""))
+                    continue
+                with self._lock:
+                    self._replies.pop(request, None)
+                reply.header = header
+                reply.payload = payload
+                reply.event.set()
+        except (ConnectionError, OSError) as e:
+            with self._lock:
+                self._error = f"Lost the render server at {self.address}: {str(e)}"
+                replies = list(self._replies.values())
+                self._replies.clear()
+            for reply in replies:
+                reply.event.set()
+
+    def prepare(self, prepared, load_image=True, progress=None):
+        """
+        Load a test sequence on the server, in place of prepare_sequence().
+
+        Args:
+            prepared (PreparedSequence): Sequence to prepare, filled in place
+            load_image (bool): Ignored, the server swaps the MPIs of sessions sharing an instance
+            progress (callable, optional): Called with (percent, message) as the server loads
+
+        Returns:
+            PreparedSequence: The prepared sequence, holding a RemoteModel when ready
+        """
+        start_time = time.time()
+        sequence = prepared.sequence
+        try:
+            print(f"Status: Loading {sequence['image_path']} with {prepared.model_folder} on the render server")
+            header, _ = self._request({"op": "load", "sequence": sequence}, progress=progress)
+            if header.get("ready"):
+                prepared.model = RemoteModel(self, header["session"], prepared.model_folder, sequence['image_path'])
+                prepared.ready = True
+            else:
+                prepared.error = header.get("error", "The render server failed to load the sequence")
+        except ConnectionError as e:
+            prepared.error = str(e)
+        finally:
+            prepared.load_time = time.time() - start_time
+        return prepared
+
+    def render(self, session, x, y, z=0, scale=1):
+        """
+        Render a view of a session.
+
+        Returns:
+            np.ndarray: The frame as a uint8 (H, W, 3) array
+
+        Raises:
+            RuntimeError: If the server failed to render the view, or replaced it with a newer one
+        """
+        header, payload = self._request({"op": "view", "session": session, "x": x, "y": y, "z": z, "scale": scale})
+        if header.get("op") == "frame":
+            return decode_frame(header, payload)
+        if header.get("op") == "dropped":
+            raise RuntimeError("The view was replaced by a newer request")
+        raise RuntimeError(header.get("error", "The render server failed to render the view"))
+
+    def release(self, model):
+        """
+        Release the session of a model returned by prepare(), e.g. at the end of its presentation.
+
+        Args:
+            model: RemoteModel, or a wrapper of one (e.g. FrameCache)
+        """
+        while not isinstance(model, RemoteModel) and hasattr(model, 'model'):
+            model = model.model
+        if not isinstance(model, RemoteModel):
+            return
+        try:
+            with self._send_lock:
+                send_message(self._sock, {"op": "release", "session": model.session})
+        except OSError:
+            pass
+
+    def close(self):
+        """Disconnect from the server, which releases all sessions of this client"""
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
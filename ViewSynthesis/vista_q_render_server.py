@@ -0,0 +1,586 @@
+"""
+VISTA_Q Render Server
+
+Hosts the VISTA_Q adapters once for several rating stations. GUI clients (see
+vista_q_render_client.py) connect over a local TCP or Unix socket, load their test sequences on the
+server and request views by pose; frames come back as raw uint8 buffers or PNG/JPEG.
+
+Every message is framed as
+
+    <header length: uint32> <payload length: uint32> <JSON header> <payload>
+
+Client -> server: hello, load (a test sequence row), view (session, pose), release (session)
+Server -> client: welcome, progress, loaded, frame (with the frame as payload), dropped, error
+
+The server only trusts the client with the choice of a sequence, never with paths: the model
+folder of a load request is matched by name against the adapters found in the server's models_dir,
+and its image must lie under the server's image_root; anything else is refused. The scale of a
+view request is clamped to [MIN_SCALE, MAX_SCALE]. With a token, clients must present it in their
+hello before any other request is accepted. Listen on loopback or a Unix socket unless a token is
+set, since a client can make the server load and run any adapter of models_dir.
+
+Sequences are loaded on a loader thread with the same model pool, MPI cache and view grids as the
+GUIs. Clients that load the same (model folder, image) pair share a session. Sessions of the same
+model folder with different images share its pooled adapter instance: the MPI of a session is
+swapped in with set_mpi_state() before it is rendered, or the image is loaded again for adapters
+without the MPI hooks.
+
+Views are rendered on one thread. Each client has at most one pending view, a newer pose replaces
+it (the older request is answered with dropped). Clients with a pending view are served round
+robin, so a client moving fast cannot starve the others. A client that has not received its last
+frame yet, or whose model folder is busy loading, is skipped until it is ready (back-pressure).
+"""
+
+import io
+import os
+import hmac
+import json
+import time
+import queue
+import socket
+import ipaddress
+import struct
+import threading
+import traceback
+from collections import deque, defaultdict
+import numpy as np
+from PIL import Image
+from vista_q_prefetch import PreparedSequence, prepare_sequence
+from vista_q_view_grid import ViewGridModel
+from vista_q_frames import as_frame_array
+from vista_q_manifest import discover_models
+
+DEFAULT_ADDRESS = "127.0.0.1:7321"
+# Environment variable holding the shared token, so it does not show up in process listings
+TOKEN_ENV = "VISTA_Q_RENDER_TOKEN"
+ENCODINGS = ("raw", "png", "jpeg")
+_HEADER = struct.Struct("<II")
+MAX_HEADER_BYTES = 1024 * 1024
+MIN_SCALE = 0.25
+MAX_SCALE = 4.0
+
+
+def parse_address(address):
+    """
+    Parse a server address.
+
+    Args:
+        address (str): "unix:/path/to/socket", "host:port" or ":port"
+
+    Returns:
+        tuple: (socket family, socket address)
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def is_local_address(address):
+    """Check whether an address only accepts connections from this machine (loopback or Unix socket)"""
+    family, sockaddr = parse_address(address)
+    if family == socket.AF_UNIX:
+        return True
+    host = sockaddr[0]
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def send_message(sock, header, payload=b""):
+    """Send a framed message"""
+    data = json.dumps(header, default=str).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data), len(payload)) + data)
+    if len(payload):
+        sock.sendall(payload)
+
+
+def _recv_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError("Connection closed")
+        received += count
+    return buffer
+
+
+def recv_message(sock):
+    """
+    Receive a framed message.
+
+    Returns:
+        tuple: (header dict, payload bytearray)
+
+    Raises:
+        ConnectionError: If the connection is closed or the message is malformed
+    """
+    header_size, payload_size = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    if header_size > MAX_HEADER_BYTES:
+        raise ConnectionError(f"Message header of {header_size} bytes is too large")
+    try:
+        header = json.loads(_recv_exactly(sock, header_size).decode("utf-8"))
+    except ValueError as e:
+        raise ConnectionError(f"Malformed message header: {str(e)}")
+    payload = _recv_exactly(sock, payload_size) if payload_size else bytearray()
+    return header, payload
+
+
+def encode_frame(frame, encoding="raw", quality=90):
+    """
+    Encode a rendered frame for sending.
+
+    Args:
+        frame: Frame returned by generate_view()
+        encoding (str): "raw", "png" or "jpeg"
+        quality (int): JPEG quality
+
+    Returns:
+        tuple: (header fields, payload)
+    """
+    frame = as_frame_array(frame)
+    if encoding == "raw":
+        return {"encoding": "raw", "shape": list(frame.shape)}, memoryview(frame).cast("B")
+    buffer = io.BytesIO()
+    if encoding == "jpeg":
+        Image.fromarray(frame).save(buffer, format="JPEG", quality=quality)
+    else:
+        Image.fromarray(frame).save(buffer, format="PNG", compress_level=1)
+    return {"encoding": encoding, "shape": list(frame.shape)}, buffer.getbuffer()
+
+
+def decode_frame(header, payload):
+    """Decode a received frame into a uint8 (H, W, 3) array"""
+    if header["encoding"] == "raw":
+        return np.frombuffer(payload, dtype=np.uint8).reshape(header["shape"])
+    with Image.open(io.BytesIO(payload)) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+class _Session:
+    def __init__(self, session_id, key, sequence, prepared, instance):
+        self.id = session_id
+        self.key = key
+        self.sequence = sequence
+        self.model = prepared.model
+        self.instance = instance
+        self.load_time = prepared.load_time
+        self.mpi_state = None
+        self.refcount = 1
+        # The first render after a load runs with the adapter's helper modules importable
+        self.first_render = not isinstance(prepared.model, ViewGridModel)
+
+
+class _Client:
+    def __init__(self, server, sock, peer):
+        self.server = server
+        self.sock = sock
+        self.name = str(peer)
+        self.encoding = "raw"
+        self.quality = 90
+        self.sessions = set()
+        self.authenticated = False
+        self.closed = False
+        # Newest view request that has not been rendered, see RenderServer._next_job()
+        self.pending = None
+        self.scheduled = False
+        # Set while a rendered frame waits in the outbox or is being sent
+        self.frame_unsent = False
+        self.outbox = queue.Queue()
+        self.rendered = 0
+        self.dropped = 0
+        self.render_time = 0.0
+        self.sender = threading.Thread(target=self._send_loop, name=f"VISTA_Q-send-{self.name}", daemon=True)
+
+    def post(self, header, payload=b""):
+        """Queue a message for the client"""
+        if not self.closed:
+            self.outbox.put((header, payload))
+
+    def _send_loop(self):
+        while True:
+            item = self.outbox.get()
+            if item is None:
+                return
+            header, payload = item
+            try:
+                send_message(self.sock, header, payload)
+            except OSError:
+                self.server._disconnect(self)
+                return
+            if header.get("op") == "frame":
+                with self.server._condition:
+                    self.frame_unsent = False
+                    self.server._condition.notify_all()
+
+
+class RenderServer:
+    def __init__(self, address=DEFAULT_ADDRESS, model_pool=None, mpi_cache=None, baked=False, view_grids=None,
+                 models_dir="./Models", image_root="./Images", token=None):
+        """
+        Initialize the render server.
+
+        Args:
+            address (str): Address to listen on, see parse_address()
+            model_pool (ModelPool): Pool holding the adapter instances
+            mpi_cache (MPICache, optional): Cache of generated MPI layers
+            baked (bool): Only restore MPI layers from the cache, never load network weights
+            view_grids (ViewGridStore, optional): Serve sequences from view grids, rendering them if needed
+            models_dir (str): Directory of the adapters clients may load, by model folder name
+            image_root (str): Directory the images of the loaded sequences must lie in
+            token (str, optional): Shared secret clients must send in their hello
+        """
+        self.address = address
+        self.model_pool = model_pool
+        self.mpi_cache = mpi_cache
+        self.baked = baked
+        self.view_grids = view_grids
+        self.models_dir = models_dir
+        self.image_root = os.path.realpath(image_root)
+        self.token = token or None
+        self._condition = threading.Condition()
+        self._clients = []
+        self._scheduled = deque()
+        self._sessions = {}
+        self._sessions_by_key = {}
+        self._next_session_id = 1
+        # Held while a model folder's pooled instance loads or renders
+        self._folder_locks = defaultdict(threading.Lock)
+        # Session whose image each pooled instance holds
+        self._instance_sessions = {}
+        self._loads = queue.Queue()
+        self._stopping = False
+        self._listener = None
+
+    @staticmethod
+    def _folder_key(model_folder):
+        return os.path.realpath(os.path.abspath(model_folder))
+
+    def _resolve_sequence(self, sequence):
+        """
+        Map a test sequence sent by a client onto the server's own adapters and images.
+
+        Returns:
+            dict: Copy of the sequence with the server-side model folder and image path
+
+        Raises:
+            ValueError: If the model is not in models_dir or the image is not under image_root
+        """
+        if not isinstance(sequence, dict):
+            raise ValueError("Malformed sequence")
+        name = os.path.basename(os.path.normpath(str(sequence.get('model_folder', ''))))
+        manifests = {os.path.basename(os.path.normpath(manifest['model_folder'])): manifest
+                     for manifest in discover_models(self.models_dir)}
+        if name not in manifests:
+            raise ValueError(f"Unknown model {name}, the server provides {sorted(manifests)}")
+
+        image_path = os.path.realpath(str(sequence.get('image_path', '')))
+        if os.path.commonpath([image_path, self.image_root]) != self.image_root:
+            raise ValueError(f"Image {sequence.get('image_path')} is outside the server's image directory")
+        if not os.path.isfile(image_path):
+            raise ValueError(f"Image {sequence.get('image_path')} not found on the server")
+        return dict(sequence, model_folder=manifests[name]['model_folder'], image_path=image_path)
+
+    def serve_forever(self):
+        """
+        Accept clients until shutdown() is called.
+
+        Raises:
+            ValueError: If the address accepts remote connections and no token is set
+        """
+        if self.token is None and not is_local_address(self.address):
+            raise ValueError(f"Listening on {self.address} accepts remote clients, set a token ({TOKEN_ENV}) or listen on loopback")
+        family, sockaddr = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(sockaddr):
+            os.remove(sockaddr)
+        self._listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(sockaddr)
+        self._listener.listen()
+        print(f"Status: Render server listening on {self.address}")
+
+        threading.Thread(target=self._render_loop, name="VISTA_Q-render", daemon=True).start()
+        threading.Thread(target=self._load_loop, name="VISTA_Q-load", daemon=True).start()
+
+        while not self._stopping:
+            try:
+                sock, peer = self._listener.accept()
+            except OSError:
+                break
+            if family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = _Client(self, sock, peer or f"client-{len(self._clients) + 1}")
+            with self._condition:
+                self._clients.append(client)
+            client.sender.start()
+            threading.Thread(target=self._receive_loop, args=(client,), name=f"VISTA_Q-recv-{client.name}", daemon=True).start()
+
+    def shutdown(self):
+        """Stop accepting clients and disconnect the connected ones"""
+        self._stopping = True
+        with self._condition:
+            self._condition.notify_all()
+            clients = list(self._clients)
+        for client in clients:
+            self._disconnect(client)
+        self._loads.put(None)
+        if self._listener is not None:
+            self._listener.close()
+            family, sockaddr = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(sockaddr):
+                os.remove(sockaddr)
+
+    def _receive_loop(self, client):
+        try:
+            while not client.closed:
+                header, _ = recv_message(client.sock)
+                op = header.get("op")
+                if op == "hello":
+                    if self.token is not None and not hmac.compare_digest(str(header.get("token") or ""), self.token):
+                        print(f"Warning: Refused client {client.name}: wrong or missing token")
+                        client.post({"op": "error", "request": header.get("request"), "error": "Wrong or missing token"})
+                        continue
+                    client.authenticated = True
+                    client.name = header.get("name") or client.name
+                    client.encoding = header.get("encoding", "raw") if header.get("encoding") in ENCODINGS else "raw"
+                    client.quality = int(header.get("quality", 90))
+                    client.post({"op": "welcome", "request": header.get("request"), "pid": os.getpid(), "encoding": client.encoding})
+                    print(f"Status: Client {client.name} connected ({client.encoding} frames)")
+                elif not client.authenticated:
+                    client.post({"op": "error", "request": header.get("request"), "error": "Send hello first"})
+                elif op == "load":
+                    self._loads.put((client, header))
+                elif op == "view":
+                    self._request_view(client, header)
+                elif op == "release":
+                    self._release(client, header.get("session"))
+                else:
+                    client.post({"op": "error", "request": header.get("request"), "error": f"Unknown operation {op}"})
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._disconnect(client)
+
+    def _disconnect(self, client):
+        with self._condition:
+            if client.closed:
+                return
+            client.closed = True
+            client.pending = None
+            if client in self._clients:
+                self._clients.remove(client)
+            self._condition.notify_all()
+        for session_id in list(client.sessions):
+            self._release(client, session_id)
+        client.outbox.put(None)
+        try:
+            client.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        client.sock.close()
+        mean_ms = client.render_time / client.rendered * 1000 if client.rendered else 0.0
+        print(f"Status: Client {client.name} disconnected: {client.rendered} views rendered "
+              f"(mean {mean_ms:.1f} ms), {client.dropped} dropped")
+
+    def _release(self, client, session_id):
+        with self._condition:
+            if session_id not in client.sessions:
+                return
+            client.sessions.discard(session_id)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.refcount -= 1
+            if session.refcount <= 0:
+                del self._sessions[session_id]
+                self._sessions_by_key.pop(session.key, None)
+                # Keeps the instance's MPI until another session needs it, but not the saved copy
+                session.mpi_state = None
+
+    def _load_loop(self):
+        while True:
+            item = self._loads.get()
+            if item is None:
+                return
+            client, header = item
+            if client.closed:
+                continue
+            request = header.get("request")
+            try:
+                sequence = self._resolve_sequence(header.get("sequence"))
+            except ValueError as e:
+                print(f"Warning: Refused a sequence of {client.name}: {str(e)}")
+                client.post({"op": "loaded", "request": request, "ready": False, "error": str(e)})
+                continue
+            try:
+                session = self._open_session(client, sequence, request)
+                if session is None:
+                    continue
+                client.post({"op": "loaded", "request": request, "session": session.id,
+                             "ready": True, "load_time": session.load_time})
+            except Exception as e:
+                traceback.print_exc()
+                client.post({"op": "loaded", "request": request, "ready": False, "error": str(e)})
+
+    def _open_session(self, client, sequence, request):
+        """Find or load the session of a test sequence for a client"""
+        key = (self._folder_key(sequence['model_folder']), sequence['image_path'])
+        with self._condition:
+            session = self._sessions_by_key.get(key)
+            if session is not None:
+                session.refcount += 1
+                client.sessions.add(session.id)
+                return session
+
+        def progress(value, message):
+            client.post({"op": "progress", "request": request, "value": value, "message": message})
+
+        with self._folder_locks[key[0]]:
+            prepared = self._prepare(sequence, progress)
+            if not prepared.ready:
+                client.post({"op": "loaded", "request": request, "ready": False,
+                             "error": prepared.error or "Failed to load the sequence"})
+                return None
+            instance = self.model_pool.get_entry(sequence['model_folder']).instance
+            with self._condition:
+                session = _Session(self._next_session_id, key, sequence, prepared, instance)
+                self._next_session_id += 1
+                self._sessions[session.id] = session
+                self._sessions_by_key[key] = session
+                client.sessions.add(session.id)
+            if not isinstance(session.model, ViewGridModel):
+                self._instance_sessions[key[0]] = session.id
+                if hasattr(instance, 'get_mpi_state') and hasattr(instance, 'set_mpi_state'):
+                    session.mpi_state = instance.get_mpi_state()
+        return session
+
+    def _prepare(self, sequence, progress=None):
+        return prepare_sequence(
+            PreparedSequence(0, sequence),
+            self.model_pool,
+            mpi_cache=self.mpi_cache,
+            baked=self.baked,
+            progress=progress,
+            view_grids=self.view_grids
+        )
+
+    def _request_view(self, client, header):
+        try:
+            scale = min(max(float(header.get("scale", 1)), MIN_SCALE), MAX_SCALE)
+            request = (header.get("request"), header.get("session"), float(header.get("x", 0)), float(header.get("y", 0)),
+                       float(header.get("z", 0)), int(scale) if scale.is_integer() else scale)
+        except (TypeError, ValueError):
+            client.post({"op": "error", "request": header.get("request"), "error": "Malformed view request"})
+            return
+        with self._condition:
+            if client.pending is not None:
+                client.dropped += 1
+                client.post({"op": "dropped", "request": client.pending[0]})
+            client.pending = request
+            if not client.scheduled:
+                client.scheduled = True
+                self._scheduled.append(client)
+            self._condition.notify_all()
+
+    def _next_job(self):
+        """
+        Pick the next view to render, round robin over the clients with a pending view.
+
+        Called with the condition held. Returns (client, request, session, folder lock) with the
+        lock acquired, or None if no client can be served right now.
+        """
+        for _ in range(len(self._scheduled)):
+            client = self._scheduled.popleft()
+            if client.closed or client.pending is None:
+                client.scheduled = False
+                continue
+            if client.frame_unsent:
+                self._scheduled.append(client)
+                continue
+            request = client.pending
+            session = self._sessions.get(request[1])
+            if session is None or request[1] not in client.sessions:
+                client.pending = None
+                client.scheduled = False
+                client.post({"op": "error", "request": request[0], "error": f"Unknown session {request[1]}"})
+                continue
+            lock = self._folder_locks[session.key[0]]
+            if not lock.acquire(blocking=False):
+                self._scheduled.append(client)
+                continue
+            client.pending = None
+            client.scheduled = False
+            return client, request, session, lock
+        return None
+
+    def _activate(self, session):
+        """Make the pooled instance hold the image of a session. Called with the folder lock held."""
+        if isinstance(session.model, ViewGridModel):
+            return
+        folder_key = session.key[0]
+        model_folder = session.sequence['model_folder']
+        entry = self.model_pool.get_entry(model_folder)
+        if entry is None or entry.instance is not session.instance:
+            # The instance was evicted from the pool, load the sequence again
+            self._instance_sessions.pop(folder_key, None)
+        if self._instance_sessions.get(folder_key) != session.id:
+            if session.mpi_state is not None and entry is not None and entry.instance is session.instance:
+                self.model_pool.activate(model_folder)
+                session.instance.set_mpi_state(session.mpi_state)
+            else:
+                print(f"Status: Reloading {session.sequence['image_path']} with {model_folder}")
+                prepared = self._prepare(session.sequence)
+                if not prepared.ready:
+                    raise RuntimeError(prepared.error or "Failed to reload the sequence")
+                session.model = prepared.model
+                session.instance = self.model_pool.get_entry(model_folder).instance
+                session.first_render = True
+            self._instance_sessions[folder_key] = session.id
+        if self.model_pool.active_folder != model_folder:
+            self.model_pool.activate(model_folder)
+
+    def _render_loop(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    # Woken by new requests and sent frames; folder locks are polled
+                    self._condition.wait(0.01)
+                    job = self._next_job()
+                if self._stopping:
+                    if job is not None:
+                        job[3].release()
+                    return
+            client, request, session, lock = job
+            request_id, _, x, y, z, scale = request
+            try:
+                try:
+                    self._activate(session)
+                    start_time = time.perf_counter()
+                    if session.first_render:
+                        # Like the GUI's first render, adapters may import helpers lazily
+                        with self.model_pool.namespace(session.sequence['model_folder']):
+                            frame = session.model.generate_view(x, y, z, scale=scale)
+                        session.first_render = False
+                    else:
+                        frame = session.model.generate_view(x, y, z, scale=scale)
+                    render_time = time.perf_counter() - start_time
+                finally:
+                    lock.release()
+                header, payload = encode_frame(frame, client.encoding, client.quality)
+                header.update({"op": "frame", "request": request_id, "render_ms": render_time * 1000})
+                with self._condition:
+                    client.rendered += 1
+                    client.render_time += render_time
+                    client.frame_unsent = True
+                client.post(header, payload)
+            except Exception as e:
+                print(f"Error generating view for {client.name}: {str(e)}")
+                traceback.print_exc()
+                client.post({"op": "error", "request": request_id, "error": str(e)})
@@ -0,0 +1,151 @@
+"""
+VISTA_Q Render Worker
+
+Runs generate_view() on a dedicated thread so that a slow renderer never blocks the Qt event loop.
+Only the most recently requested pose is rendered: requests that arrive while a frame is being
+rendered replace each other, and the stale ones are dropped instead of being rendered in order.
+Model switches are queued the same way and applied by the worker between frames, so switching
+sequences never waits for a render; model_released reports when the previous model is done.
+"""
+
+import time
+import threading
+import traceback
+from PyQt6.QtCore import QThread, pyqtSignal
+from vista_q_instrumentation import DISABLED
+
+
+class RenderWorker(QThread):
+    # (model, frame, pose, timestamp) - the model identifies which sequence the frame belongs to,
+    # the timestamp is the perf_counter() time of the input that requested the pose (or None)
+    frame_ready = pyqtSignal(object, object, object, object)
+    # (model, error message)
+    render_failed = pyqtSignal(object, str)
+    # (model) - a model replaced by set_model() that the worker no longer renders
+    model_released = pyqtSignal(object)
+
+    def __init__(self, parent=None, instrumentation=None):
+        super().__init__(parent)
+        self.instrumentation = instrumentation or DISABLED
+        self._condition = threading.Condition()
+        # Model rendered by the worker thread; set_model() queues the next one in _next_model
+        self._model = None
+        self._first_render_context = None
+        self._next_model = None
+        self._swap_pending = False
+        self._pending = None
+        self._pending_timestamp = None
+        self._stopping = False
+
+        # Statistics
+        self.requested = 0
+        self.rendered = 0
+        self.dropped = 0
+        self.last_render_time = 0
+        self.total_render_time = 0
+
+    def set_model(self, model, first_render_context=None):
+        """
+        Switch the model to render; pending requests for the previous model are dropped.
+
+        Returns right away: the worker switches once a frame that is being rendered is finished, and
+        then emits model_released with the previous model, which the caller may only free after that.
+
+        Args:
+            model: VISTA_Q adapter instance, or None to stop rendering
+            first_render_context (callable, optional): Returns a context manager to wrap the first render in,
+                e.g. the model pool namespace for adapters that import helpers lazily
+        """
+        with self._condition:
+            self._next_model = (model, first_render_context)
+            self._swap_pending = True
+            self._pending = None
+            self._condition.notify()
+
+    def is_releasing(self):
+        """
+        Check whether a model replaced by set_model() may still be rendered, i.e. whether a
+        model_released signal for it is still to come.
+
+        Returns:
+            bool: True until the worker has switched away from the previous model
+        """
+        with self._condition:
+            return self._swap_pending and self._model is not None and self._model is not self._next_model[0]
+
+    def request_view(self, x, y, z=0, scale=1, timestamp=None):
+        """
+        Request a view; replaces any request that has not been rendered yet.
+
+        Args:
+            x (float): X coordinate (-0.1 to 0.1)
+            y (float): Y coordinate (-0.1 to 0.1)
+            z (float): Z coordinate (-0.1 to 0.1)
+            scale (int): Scale factor for the output image size
+            timestamp (float, optional): perf_counter() time of the input, passed on with the frame for latency measurements
+        """
+        with self._condition:
+            if (self._next_model[0] if self._swap_pending else self._model) is None:
+                return
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (x, y, z, scale)
+            self._pending_timestamp = timestamp
+            self.requested += 1
+            self._condition.notify()
+        self.instrumentation.gauge("render_queue", 1)
+
+    def stop(self):
+        """Stop the worker thread and wait for it to finish"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            released = None
+            with self._condition:
+                while self._pending is None and not self._swap_pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                if self._swap_pending:
+                    # Apply the queued model switch between frames
+                    if self._model is not self._next_model[0]:
+                        released = self._model
+                    self._model, self._first_render_context = self._next_model
+                    self._next_model = None
+                    self._swap_pending = False
+                pose = self._pending
+                timestamp = self._pending_timestamp
+                self._pending = None
+                model = self._model
+                context = self._first_render_context
+                if pose is not None:
+                    self._first_render_context = None
+            if released is not None:
+                self.model_released.emit(released)
+            if pose is None:
+                continue
+            self.instrumentation.gauge("render_queue", 0)
+
+            x, y, z, scale = pose
+            try:
+                start_time = time.perf_counter()
+                if context is not None:
+                    with context():
+                        frame = model.generate_view(x, y, z, scale=scale)
+                else:
+                    frame = model.generate_view(x, y, z, scale=scale)
+                end_time = time.perf_counter()
+                self.last_render_time = end_time - start_time
+                self.total_render_time += self.last_render_time
+                self.rendered += 1
+                self.instrumentation.add_span("render", start_time, end_time)
+                self.instrumentation.tick("render")
+                self.frame_ready.emit(model, frame, pose, timestamp)
+            except Exception as e:
+                print(f"Error generating view: {str(e)}")
+                traceback.print_exc()
+                self.render_failed.emit(model, str(e))
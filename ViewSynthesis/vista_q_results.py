@@ -0,0 +1,289 @@
+"""
+VISTA_Q Results
+
+Ratings are written by a background thread, so submitting a rating never blocks the GUI on disk
+I/O. Each station appends to its own journal in <results_dir>/journal/, so stations sharing a
+results directory never write to the same file. A journal record is framed as
+
+    <payload length: uint32> <crc32 of the payload: uint32> <JSON payload>
+
+and is flushed to the OS as soon as it is written; the journal is fsynced at most every
+fsync_interval seconds and when the writer is closed. A record torn by a crash fails its length or
+checksum and is ignored together with anything after it. A write that fails part way is retried
+after cutting the journal back to the end of the last complete record, or, if that fails too, in a
+new journal, so no later record ends up behind torn bytes.
+
+Compaction merges the journals of all stations into the results CSV, e.g.
+Test_Results/ViewSynthesis_Results.csv. Rows already in the CSV are not added again, so compaction
+can run any number of times, also while other stations are writing. The CSV is replaced
+atomically and compactions of different stations are serialized by a lock file.
+"""
+
+import os
+import csv
+import json
+import time
+import queue
+import socket
+import struct
+import zlib
+import threading
+
+RESULT_FIELDS = ['testID', 'sample_id', 'rating', 'rating_label', 'date_time']
+RESULTS_CSV = "ViewSynthesis_Results.csv"
+JOURNAL_DIR = "journal"
+JOURNAL_EXTENSION = ".journal"
+_HEADER = struct.Struct("<II")
+
+
+def encode_record(record):
+    """Frame a record for the journal"""
+    payload = json.dumps(record, default=str).encode("utf-8")
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_journal(path):
+    """
+    Read the records of a journal, up to the first torn or corrupt record.
+
+    Args:
+        path (str): Journal file
+
+    Returns:
+        list: The records as dicts
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    records = []
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        length, checksum = _HEADER.unpack_from(data, offset)
+        payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            print(f"Warning: Ignoring a torn record at byte {offset} of {path}")
+            break
+        try:
+            records.append(json.loads(payload.decode("utf-8")))
+        except ValueError:
+            print(f"Warning: Ignoring an unreadable record at byte {offset} of {path}")
+            break
+        offset += _HEADER.size + length
+    return records
+
+
+class _CompactionLock:
+    def __init__(self, path, timeout=10.0, stale_after=60.0):
+        """Lock file held while the CSV is rewritten, taken over when older than stale_after seconds"""
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, f"{socket.gethostname()} {os.getpid()}".encode("utf-8"))
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                        print(f"Warning: Removing stale compaction lock {self.path}")
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"Could not acquire the compaction lock {self.path}")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc_info):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        return False
+
+
+def compact_results(results_dir="./Test_Results/", csv_name=RESULTS_CSV):
+    """
+    Merge the journals of all stations into the results CSV.
+
+    Args:
+        results_dir (str): Results directory holding the CSV and the journal directory
+        csv_name (str): File name of the results CSV
+
+    Returns:
+        int: Number of rows added to the CSV
+    """
+    csv_path = os.path.join(results_dir, csv_name)
+    journal_dir = os.path.join(results_dir, JOURNAL_DIR)
+    if not os.path.isdir(journal_dir):
+        return 0
+
+    with _CompactionLock(csv_path + ".lock"):
+        rows = []
+        if os.path.isfile(csv_path):
+            with open(csv_path, 'r', newline='') as f:
+                rows = list(csv.DictReader(f))
+        existing = {tuple(row.get(field, '') for field in RESULT_FIELDS) for row in rows}
+
+        added = []
+        for name in sorted(os.listdir(journal_dir)):
+            if not name.endswith(JOURNAL_EXTENSION):
+                continue
+            for record in read_journal(os.path.join(journal_dir, name)):
+                row = {field: str(record.get(field, '')) for field in RESULT_FIELDS}
+                key = tuple(row[field] for field in RESULT_FIELDS)
+                if key not in existing:
+                    existing.add(key)
+                    added.append(row)
+        if not added:
+            return 0
+
+        added.sort(key=lambda row: row['date_time'])
+        tmp_path = f"{csv_path}.{socket.gethostname()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows + added)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, csv_path)
+        return len(added)
+
+
+class ResultWriter:
+    def __init__(self, results_dir="./Test_Results/", csv_name=RESULTS_CSV, fsync_interval=1.0):
+        """
+        Start the background writer of a station.
+
+        Args:
+            results_dir (str): Results directory, may be shared by several stations
+            csv_name (str): File name of the results CSV produced by compaction
+            fsync_interval (float): Longest time in seconds a written record may wait for fsync
+        """
+        self.results_dir = results_dir
+        self.csv_name = csv_name
+        self.fsync_interval = fsync_interval
+        self.journal_dir = os.path.join(results_dir, JOURNAL_DIR)
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._journal_name = f"{socket.gethostname()}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self._journal_count = 0
+        self.journal_path = os.path.join(self.journal_dir, self._journal_name + JOURNAL_EXTENSION)
+        self.written = 0
+        self._file = open(self.journal_path, 'ab')
+        # End of the last complete record in the journal
+        self._good_offset = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="ResultWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """
+        Queue a result row for the journal. Returns immediately.
+
+        Args:
+            row (dict): Result row with the RESULT_FIELDS
+        """
+        if self._closed:
+            raise RuntimeError("The result writer is closed")
+        self._queue.put(dict(row))
+
+    def _run(self):
+        pending = []
+        last_sync = time.monotonic()
+        dirty = False
+        stopping = False
+        while not (stopping and not pending):
+            timeout = max(0.0, self.fsync_interval - (time.monotonic() - last_sync)) if dirty else None
+            if not pending:
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    stopping = True
+                elif item:
+                    pending.append(item)
+            # Take everything else that arrived in the meantime
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    pending.append(item)
+
+            try:
+                if self._file is None:
+                    self._file = open(self.journal_path, 'ab')
+                while pending:
+                    record = encode_record(pending[0])
+                    self._file.write(record)
+                    self._file.flush()
+                    self._good_offset += len(record)
+                    pending.pop(0)
+                    self.written += 1
+                    dirty = True
+                if dirty and (stopping or time.monotonic() - last_sync >= self.fsync_interval):
+                    os.fsync(self._file.fileno())
+                    last_sync = time.monotonic()
+                    dirty = False
+            except OSError as e:
+                # Keep the records and try again
+                print(f"Error: Failed to write results to {self.journal_path}: {str(e)}")
+                self._discard_partial()
+                if stopping:
+                    break
+                time.sleep(1.0)
+
+        if pending:
+            print(f"Error: {len(pending)} results could not be written: {pending}")
+
+    def _discard_partial(self):
+        """
+        Remove the bytes of a partly written record after a failed write, so that the retry appends
+        right after the last complete record. Rolls over to a new journal if the file cannot be cut.
+        """
+        try:
+            # Closing flushes whatever is still buffered, which is cut off below
+            self._file.close()
+        except (OSError, AttributeError):
+            pass
+        self._file = None
+        try:
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(self._good_offset)
+            return
+        except OSError as e:
+            print(f"Warning: Could not truncate {self.journal_path}: {str(e)}")
+        self._journal_count += 1
+        self.journal_path = os.path.join(self.journal_dir, f"{self._journal_name}-{self._journal_count}{JOURNAL_EXTENSION}")
+        self._good_offset = 0
+        print(f"Status: Continuing the results journal in {self.journal_path}")
+
+    def close(self, compact=True):
+        """
+        Write and fsync all queued results, and merge the journals into the results CSV.
+
+        Args:
+            compact (bool): Run compact_results() after the journal is closed
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            if self._file is not None:
+                self._file.close()
+        if compact:
+            try:
+                added = compact_results(self.results_dir, self.csv_name)
+                print(f"Status: Added {added} results to {os.path.join(self.results_dir, self.csv_name)}")
+            except Exception as e:
+                print(f"Warning: Results stay in {self.journal_path}, compaction failed: {str(e)}")
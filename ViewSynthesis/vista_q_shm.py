@@ -0,0 +1,387 @@
+"""
+VISTA_Q Shared-Memory Render Process
+
+Runs the adapters in a child process, so that inference never competes with the Qt event loop for
+the GIL. The child renders into a ring of multiprocessing.shared_memory slots; the control pipe
+only carries requests, poses and slot indices. The GUI receives every frame as a numpy array
+mapped onto its slot, which FrameView paints without a copy.
+
+A slot is handed to the child with each view request and returns to the ring when the frame array
+(and every view of it) has been garbage collected, i.e. once the GUI shows a newer frame. If no
+slot is free (e.g. all are held by a frame cache), or a frame is larger than a slot, the frame is sent
+through the pipe instead.
+
+RenderProcess has the prepare() / release() / close() interface of RenderClient, so the GUIs load
+and present sequences the same way; the adapters are unchanged.
+"""
+
+import time
+import queue
+import weakref
+import threading
+import traceback
+import multiprocessing
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+from vista_q_frames import as_frame_array
+
+DEFAULT_SLOTS = 4
+# A 1920 x 1080 RGB frame
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3
+
+
+def _render_process_main(conn, slot_names, slot_bytes, options):
+    """Entry point of the child process: loads sequences and renders views into the slots"""
+    from vista_q_mpi_cache import MPICache
+    from vista_q_depth import configure_depth_service
+    from vista_q_model_pool import ModelPool
+    from vista_q_view_grid import ViewGridStore
+    from vista_q_prefetch import PreparedSequence, prepare_sequence
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    model_pool = ModelPool(
+        max_models=options.get('model_pool_size'),
+        memory_budget_bytes=options['model_pool_mb'] * 1024 * 1024 if options.get('model_pool_mb') else None
+    )
+    mpi_cache = MPICache(options['mpi_cache_dir'], options['mpi_cache_mb'] * 1024 * 1024) if options.get('mpi_cache_dir') else None
+    configure_depth_service(options.get('depth_cache_dir'), options.get('depth_cache_mb', 512) * 1024 * 1024)
+    view_grids = ViewGridStore(options['view_grid_dir'], options['view_grid'], mode=options['view_grid_mode'],
+                               max_bytes=options.get('view_grid_mb', 8192) * 1024 * 1024) if options.get('view_grid') else None
+    baked = options.get('baked', False)
+
+    send_lock = threading.Lock()
+    sessions = {}
+    sessions_lock = threading.Lock()
+    loads = queue.Queue()
+    views = queue.Queue()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def load_loop():
+        next_session = 1
+        while True:
+            item = loads.get()
+            if item is None:
+                return
+            request, sequence, load_image = item
+            prepared = prepare_sequence(
+                PreparedSequence(0, sequence),
+                model_pool,
+                mpi_cache=mpi_cache,
+                baked=baked,
+                load_image=load_image,
+                view_grids=view_grids,
+                progress=lambda value, message: send(("progress", request, value, message))
+            )
+            session = None
+            if prepared.ready:
+                session = next_session
+                next_session += 1
+                with sessions_lock:
+                    sessions[session] = [prepared.model, prepared.model_folder, True]
+            send(("loaded", request, session, prepared.image_deferred, prepared.error, prepared.load_time))
+
+    def render_loop():
+        while True:
+            item = views.get()
+            if item is None:
+                return
+            request, session, x, y, z, scale, slot = item
+            with sessions_lock:
+                entry = sessions.get(session)
+            if entry is None:
+                send(("error", request, f"Unknown session {session}"))
+                continue
+            model, model_folder, first_render = entry
+            try:
+                if first_render:
+                    # Like the GUI's first render, with the adapter's helper modules importable
+                    with model_pool.namespace(model_folder):
+                        frame = model.generate_view(x, y, z, scale=scale)
+                    model_pool.activate(model_folder)
+                    entry[2] = False
+                else:
+                    if model_pool.active_folder != model_folder:
+                        model_pool.activate(model_folder)
+                    frame = model.generate_view(x, y, z, scale=scale)
+                frame = as_frame_array(frame)
+                if slot is not None and frame.nbytes <= slot_bytes:
+                    target = np.ndarray(frame.shape, dtype=np.uint8, buffer=slots[slot].buf)
+                    target[...] = frame
+                    del target
+                    send(("frame", request, slot, frame.shape, None))
+                else:
+                    send(("frame", request, None, frame.shape, frame.tobytes()))
+            except Exception as e:
+                traceback.print_exc()
+                send(("error", request, str(e)))
+
+    threads = [threading.Thread(target=load_loop, daemon=True), threading.Thread(target=render_loop, daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            op = message[0]
+            if op == "load":
+                loads.put(message[1:])
+            elif op == "view":
+                views.put(message[1:])
+            elif op == "release":
+                with sessions_lock:
+                    sessions.pop(message[1], None)
+            elif op == "stop":
+                break
+    finally:
+        loads.put(None)
+        views.put(None)
+        for thread in threads:
+            thread.join(timeout=5)
+        model_pool.clear()
+        for slot in slots:
+            slot.close()
+
+
+class _Reply:
+    def __init__(self, progress=None):
+        self.event = threading.Event()
+        self.progress = progress
+        self.message = None
+
+
+class ProcessModel:
+    def __init__(self, render_process, session, model_folder, image_path):
+        """
+        Adapter stand-in for a sequence loaded in the render process.
+
+        Args:
+            render_process (RenderProcess): The render process
+            session (int): Session of the sequence in the render process
+            model_folder (str): Model folder of the sequence
+            image_path (str): Image of the sequence
+        """
+        self.render_process = render_process
+        self.session = session
+        self.model_folder = model_folder
+        self.image_path = image_path
+
+    def generate_view(self, x, y, z=0, scale=1):
+        """Render a view in the render process, with the signature of an adapter's generate_view()"""
+        return self.render_process.render(self.session, x, y, z, scale)
+
+
+class RenderProcess:
+    def __init__(self, slots=DEFAULT_SLOTS, slot_bytes=DEFAULT_SLOT_BYTES, mpi_cache_dir="./Cache/MPI/", mpi_cache_mb=2048,
+                 depth_cache_dir="./Cache/Depth/", depth_cache_mb=512, baked=False, model_pool_size=None, model_pool_mb=None, view_grid=None, view_grid_mode="bilinear",
+                 view_grid_dir="./Cache/ViewGrid/", view_grid_mb=8192):
+        """
+        Start the render process and its ring of shared frame slots.
+
+        Args:
+            slots (int): Number of frame slots in the ring
+            slot_bytes (int): Size of a slot, the largest frame passed without the pipe
+            mpi_cache_dir (str): Directory of the MPI layer cache (None or empty disables it)
+            mpi_cache_mb (int): Maximum size of the MPI layer cache in MB
+            depth_cache_dir (str): Directory of the disparity cache (None or empty disables it)
+            depth_cache_mb (int): Maximum size of the disparity cache in MB
+            baked (bool): Only restore MPI layers from the cache, never load network weights
+            model_pool_size (int, optional): Maximum number of models kept loaded between sequences
+            model_pool_mb (int, optional): Memory budget of the models kept loaded in MB
+            view_grid (tuple, optional): Serve views from a pose lattice of this size
+            view_grid_mode (str): How views between lattice points are served
+            view_grid_dir (str): Directory of the rendered view grids
+            view_grid_mb (int): Maximum size of the rendered view grids in MB
+        """
+        self.slot_bytes = slot_bytes
+        self._slots = [shared_memory.SharedMemory(create=True, size=slot_bytes) for _ in range(slots)]
+        self._free = deque(range(slots))
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._replies = {}
+        self._next_request = 1
+        self._error = None
+        self._closed = False
+        self.piped_frames = 0
+
+        options = {
+            'mpi_cache_dir': mpi_cache_dir, 'mpi_cache_mb': mpi_cache_mb, 'baked': baked,
+            'depth_cache_dir': depth_cache_dir, 'depth_cache_mb': depth_cache_mb,
+            'model_pool_size': model_pool_size, 'model_pool_mb': model_pool_mb,
+            'view_grid': view_grid, 'view_grid_mode': view_grid_mode, 'view_grid_dir': view_grid_dir,
+            'view_grid_mb': view_grid_mb,
+        }
+        # Spawn keeps the GUI's Qt and CUDA state out of the child
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_render_process_main,
+            args=(child_conn, [slot.name for slot in self._slots], slot_bytes, options),
+            name="VISTA_Q-render-process",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._reader = threading.Thread(target=self._receive_loop, name="VISTA_Q-render-process-reader", daemon=True)
+        self._reader.start()
+        print(f"Status: Render process {self._process.pid} started with {slots} frame slots of {slot_bytes / 1024 ** 2:.1f} MB")
+
+    def _request(self, message, progress=None):
+        """Send a request and wait for its reply"""
+        reply = _Reply(progress)
+        with self._lock:
+            if self._error is not None:
+                raise ConnectionError(self._error)
+            request = self._next_request
+            self._next_request += 1
+            self._replies[request] = reply
+        try:
+            with self._send_lock:
+                self._conn.send((message[0], request) + tuple(message[1:]))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._replies.pop(request, None)
+            raise ConnectionError(f"Lost the render process: {str(e)}")
+        reply.event.wait()
+        if reply.message is None:
+            raise ConnectionError(self._error or "Lost the render process")
+        return reply.message
+
+    def _receive_loop(self):
+        try:
+            while True:
+                message = self._conn.recv()
+                with self._lock:
+                    reply = self._replies.get(message[1])
+                if reply is None:
+                    continue
+                if message[0] == "progress":
+                    if reply.progress is not None:
+                        reply.progress(message[2], message[3])
+                    continue
+                with self._lock:
+                    self._replies.pop(message[1], None)
+                reply.message = message
+                reply.event.set()
+        except (EOFError, OSError) as e:
+            with self._lock:
+                self._error = f"The render process exited ({self._process.exitcode}): {str(e) or 'pipe closed'}"
+                replies = list(self._replies.values())
+                self._replies.clear()
+            for reply in replies:
+                reply.event.set()
+
+    def prepare(self, prepared, load_image=True, progress=None):
+        """
+        Load a test sequence in the render process, in place of prepare_sequence().
+
+        Args:
+            prepared (PreparedSequence): Sequence to prepare, filled in place
+            load_image (bool): Whether to load the image, see prepare_sequence()
+            progress (callable, optional): Called with (percent, message) as the sequence loads
+
+        Returns:
+            PreparedSequence: The prepared sequence, holding a ProcessModel when ready
+        """
+        start_time = time.time()
+        sequence = prepared.sequence
+        try:
+            _, _, session, image_deferred, error, _ = self._request(("load", sequence, load_image), progress=progress)
+            prepared.image_deferred = image_deferred
+            if session is not None:
+                prepared.model = ProcessModel(self, session, prepared.model_folder, sequence['image_path'])
+                prepared.ready = True
+            elif not image_deferred:
+                prepared.error = error or "The render process failed to load the sequence"
+        except ConnectionError as e:
+            prepared.error = str(e)
+        finally:
+            prepared.load_time = time.time() - start_time
+        return prepared
+
+    def _take_slot(self):
+        with self._lock:
+            return self._free.popleft() if self._free else None
+
+    def _return_slot(self, slot):
+        with self._lock:
+            self._free.append(slot)
+
+    def render(self, session, x, y, z=0, scale=1):
+        """
+        Render a view of a session.
+
+        Returns:
+            np.ndarray: The frame as a uint8 (H, W, 3) array, mapped onto its shared slot
+
+        Raises:
+            RuntimeError: If the render process failed to render the view
+        """
+        slot = self._take_slot()
+        try:
+            message = self._request(("view", session, x, y, z, scale, slot))
+        except Exception:
+            if slot is not None:
+                self._return_slot(slot)
+            raise
+        if message[0] != "frame":
+            if slot is not None:
+                self._return_slot(slot)
+            raise RuntimeError(message[2])
+
+        _, _, used_slot, shape, data = message
+        if used_slot is None:
+            if slot is not None:
+                self._return_slot(slot)
+            self.piped_frames += 1
+            return np.frombuffer(bytearray(data), dtype=np.uint8).reshape(shape)
+        frame = np.ndarray(shape, dtype=np.uint8, buffer=self._slots[used_slot].buf)
+        # The slot returns to the ring when the GUI no longer holds the frame
+        weakref.finalize(frame, self._return_slot, used_slot)
+        return frame
+
+    def _send(self, message):
+        try:
+            with self._send_lock:
+                self._conn.send(message)
+        except (OSError, ValueError):
+            pass
+
+    def release(self, model):
+        """
+        Release the session of a model returned by prepare(), e.g. at the end of its presentation.
+
+        Args:
+            model: ProcessModel, or a wrapper of one (e.g. FrameCache)
+        """
+        while not isinstance(model, ProcessModel) and hasattr(model, 'model'):
+            model = model.model
+        if isinstance(model, ProcessModel):
+            self._send(("release", model.session))
+
+    def close(self):
+        """Stop the render process and free the frame slots"""
+        if self._closed:
+            return
+        self._closed = True
+        self._send(("stop",))
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            print("Warning: The render process did not stop, terminating it")
+            self._process.terminate()
+        self._conn.close()
+        if self.piped_frames:
+            print(f"Status: {self.piped_frames} frames did not fit a shared slot and were sent through the pipe")
+        for slot in self._slots:
+            try:
+                slot.close()
+            except BufferError:
+                # A frame is still displayed; the mapping is released with the process
+                pass
+            slot.unlink()
@@ -0,0 +1,128 @@
+"""
+VISTA_Q Interaction Traces
+
+Records every pose the GUIs request while a sequence is presented, so that real participant motion
+can be replayed against any adapter (see VISTA_Q_ToolKit_Replay.py).
+
+A trace is a JSONL file. It starts with a header naming the format, then each presented sequence
+starts with a sequence record, followed by one record per requested pose with its time in seconds
+since the start of the sequence:
+
+    {"type": "vista_q_pose_trace", "version": 1}
+    {"sequence": 0, "model_folder": "./Models/TMPI_256", "image_path": "./Images/1.png", "presentation_time": 30}
+    {"t": 0.016, "x": 0.012, "y": -0.003, "z": 0.0, "src": "mouse"}
+"""
+
+import os
+import json
+import time
+import threading
+
+TRACE_TYPE = "vista_q_pose_trace"
+TRACE_VERSION = 1
+
+
+class TraceRecorder:
+    def __init__(self, path):
+        """
+        Open a trace file for recording.
+
+        Args:
+            path (str): Trace file to write
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.recorded = 0
+        self._file = open(path, 'w')
+        self._file.write(json.dumps({"type": TRACE_TYPE, "version": TRACE_VERSION}) + "\n")
+        self._lock = threading.Lock()
+        self._start_time = None
+
+    def begin_sequence(self, index, sequence):
+        """
+        Start recording the poses of a presented sequence.
+
+        Args:
+            index (int): Index of the sequence in the test sequence list
+            sequence (dict): Test sequence row
+        """
+        record = {
+            "sequence": index,
+            "model_folder": sequence['model_folder'],
+            "image_path": sequence['image_path'],
+            "presentation_time": sequence.get('presentation_time'),
+        }
+        with self._lock:
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._start_time = time.perf_counter()
+
+    def end_sequence(self):
+        """Stop recording until the next sequence starts"""
+        with self._lock:
+            self._start_time = None
+            self._file.flush()
+
+    def record(self, x, y, z, source):
+        """
+        Record a requested pose. Called from the GUI thread or the face tracking thread.
+
+        Args:
+            x (float): X offset
+            y (float): Y offset
+            z (float): Z offset
+            source (str): Input that requested the pose, e.g. "mouse", "wheel" or "face"
+        """
+        with self._lock:
+            if self._start_time is None:
+                return
+            record = {
+                "t": round(time.perf_counter() - self._start_time, 6),
+                "x": round(float(x), 6), "y": round(float(y), 6), "z": round(float(z), 6),
+                "src": source,
+            }
+            self._file.write(json.dumps(record) + "\n")
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_trace(path):
+    """
+    Read a trace written by TraceRecorder. Traces recorded before the header was added are still read.
+
+    Args:
+        path (str): Trace file
+
+    Returns:
+        list: One dict per presented sequence with the sequence record and its
+            poses as a list of (t, x, y, z) tuples
+
+    Raises:
+        ValueError: If the file is not a pose trace, e.g. a landmark trace
+    """
+    sequences = []
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid trace record in {path}, line {line_number}: {str(e)}")
+            if 'type' in record:
+                if record['type'] != TRACE_TYPE or line_number > 1:
+                    raise ValueError(f"{path} is not a pose trace (found a {record['type']} record)")
+                if record.get('version', 1) > TRACE_VERSION:
+                    raise ValueError(f"{path} has pose trace version {record['version']}, this toolkit reads up to {TRACE_VERSION}")
+            elif 'sequence' in record:
+                sequences.append({'sequence': record, 'poses': []})
+            elif sequences:
+                sequences[-1]['poses'].append((record['t'], record['x'], record['y'], record['z']))
+            else:
+                raise ValueError(f"{path} is not a pose trace (line {line_number} precedes any sequence record)")
+    return sequences
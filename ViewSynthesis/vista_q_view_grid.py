@@ -0,0 +1,316 @@
+"""
+VISTA_Q View Grid
+
+Renders a lattice of viewpoints over the pose cube [-POSE_LIMIT, POSE_LIMIT]^3 once per sequence
+(e.g. 17 x 17 x 5 views) with the adapter's generate_view(), and stores the frames as a uint8
+array on disk. During the presentation the array is memory-mapped and every pose is served by
+lookup: the nearest frame, or a bilinear blend of the four frames around (x, y) at the nearest z.
+Any adapter, however slow, becomes a constant-time viewer.
+
+Frames are stored as an uncompressed .npy so they can be memory-mapped; at 8 bits per channel a
+17 x 17 x 5 grid of 256 x 256 views takes ~280 MB. The store keeps its grids within a size budget,
+evicting the least recently used ones like the MPI cache.
+"""
+
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from PIL import Image
+from vista_q_pose import POSE_LIMIT, clamp
+from vista_q_mpi_cache import CheckpointIndex, file_digest
+from vista_q_frames import as_frame_array, generate_views
+
+DEFAULT_SHAPE = (17, 17, 5)
+MODES = ("nearest", "bilinear")
+
+
+def grid_axis(count, limit=POSE_LIMIT):
+    """Pose values of one grid axis"""
+    if count == 1:
+        return np.zeros(1)
+    return np.linspace(-limit, limit, count)
+
+
+def render_view_grid(model, path, shape=DEFAULT_SHAPE, limit=POSE_LIMIT, progress=None):
+    """
+    Render the view grid of an adapter into a .npy file. The views along z are rendered with one
+    generate_views() call per (x, y).
+
+    Args:
+        model: VISTA_Q adapter instance with a loaded image
+        path (str): Target .npy file
+        shape (tuple): Number of views along x, y and z
+        limit (float): Largest pose offset along each axis
+        progress (callable, optional): Called with (rendered, total) after each batch of views
+
+    Returns:
+        str: Path of the written file
+    """
+    nx, ny, nz = shape
+    xs, ys, zs = grid_axis(nx, limit), grid_axis(ny, limit), grid_axis(nz, limit)
+    total = nx * ny * nz
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+    frames = None
+    rendered = 0
+    try:
+        for ix, x in enumerate(xs):
+            for iy, y in enumerate(ys):
+                views = generate_views(model, [(x, y, z) for z in zs], scale=1)
+                for iz, frame in enumerate(views):
+                    frame = as_frame_array(frame)
+                    if frames is None:
+                        frames = np.lib.format.open_memmap(
+                            tmp_path, mode='w+', dtype=np.uint8, shape=(nx, ny, nz) + frame.shape
+                        )
+                    frames[ix, iy, iz] = frame
+                rendered += len(views)
+                if progress is not None:
+                    progress(rendered, total)
+        frames.flush()
+        del frames
+        os.replace(tmp_path, path)
+        return path
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ViewGrid:
+    def __init__(self, frames, limit=POSE_LIMIT, mode="bilinear"):
+        """
+        A rendered view grid.
+
+        Args:
+            frames: uint8 array (nx, ny, nz, H, W, 3), typically memory-mapped
+            limit (float): Largest pose offset along each axis
+            mode (str): "nearest" or "bilinear"
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown view grid mode: {mode}")
+        self.frames = frames
+        self.limit = limit
+        self.mode = mode
+        self.shape = frames.shape[:3]
+
+    @classmethod
+    def open(cls, path, limit=POSE_LIMIT, mode="bilinear"):
+        """Memory-map a view grid written by render_view_grid()"""
+        return cls(np.load(path, mmap_mode='r'), limit, mode)
+
+    def _index(self, value, count):
+        """Fractional grid index of a pose value"""
+        if count == 1:
+            return 0.0
+        return (clamp(value, self.limit) + self.limit) / (2 * self.limit) * (count - 1)
+
+    def frame(self, x, y, z=0):
+        """
+        Look up the frame of a pose.
+
+        Args:
+            x (float): X coordinate (-0.1 to 0.1)
+            y (float): Y coordinate (-0.1 to 0.1)
+            z (float): Z coordinate (-0.1 to 0.1)
+
+        Returns:
+            np.ndarray: uint8 frame (H, W, 3)
+        """
+        nx, ny, nz = self.shape
+        fx, fy = self._index(x, nx), self._index(y, ny)
+        iz = int(round(self._index(z, nz)))
+
+        if self.mode == "nearest":
+            return np.asarray(self.frames[int(round(fx)), int(round(fy)), iz])
+
+        # Blend the four frames around (x, y)
+        x0, y0 = min(int(fx), nx - 1), min(int(fy), ny - 1)
+        x1, y1 = min(x0 + 1, nx - 1), min(y0 + 1, ny - 1)
+        wx, wy = fx - x0, fy - y0
+        blended = (
+            self.frames[x0, y0, iz].astype(np.float32) * ((1 - wx) * (1 - wy)) +
+            self.frames[x1, y0, iz].astype(np.float32) * (wx * (1 - wy)) +
+            self.frames[x0, y1, iz].astype(np.float32) * ((1 - wx) * wy) +
+            self.frames[x1, y1, iz].astype(np.float32) * (wx * wy)
+        )
+        return np.clip(blended + 0.5, 0, 255).astype(np.uint8)
+
+    def generate_view(self, x, y, z=0, scale=1):
+        """Serve a view from the grid, with the signature of an adapter's generate_view()"""
+        frame = self.frame(x, y, z)
+        if scale == 1:
+            # Nearest frames are views of the memory map, handed to the GUI without a copy
+            return frame
+        img = Image.fromarray(frame)
+        return img.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
+
+
+class ViewGridModel:
+    def __init__(self, model, grid):
+        """
+        Serve an adapter's views from its view grid.
+
+        Args:
+            model: VISTA_Q adapter instance the grid was rendered with
+            grid (ViewGrid): The rendered grid
+        """
+        self.model = model
+        self.grid = grid
+
+    def __getattr__(self, name):
+        # Everything except generate_view and generate_views goes to the wrapped adapter
+        return getattr(self.model, name)
+
+    def generate_view(self, x, y, z=0, scale=1):
+        """Look up a view instead of rendering it"""
+        return self.grid.generate_view(x, y, z, scale=scale)
+
+    def generate_views(self, poses, scale=1):
+        """Look up several views instead of rendering them"""
+        return [self.grid.generate_view(x, y, z, scale=scale) for x, y, z in poses]
+
+
+class ViewGridStore:
+    def __init__(self, cache_dir="./Cache/ViewGrid/", shape=DEFAULT_SHAPE, limit=POSE_LIMIT, mode="bilinear",
+                 max_bytes=8 * 1024 ** 3):
+        """
+        On-disk store of rendered view grids.
+
+        Args:
+            cache_dir (str): Directory holding the grids
+            shape (tuple): Number of views along x, y and z
+            limit (float): Largest pose offset along each axis
+            mode (str): "nearest" or "bilinear"
+            max_bytes (int, optional): Maximum total size of the grids before LRU eviction, None for no limit
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown view grid mode: {mode}")
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.shape = tuple(shape)
+        self.limit = limit
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._checkpoints = CheckpointIndex(os.path.join(self.cache_dir, "checkpoints.json"))
+
+    def make_key(self, adapter, model_folder, image_path):
+        """
+        Build the key of the grid of an adapter/image pair.
+
+        Args:
+            adapter: VISTA_Q adapter instance
+            model_folder (str): Model folder the adapter was loaded from
+            image_path (str): Path to the input image
+
+        Returns:
+            str: Hex key of the grid
+        """
+        signature = {}
+        if hasattr(adapter, 'cache_signature'):
+            signature = dict(adapter.cache_signature())
+            checkpoint_path = signature.pop('checkpoint_path', None)
+            if checkpoint_path:
+                signature['checkpoint'] = self._checkpoints.digest(checkpoint_path)
+        key_data = {
+            'model': os.path.basename(os.path.normpath(os.path.abspath(model_folder))),
+            'image': file_digest(image_path),
+            'signature': signature,
+            'shape': self.shape,
+            'limit': self.limit,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _grid_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def load(self, adapter, model_folder, image_path):
+        """
+        Open the stored grid of an adapter/image pair.
+
+        Returns:
+            ViewGrid: The memory-mapped grid, or None if it has not been rendered yet
+        """
+        if not os.path.exists(image_path):
+            return None
+        path = self._grid_path(self.make_key(adapter, model_folder, image_path))
+        if not os.path.exists(path):
+            return None
+        try:
+            grid = ViewGrid.open(path, self.limit, self.mode)
+            # Touch the grid so that LRU eviction keeps it
+            os.utime(path)
+            return grid
+        except Exception as e:
+            print(f"Warning: Dropping unreadable view grid {path}: {str(e)}")
+            os.remove(path)
+            return None
+
+    def build(self, adapter, model_folder, image_path, progress=None):
+        """
+        Render and store the grid of an adapter with a loaded image.
+
+        Args:
+            adapter: VISTA_Q adapter instance with image_path loaded
+            model_folder (str): Model folder the adapter was loaded from
+            image_path (str): Path to the input image
+            progress (callable, optional): Called with (rendered, total) after each view
+
+        Returns:
+            ViewGrid: The memory-mapped grid
+        """
+        path = self._grid_path(self.make_key(adapter, model_folder, image_path))
+        render_view_grid(adapter, path, self.shape, self.limit, progress)
+        grid = ViewGrid.open(path, self.limit, self.mode)
+        self.evict(keep=path)
+        return grid
+
+    def entries(self):
+        """
+        List the stored grids.
+
+        Returns:
+            list: (path, size, mtime) tuples, least recently used first
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy") or name.endswith(".tmp.npy"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used grids until the store fits in max_bytes. Grids that are open stay
+        readable until they are closed.
+
+        Args:
+            keep (str, optional): Grid file that must not be removed, e.g. the one just rendered
+        """
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+            if total > self.max_bytes:
+                print(f"Warning: The view grid store holds {total / 1024 ** 2:.0f} MB, more than its "
+                      f"{self.max_bytes / 1024 ** 2:.0f} MB budget; raise --view_grid_mb")